@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
@@ -8,11 +8,27 @@ import os
 import sys
 import threading
 import time
+import hmac
 
 # Add the current directory to Python path to import model
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from model import CoastalThreatPredictor
+from model import CoastalThreatPredictor, MODEL_SELECTION_MODES, THREAT_TARGETS, ARIMA_TARGETS, threat_level, score_columns
+from model import DEFAULT_FORECAST_HORIZON, MAX_FORECAST_HORIZON, DEFAULT_INTERVAL_LEVELS, derive_threat_labels
+from conformal import SET_LABELS, format_sets, coverage_report
+from feature_schema import FEATURE_SCHEMA, FEATURE_COLUMNS, SchemaError
+from transport import (JSON, ARROW, MSGPACK, UnsupportedMediaType, media_type, negotiate,
+                       decode_features, encode_columns, encode_object)
+from profiling import ProfilerManager, PROFILE_TARGETS
+from traffic_recorder import TrafficRecorder
+from data_generator import write_dataset
+from training_cache import TrainingCache, DEFAULT_CACHE_DIR
+from drift import DriftMonitor, build_reference, DEFAULT_BLOCK_ROWS, DEFAULT_WINDOW_BLOCKS
+from metrics import registry as metrics
+from online_learning import OnlineThreatModels, observations_frame, DEFAULT_CHECKPOINT_DIR, DEFAULT_CHECKPOINT_EVERY
+from model_registry import ModelRegistry, DEFAULT_REGISTRY_DIR
+from uncertainty import MonteCarloUncertainty, DEFAULT_SAMPLES, DEFAULT_BUDGET_MS, MAX_SAMPLES
+from downsample import DOWNSAMPLE_METHODS, MIN_POINTS, downsample
 
 app = Flask(__name__)
 CORS(app,origins=["http://localhost:3000", "http://localhost:5000", "http://localhost:5001"])  # Enable CORS for all routes
@@ -26,6 +42,35 @@ current_crisis_status = None
 crisis_update_thread = None
 stop_crisis_monitoring = False
 
+# On-demand profiling (only reachable when BLUEGUARD_DEBUG_TOKEN is set)
+profiler_manager = ProfilerManager()
+
+# Optional recording of /predict payloads for replay with load_test.py
+traffic_recorder = TrafficRecorder(os.environ['BLUEGUARD_RECORD_PATH']) if os.environ.get('BLUEGUARD_RECORD_PATH') else None
+
+# Incremental per-threat models, enabled with BLUEGUARD_ONLINE_LEARNING=1
+online_models = None
+
+# Sliding-window drift monitors for live inputs, one per source ('predict', 'crisis')
+drift_monitors = {}
+DRIFT_SOURCES = ('predict', 'crisis')
+
+# Points per /series history or forecast, by default and at most
+SERIES_DEFAULT_POINTS = 500
+SERIES_MAX_POINTS = 5000
+
+# Workers scoring with shared parameters keep no unpickled models to refit
+SHARED_PARAMS_REFIT_ERROR = 'Workers scoring with BLUEGUARD_SHARED_PARAMS keep no unpickled models to refit'
+
+# Monte Carlo input-uncertainty estimates for /predict?uncertainty=true (and the
+# crisis loop with BLUEGUARD_CRISIS_UNCERTAINTY=1), capped by a latency budget
+uncertainty_estimator = MonteCarloUncertainty(
+    samples=int(os.environ.get('BLUEGUARD_UNCERTAINTY_SAMPLES', DEFAULT_SAMPLES)),
+    budget_ms=float(os.environ.get('BLUEGUARD_UNCERTAINTY_BUDGET_MS', DEFAULT_BUDGET_MS))
+)
+
+metrics.counter('blueguard_predictions_total', 'Rows scored, by source and mode')
+
 # Test data for prediction
 test_data = {
     'timestamp': "2025-05-01 00:00:00",
@@ -58,39 +103,57 @@ def initialize_predictor():
         if not os.path.exists(data_file):
             create_sample_data(data_file)
         
-        predictor = CoastalThreatPredictor(data_file)
+        predictor = CoastalThreatPredictor(
+            data_file,
+            model_selection=os.environ.get('BLUEGUARD_MODEL_SELECTION', 'exhaustive'),
+            training_cache=create_training_cache()
+        )
+        
+        # Workers attach to the published shared parameters instead of unpickling the models
+        shared_dir = os.environ.get('BLUEGUARD_SHARED_PARAMS')
+        shared_version = None
+        if shared_dir:
+            try:
+                shared_version = predictor.attach_shared_params(shared_dir)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No shared parameters to attach yet: {e}")
         
-        # Try to load existing models first
-        try:
-            predictor.load_models()
-            print("Loaded existing trained models")
-            
-            # Ensure scaler is properly fitted by loading and preprocessing data
-            print("Ensuring scaler is properly fitted...")
+        if shared_version is not None:
+            predictor.load_models(models=False)
             predictor.load_and_preprocess_data()
-            
-            # Verify that models are actually loaded and working
-            if not hasattr(predictor, 'models') or not predictor.models:
-                print("⚠️ Models loaded but empty, retraining...")
+            print(f"✅ Scoring with shared parameters {shared_version} from {shared_dir}")
+        else:
+            # Try to load existing models first
+            try:
+                predictor.load_models()
+                print("Loaded existing trained models")
+                
+                # Ensure scaler is properly fitted by loading and preprocessing data
+                print("Ensuring scaler is properly fitted...")
+                predictor.load_and_preprocess_data()
+                
+                # Verify that models are actually loaded and working
+                if not hasattr(predictor, 'models') or not predictor.models:
+                    print("⚠️ Models loaded but empty, retraining...")
+                    predictor.train_classification_models()
+                    predictor.train_arima_models()
+                    predictor.save_models()
+                    print("✅ Models retrained and saved")
+                
+            except Exception as load_error:
+                print(f"No existing models found or error loading: {load_error}")
+                print("Training new models...")
+                # Load and preprocess data
+                predictor.load_and_preprocess_data()
+                # Train models
                 predictor.train_classification_models()
                 predictor.train_arima_models()
+                # Save models
                 predictor.save_models()
-                print("✅ Models retrained and saved")
-            
-        except Exception as load_error:
-            print(f"No existing models found or error loading: {load_error}")
-            print("Training new models...")
-            # Load and preprocess data
-            predictor.load_and_preprocess_data()
-            # Train models
-            predictor.train_classification_models()
-            predictor.train_arima_models()
-            # Save models
-            predictor.save_models()
-            print("Models trained and saved successfully")
+                print("Models trained and saved successfully")
         
         # Final verification
-        if not hasattr(predictor, 'models') or not predictor.models:
+        if not predictor.scoring_models():
             print("❌ Models still not available after initialization")
             return False
             
@@ -100,6 +163,30 @@ def initialize_predictor():
             
         print("✅ All components verified and ready")
         
+        initialize_drift_monitoring()
+        
+        if os.environ.get('BLUEGUARD_ONLINE_LEARNING') == '1':
+            initialize_online_models()
+        
+        # Last of the steps that read the training data: compact mode keeps only its tail
+        if os.environ.get('BLUEGUARD_COMPACT_INFERENCE') == '1':
+            predictor.enable_compact_inference()
+            print("✅ Compact float32 inference enabled")
+        
+        if shared_dir and shared_version is None:
+            # Nothing published yet: this process loaded or trained the models, so it publishes them
+            # once for every worker and then scores from the shared copy like the others
+            try:
+                predictor.publish_shared_params(shared_dir)
+                print(f"✅ Scoring with shared parameters {predictor.attach_shared_params(shared_dir)} from {shared_dir}")
+                predictor.release_models()
+            except ValueError as e:
+                print(f"⚠️ Shared parameters disabled: {e}")
+        
+        if os.environ.get('BLUEGUARD_MODEL_REGISTRY'):
+            predictor.model_registry = create_model_registry()
+            print(f"✅ Per-station model registry at {predictor.model_registry.directory}")
+        
         # Load crisis data
         if load_crisis_data():
             print("✅ Crisis data loaded successfully")
@@ -118,6 +205,111 @@ def initialize_predictor():
         print(f"Error initializing predictor: {str(e)}")
         return False
 
+def create_training_cache():
+    """Persistent training cache, disabled with BLUEGUARD_TRAINING_CACHE=0"""
+    if os.environ.get('BLUEGUARD_TRAINING_CACHE', '1') == '0':
+        return None
+    return TrainingCache(
+        os.environ.get('BLUEGUARD_TRAINING_CACHE_DIR', DEFAULT_CACHE_DIR),
+        max_bytes=int(os.environ.get('BLUEGUARD_TRAINING_CACHE_MB', 512)) * 1024 * 1024
+    )
+
+def create_model_registry():
+    """Per-station model registry in BLUEGUARD_MODEL_REGISTRY, holding at most BLUEGUARD_MODEL_REGISTRY_MB in memory"""
+    return ModelRegistry(
+        os.environ.get('BLUEGUARD_MODEL_REGISTRY', DEFAULT_REGISTRY_DIR),
+        memory_budget=int(os.environ.get('BLUEGUARD_MODEL_REGISTRY_MB', 256)) * 1024 * 1024
+    )
+
+def initialize_online_models():
+    """Resume online models from their CURRENT checkpoint, or warm start them from the training data"""
+    global online_models
+    online_models = OnlineThreatModels(
+        os.environ.get('BLUEGUARD_ONLINE_DIR', DEFAULT_CHECKPOINT_DIR),
+        checkpoint_every=int(os.environ.get('BLUEGUARD_ONLINE_CHECKPOINT_EVERY', DEFAULT_CHECKPOINT_EVERY))
+    )
+    version = online_models.load()
+    if version:
+        print(f"✅ Online models resumed from checkpoint {version}")
+    else:
+        version = online_models.bootstrap(predictor.data)
+        print(f"✅ Online models warm started from {len(predictor.data)} rows ({version})")
+    return online_models
+
+def initialize_drift_monitoring():
+    """(Re)create the drift monitors against the reference captured when the scaler was fit"""
+    global drift_monitors
+    reference = predictor.drift_reference
+    if reference is None:
+        # Models saved before drift references existed: profile the loaded training data
+        reference = build_reference(predictor.data[FEATURE_COLUMNS])
+        predictor.drift_reference = reference
+    drift_monitors = {
+        source: DriftMonitor(
+            reference,
+            block_rows=int(os.environ.get('BLUEGUARD_DRIFT_BLOCK_ROWS', DEFAULT_BLOCK_ROWS)),
+            window_blocks=int(os.environ.get('BLUEGUARD_DRIFT_WINDOW_BLOCKS', DEFAULT_WINDOW_BLOCKS))
+        )
+        for source in DRIFT_SOURCES
+    }
+
+def observe_inputs(source, features):
+    """Record scored inputs (a DataFrame or an array in FEATURE_COLUMNS order) for drift monitoring; never fails the request"""
+    try:
+        monitor = drift_monitors.get(source)
+        if monitor is not None:
+            monitor.observe(features)
+    except Exception as e:
+        print(f"⚠️ Drift monitoring error: {e}")
+
+def collect_drift_metrics():
+    """Drift gauges computed at scrape time"""
+    psi_samples, ks_samples, rows_samples = [], [], []
+    for source, monitor in drift_monitors.items():
+        report = monitor.report()
+        rows_samples.append(({'source': source}, report['window_rows']))
+        for feature, stats in report['features'].items():
+            psi_samples.append(({'source': source, 'feature': feature}, stats['psi']))
+            ks_samples.append(({'source': source, 'feature': feature}, stats['ks']))
+    return [
+        ('blueguard_feature_psi', 'Population stability index of live inputs vs the training reference', 'gauge', psi_samples),
+        ('blueguard_feature_ks', 'Binned KS statistic of live inputs vs the training reference', 'gauge', ks_samples),
+        ('blueguard_drift_window_rows', 'Rows in the drift sliding window', 'gauge', rows_samples),
+    ]
+
+metrics.register_collector(collect_drift_metrics)
+
+def collect_registry_metrics():
+    """Model registry cache counters, read at scrape time"""
+    registry = predictor.model_registry if predictor is not None else None
+    if registry is None:
+        return []
+    stats = registry.stats()
+    return [
+        ('blueguard_model_registry_hits_total', 'Per-station model lookups served from memory', 'counter', [({}, stats['hits'])]),
+        ('blueguard_model_registry_misses_total', 'Per-station model lookups that loaded from disk', 'counter', [({}, stats['misses'])]),
+        ('blueguard_model_registry_coalesced_total', 'Lookups that waited for a load already in progress', 'counter', [({}, stats['coalesced'])]),
+        ('blueguard_model_registry_evictions_total', 'Models evicted to stay within the memory budget', 'counter', [({}, stats['evictions'])]),
+        ('blueguard_model_registry_loaded_bytes', 'Estimated bytes of loaded per-station models', 'gauge', [({}, stats['loaded_bytes'])]),
+        ('blueguard_model_registry_loaded', 'Per-station models held in memory', 'gauge', [({}, stats['loaded'])]),
+    ]
+
+metrics.register_collector(collect_registry_metrics)
+
+def collect_explainer_metrics():
+    """Attribution cache counters, read at scrape time"""
+    explainer = predictor.explainer if predictor is not None else None
+    if explainer is None:
+        return []
+    stats = explainer.stats()
+    return [
+        ('blueguard_explanation_cache_hits_total', 'Explained rows served from the attribution cache', 'counter', [({}, stats['hits'])]),
+        ('blueguard_explanation_cache_misses_total', 'Explained rows computed', 'counter', [({}, stats['misses'])]),
+        ('blueguard_explanation_cache_entries', 'Rows held in the attribution cache', 'gauge', [({}, stats['entries'])]),
+    ]
+
+metrics.register_collector(collect_explainer_metrics)
+
 def load_crisis_data():
     """Load crisis data from Excel file"""
     global crisis_data
@@ -150,40 +342,8 @@ def load_crisis_data():
 def create_sample_data(filename):
     print("Creating sample coastal data...")
     
-    # Generate sample data
-    np.random.seed(42)
-    n_samples = 1000
-    
-    # Generate timestamps
-    start_date = datetime(2023, 1, 1)
-    timestamps = [start_date + pd.Timedelta(hours=i) for i in range(n_samples)]
-    
-    # Generate sample features
-    data = {
-        'timestamp': timestamps,
-        'sea_level_m': np.random.normal(1.5, 0.3, n_samples),
-        'wave_height_m': np.random.exponential(0.8, n_samples),
-        'wind_speed_kmph': np.random.weibull(2.0, n_samples) * 30,
-        'rainfall_mm': np.random.exponential(5.0, n_samples),
-        'sst_celsius': np.random.normal(25, 3, n_samples),
-        'chlorophyll_mg_m3': np.random.exponential(0.5, n_samples),
-        'turbidity_index': np.random.uniform(0, 1, n_samples),
-        'sea_level_anomaly_m': np.random.normal(0, 0.2, n_samples),
-        'storm_surge_risk_index': np.random.uniform(0, 1, n_samples),
-        'coastal_erosion_risk': np.random.uniform(0, 1, n_samples),
-        'algal_bloom_risk_index': np.random.uniform(0, 1, n_samples),
-        'pollution_risk_index': np.random.uniform(0, 1, n_samples),
-        'cyclone_distance_km': np.random.exponential(200, n_samples),
-        'ai_confidence_score': np.random.uniform(0.7, 1.0, n_samples),
-        'population_exposed': np.random.randint(1000, 100000, n_samples),
-        'fisherfolk_activity': np.random.uniform(0, 1, n_samples),
-        'infrastructure_exposure_index': np.random.uniform(0, 1, n_samples),
-        'blue_carbon_loss_ton_co2': np.random.exponential(50, n_samples)
-    }
-    
-    # Create DataFrame and save
-    df = pd.DataFrame(data)
-    df.to_csv(filename, index=False)
+    # 1000 hourly readings for a single station
+    write_dataset(filename, n_rows=1000, n_stations=1, seed=42, start='2023-01-01', freq='1h')
     print(f"Sample data created: {filename}")
 
 def crisis_monitoring_loop():
@@ -200,34 +360,17 @@ def crisis_monitoring_loop():
                 
                 print(f"\n🔄 [{datetime.now().strftime('%H:%M:%S')}] Processing random row...")
                 
-                # Convert row to DataFrame for prediction
-                input_df = pd.DataFrame([random_row.to_dict()])
-                
-                # Ensure all required columns are present
-                required_columns = [
-                    'sea_level_m', 'wave_height_m', 'wind_speed_kmph', 'rainfall_mm',
-                    'sst_celsius', 'chlorophyll_mg_m3', 'turbidity_index', 'sea_level_anomaly_m',
-                    'storm_surge_risk_index', 'coastal_erosion_risk', 'algal_bloom_risk_index',
-                    'pollution_risk_index', 'cyclone_distance_km', 'ai_confidence_score',
-                    'population_exposed', 'fisherfolk_activity', 'infrastructure_exposure_index',
-                    'blue_carbon_loss_ton_co2'
-                ]
-                
-                # Fill missing columns with default values
-                for col in required_columns:
-                    if col not in input_df.columns:
-                        if col in ['sea_level_m', 'sst_celsius']:
-                            input_df[col] = 25.0
-                        elif col in ['wave_height_m', 'wind_speed_kmph', 'rainfall_mm']:
-                            input_df[col] = 0.0
-                        elif col in ['chlorophyll_mg_m3', 'blue_carbon_loss_ton_co2']:
-                            input_df[col] = 0.5
-                        else:
-                            input_df[col] = 0.0
+                record = random_row.to_dict()
                 
                 # Make predictions
                 try:
-                    predictions, probabilities, arima_forecasts = predictor.predict_threats(input_df)
+                    X = FEATURE_SCHEMA.decode(record)
+                    observe_inputs('crisis', X)
+                    metrics.inc('blueguard_predictions_total', source='crisis', mode='batch')
+                    
+                    predictions, probabilities, arima_forecasts = predictor.predict_threats(
+                        X, station_ids=[record.get('station_id')]
+                    )
                     
                     # Format crisis status
                     crisis_status = {
@@ -252,18 +395,8 @@ def crisis_monitoring_loop():
                         prob = probabilities[threat_name][0] * 100
                         
                         # Determine threat level
-                        if prob < 25:
-                            level = "Low"
-                            crisis_status['summary']['low_threats'] += 1
-                        elif prob < 50:
-                            level = "Medium"
-                            crisis_status['summary']['medium_threats'] += 1
-                        elif prob < 75:
-                            level = "High"
-                            crisis_status['summary']['high_threats'] += 1
-                        else:
-                            level = "Critical"
-                            crisis_status['summary']['critical_threats'] += 1
+                        level = threat_level(prob)
+                        crisis_status['summary'][f"{level.lower()}_threats"] += 1
                         
                         if pred:
                             crisis_status['summary']['total_threats'] += 1
@@ -276,6 +409,11 @@ def crisis_monitoring_loop():
                         crisis_status['threat_levels'][threat_name] = level
                         crisis_status['recommendations'][threat_name] = recommendation
                     
+                    if os.environ.get('BLUEGUARD_CRISIS_UNCERTAINTY') == '1':
+                        crisis_status['uncertainty'] = uncertainty_estimator.estimate(
+                            predictor, X[0], record.get('station_id')
+                        )
+                    
                     # Update global crisis status
                     current_crisis_status = crisis_status
                     
@@ -331,8 +469,8 @@ def verify_model_readiness():
     if predictor is None:
         return False, "Predictor not initialized"
     
-    # Check if models are loaded
-    if not hasattr(predictor, 'models') or not predictor.models:
+    # Check if models are loaded (or attached through the shared parameters)
+    if not predictor.scoring_models():
         return False, "No classification models loaded"
     
     # Check if scaler is fitted
@@ -364,12 +502,12 @@ def test_prediction_with_sample_data():
                 print("✅ Data loaded and preprocessed")
                 
                 # Check if models need to be trained
-                if not hasattr(predictor, 'models') or not predictor.models:
+                if not predictor.scoring_models():
                     print("🔄 Training classification models...")
                     predictor.train_classification_models()
                     print("✅ Classification models trained")
                 
-                if not hasattr(predictor, 'arima_models') or not predictor.arima_models:
+                if not predictor.forecast_targets():
                     print("🔄 Training ARIMA models...")
                     predictor.train_arima_models()
                     print("✅ ARIMA models trained")
@@ -385,30 +523,7 @@ def test_prediction_with_sample_data():
         print("🧪 TESTING PREDICTION WITH SAMPLE DATA")
         print("="*60)
         
-        # Convert test data to DataFrame
-        input_df = pd.DataFrame([test_data])
-        
-        # Ensure all required columns are present
-        required_columns = [
-            'sea_level_m', 'wave_height_m', 'wind_speed_kmph', 'rainfall_mm',
-            'sst_celsius', 'chlorophyll_mg_m3', 'turbidity_index', 'sea_level_anomaly_m',
-            'storm_surge_risk_index', 'coastal_erosion_risk', 'algal_bloom_risk_index',
-            'pollution_risk_index', 'cyclone_distance_km', 'ai_confidence_score',
-            'population_exposed', 'fisherfolk_activity', 'infrastructure_exposure_index',
-            'blue_carbon_loss_ton_co2'
-        ]
-        
-        # Fill missing columns with default values
-        for col in required_columns:
-            if col not in input_df.columns:
-                if col in ['sea_level_m', 'sst_celsius']:
-                    input_df[col] = 0.5
-                elif col in ['wave_height_m', 'wind_speed_kmph', 'rainfall_mm']:
-                    input_df[col] = 0.0
-                elif col in ['chlorophyll_mg_m3', 'blue_carbon_loss_ton_co2']:
-                    input_df[col] = 0.5
-                else:
-                    input_df[col] = 0.0
+        X = FEATURE_SCHEMA.decode(test_data)
         
         print(f"📊 Input Data:")
         print(f"   Station ID: {test_data.get('station_id', 'N/A')}")
@@ -426,7 +541,9 @@ def test_prediction_with_sample_data():
             print("❌ Scaler not available. Reinitializing...")
             predictor.load_and_preprocess_data()
         
-        predictions, probabilities, arima_forecasts = predictor.predict_threats(input_df)
+        predictions, probabilities, arima_forecasts = predictor.predict_threats(
+            X, station_ids=[test_data.get('station_id')]
+        )
         
         # Format response
         response = {
@@ -445,14 +562,7 @@ def test_prediction_with_sample_data():
             prob = probabilities[threat_name][0] * 100  # Convert to percentage
             
             # Determine threat level
-            if prob < 25:
-                level = "Low"
-            elif prob < 50:
-                level = "Medium"
-            elif prob < 75:
-                level = "High"
-            else:
-                level = "Critical"
+            level = threat_level(prob)
             
             # Get recommendation
             recommendation = predictor._get_recommendation(threat_name, prob, level)
@@ -503,7 +613,7 @@ def health_check():
         'model_ready': is_ready,
         'message': message,
         'components': {
-            'models_loaded': hasattr(predictor, 'models') and bool(predictor.models),
+            'models_loaded': bool(predictor.scoring_models()),
             'scaler_ready': hasattr(predictor, 'scaler') and predictor.scaler is not None,
             'data_loaded': hasattr(predictor, 'data') and predictor.data is not None
         }
@@ -613,52 +723,89 @@ def predict_threats():
         if predictor is None:
             return jsonify({'error': 'Model not initialized'}), 500
         
-        # Get input data from request
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No input data provided'}), 400
-        
-        # Convert input data to DataFrame
-        input_df = pd.DataFrame([data])
-        
-        # Ensure all required columns are present
-        required_columns = [
-            'sea_level_m', 'wave_height_m', 'wind_speed_kmph', 'rainfall_mm',
-            'sst_celsius', 'chlorophyll_mg_m3', 'turbidity_index', 'sea_level_anomaly_m',
-            'storm_surge_risk_index', 'coastal_erosion_risk', 'algal_bloom_risk_index',
-            'pollution_risk_index', 'cyclone_distance_km', 'ai_confidence_score',
-            'population_exposed', 'fisherfolk_activity', 'infrastructure_exposure_index',
-            'blue_carbon_loss_ton_co2'
-        ]
-        
-        # Fill missing columns with default values
-        for col in required_columns:
-            if col not in input_df.columns:
-                if col in ['sea_level_m', 'sst_celsius']:
-                    input_df[col] = 25.0
-                elif col in ['wave_height_m', 'wind_speed_kmph', 'rainfall_mm']:
-                    input_df[col] = 0.0
-                elif col in ['chlorophyll_mg_m3', 'blue_carbon_loss_ton_co2']:
-                    input_df[col] = 0.5
-                else:
-                    input_df[col] = 0.0
-        
-        # Make predictions
-        # Ensure all components are ready
-        if not hasattr(predictor, 'scaler') or predictor.scaler is None:
-            print("❌ Scaler not available. Reinitializing...")
-            predictor.load_and_preprocess_data()
+        if media_type(request.content_type) in (ARROW, MSGPACK):
+            # Binary columnar body holding a single row
+            try:
+                X, station_ids = decode_features(request.get_data(), request.content_type)
+            except SchemaError as e:
+                return jsonify({'error': str(e), 'details': e.errors}), 400
+            except UnsupportedMediaType as e:
+                return jsonify({'error': str(e)}), 415
+            if len(X) != 1:
+                return jsonify({'error': f'/predict scores one row, got {len(X)}; use /predict/batch'}), 400
+            data = {name: (None if np.isnan(value) else float(value)) for name, value in zip(FEATURE_COLUMNS, X[0])}
+            station_ids = list(station_ids) if station_ids is not None else [None]
+        else:
+            # Get input data from request
+            data = request.get_json()
             
-        if not hasattr(predictor, 'models') or not predictor.models:
-            print("❌ Models not available. Training...")
-            predictor.train_classification_models()
+            if not data:
+                return jsonify({'error': 'No input data provided'}), 400
             
-        predictions, probabilities, arima_forecasts = predictor.predict_threats(input_df)
+            if traffic_recorder is not None:
+                traffic_recorder.record('/predict', data)
+            
+            # Decode straight into the schema's feature buffer (defaults for absent fields)
+            try:
+                X = FEATURE_SCHEMA.decode(data)
+            except SchemaError as e:
+                return jsonify({'error': str(e), 'details': e.errors}), 400
+            station_ids = [data.get('station_id')]
+        
+        # '?mode=online' scores with the incrementally updated models
+        mode = request.args.get('mode', 'batch')
+        if mode not in ('batch', 'online'):
+            return jsonify({'error': f"Unknown mode '{mode}', expected 'batch' or 'online'"}), 400
+        
+        # '?uncertainty=true' adds Monte Carlo probability quantiles under sensor noise
+        uncertainty = request.args.get('uncertainty', 'false').lower() in ('1', 'true', 'yes')
+        try:
+            samples = int(request.args['samples']) if 'samples' in request.args else None
+        except ValueError:
+            return jsonify({'error': 'samples must be an integer'}), 400
+        if samples is not None and not 1 <= samples <= MAX_SAMPLES:
+            return jsonify({'error': f'samples must be between 1 and {MAX_SAMPLES}'}), 400
+        if uncertainty and mode == 'online':
+            return jsonify({'error': 'uncertainty is only available in batch mode'}), 400
+        
+        # '?alpha=0.1' adds split-conformal prediction sets at that error rate
+        try:
+            alpha = parse_alpha_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if alpha is not None and mode == 'online':
+            return jsonify({'error': 'prediction sets are only available in batch mode'}), 400
+        
+        # '?explain=true' adds per-feature attributions of each threat model
+        explain = request.args.get('explain', 'false').lower() in ('1', 'true', 'yes')
+        if explain and mode == 'online':
+            return jsonify({'error': 'explanations are only available in batch mode'}), 400
+        
+        observe_inputs('predict', X)
+        metrics.inc('blueguard_predictions_total', len(X), source='predict', mode=mode)
+        
+        if mode == 'online':
+            if online_models is None or not online_models.ready:
+                return jsonify({'error': 'Online learning is not enabled (set BLUEGUARD_ONLINE_LEARNING=1)'}), 409
+            probabilities = online_models.predict_proba(X)
+            predictions = {threat_name: (probs >= 0.5).astype(int) for threat_name, probs in probabilities.items()}
+        else:
+            # Make predictions
+            # Ensure all components are ready
+            if not hasattr(predictor, 'scaler') or predictor.scaler is None:
+                print("❌ Scaler not available. Reinitializing...")
+                predictor.load_and_preprocess_data()
+                
+            if not predictor.scoring_models():
+                print("❌ Models not available. Training...")
+                predictor.train_classification_models()
+                
+            predictions, probabilities, arima_forecasts = predictor.predict_threats(X, station_ids=station_ids)
         
         # Format response
         response = {
             'timestamp': datetime.now().isoformat(),
+            'mode': mode,
             'input_data': data,
             'predictions': {},
             'probabilities': {},
@@ -673,14 +820,7 @@ def predict_threats():
             prob = probabilities[threat_name][0] * 100  # Convert to percentage
             
             # Determine threat level
-            if prob < 25:
-                level = "Low"
-            elif prob < 50:
-                level = "Medium"
-            elif prob < 75:
-                level = "High"
-            else:
-                level = "Critical"
+            level = threat_level(prob)
             
             # Get recommendation
             recommendation = predictor._get_recommendation(threat_name, prob, level)
@@ -690,7 +830,75 @@ def predict_threats():
             response['threat_levels'][threat_name] = level
             response['recommendations'][threat_name] = recommendation
         
-        return jsonify(response)
+        if mode == 'online':
+            response['online_version'] = online_models.status()['version']
+        if alpha is not None:
+            try:
+                sets = predictor.prediction_sets(probabilities, alpha)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            response['conformal_alpha'] = alpha
+            response['prediction_sets'] = {
+                threat_name: [label for label, member in zip(SET_LABELS, threat_sets[0]) if member]
+                for threat_name, threat_sets in sets.items()
+            }
+        if uncertainty:
+            response['uncertainty'] = uncertainty_estimator.estimate(predictor, X[0], station_ids[0], samples=samples)
+        if explain:
+            try:
+                explanations = predictor.explain_threats(X, station_ids=station_ids)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 409
+            response['explanations'] = {threat_name: format_explanation(explanation)
+                                        for threat_name, explanation in explanations.items()}
+        
+        response_kind = negotiate(request.headers.get('Accept'))
+        if response_kind == JSON:
+            return jsonify(response)
+        if response_kind == ARROW:
+            body, content_type = encode_columns(score_columns(predictions, probabilities), ARROW)
+        else:
+            body, content_type = encode_object(response, response_kind)
+        return Response(body, content_type=content_type)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score many rows; JSON, Arrow IPC or MessagePack in and out (Content-Type / Accept)"""
+    try:
+        if predictor is None:
+            return jsonify({'error': 'Model not initialized'}), 500
+        
+        try:
+            X, station_ids = decode_features(request.get_data(), request.content_type)
+        except SchemaError as e:
+            return jsonify({'error': str(e), 'details': e.errors[:100]}), 400
+        except UnsupportedMediaType as e:
+            return jsonify({'error': str(e)}), 415
+        except ValueError as e:
+            return jsonify({'error': f'Invalid request body: {e}'}), 400
+        
+        observe_inputs('predict', X)
+        metrics.inc('blueguard_predictions_total', len(X), source='predict', mode='batch')
+        
+        predictions, probabilities, _ = predictor.predict_threats(
+            X, station_ids=station_ids, include_forecasts=False
+        )
+        columns = score_columns(predictions, probabilities)
+        
+        # '?alpha=0.1' adds a <threat>_set column of split-conformal prediction sets
+        try:
+            alpha = parse_alpha_arg()
+            if alpha is not None:
+                for threat_name, threat_sets in predictor.prediction_sets(probabilities, alpha).items():
+                    columns[f"{threat_name}_set"] = format_sets(threat_sets)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        body, content_type = encode_columns(columns, negotiate(request.headers.get('Accept')))
+        return Response(body, content_type=content_type)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -723,31 +931,71 @@ def get_threat_report():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def format_forecast(forecast):
+    """JSON-ready forecast: arrays rounded to lists, interval levels keyed in percent"""
+    formatted = {key: value for key, value in forecast.items() if key not in ('mean', 'intervals')}
+    formatted['mean'] = np.round(forecast['mean'], 4).tolist()
+    formatted['intervals'] = {
+        f"{level * 100:g}": {
+            'lower': np.round(bounds['lower'], 4).tolist(),
+            'upper': np.round(bounds['upper'], 4).tolist()
+        }
+        for level, bounds in forecast['intervals'].items()
+    }
+    return formatted
+
 @app.route('/forecast', methods=['GET'])
 def get_forecast():
-    """Get time series forecasts"""
+    """
+    Get time series forecasts with prediction intervals
+    
+    Query arguments: horizon (days, default 30), targets (comma separated
+    ARIMA targets), levels (interval coverages in percent, default 80,95)
+    and stations (comma separated station ids, served by the per-station
+    models from batch_forecast.py).
+    """
     try:
         if predictor is None:
             return jsonify({'error': 'Model not initialized'}), 500
         
-        if not hasattr(predictor, 'arima_models'):
+        try:
+            horizon = int(request.args.get('horizon', DEFAULT_FORECAST_HORIZON))
+            levels = parse_list_arg('levels')
+            levels = [float(level) for level in levels] if levels else [level * 100 for level in DEFAULT_INTERVAL_LEVELS]
+        except ValueError:
+            return jsonify({'error': 'horizon must be an integer and levels numbers'}), 400
+        if not all(0 < level < 100 for level in levels):
+            return jsonify({'error': 'levels must be percentages between 0 and 100'}), 400
+        targets = parse_list_arg('targets')
+        stations = parse_list_arg('stations')
+        if stations is None and not predictor.forecast_targets():
             return jsonify({'error': 'ARIMA models not available'}), 500
         
-        # Get predictions to trigger ARIMA forecasts
-        predictions, probabilities, arima_forecasts = predictor.predict_threats()
-        
-        # Format ARIMA forecasts
-        formatted_forecasts = {}
-        for target_name, forecast in arima_forecasts.items():
-            if hasattr(forecast, '__iter__'):
-                # Convert forecast to list and round values
-                formatted_forecasts[target_name] = [round(float(val), 4) for val in forecast]
-            else:
-                formatted_forecasts[target_name] = [round(float(forecast), 4)]
+        if stations is not None:
+            # Per-station forecasts from the batched engine (batch_forecast.py)
+            station_forecaster = predictor.active_station_forecaster()
+            if station_forecaster is None:
+                return jsonify({'error': 'Per-station forecasts not available, fit them with batch_forecast.py'}), 500
+            if not 1 <= horizon <= MAX_FORECAST_HORIZON:
+                return jsonify({'error': f'horizon must be between 1 and {MAX_FORECAST_HORIZON} days'}), 400
+            station_forecasts = station_forecaster.station_forecasts(
+                stations, targets, horizon, [level / 100 for level in levels]
+            )
+            formatted_forecasts = {
+                station: {target_name: format_forecast(forecast) for target_name, forecast in forecasts.items()}
+                for station, forecasts in station_forecasts.items()
+            }
+        else:
+            try:
+                forecasts = predictor.forecast(targets, horizon, [level / 100 for level in levels])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            formatted_forecasts = {target_name: format_forecast(forecast) for target_name, forecast in forecasts.items()}
         
         response = {
             'timestamp': datetime.now().isoformat(),
-            'forecast_horizon': 30,  # 30-day forecast
+            'forecast_horizon': horizon,
+            'levels': levels,
             'forecasts': formatted_forecasts
         }
         
@@ -756,6 +1004,119 @@ def get_forecast():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/series', methods=['GET'])
+def get_series():
+    """
+    Downsampled history and forecast of one column for the dashboard charts
+
+    Query arguments: column (any numeric column of the data, e.g.
+    sea_level_m), start and end (ISO timestamps, default the whole data),
+    station (one station id; without it the stations are averaged per
+    timestamp), max_points (default 500; at least 3 for lttb, 4 for minmax),
+    method (lttb or minmax), forecast_days (default 0; columns forecast by an
+    ARIMA target only) and levels (interval coverages in percent, default
+    80,95).
+    """
+    try:
+        if predictor is None or predictor.data is None:
+            return jsonify({'error': 'Historical data not available'}), 500
+
+        data = predictor.data
+        column = request.args.get('column')
+        if column not in data.columns or column == 'timestamp' or not pd.api.types.is_numeric_dtype(data[column]):
+            numeric = [name for name in data.select_dtypes(include=[np.number]).columns]
+            return jsonify({'error': f"column must be one of {numeric}"}), 400
+        method = request.args.get('method', 'lttb')
+        if method not in DOWNSAMPLE_METHODS:
+            return jsonify({'error': f"method must be one of {list(DOWNSAMPLE_METHODS)}"}), 400
+        try:
+            max_points = int(request.args.get('max_points', SERIES_DEFAULT_POINTS))
+            forecast_days = int(request.args.get('forecast_days', 0))
+            levels = parse_list_arg('levels')
+            levels = [float(level) for level in levels] if levels else [level * 100 for level in DEFAULT_INTERVAL_LEVELS]
+        except ValueError:
+            return jsonify({'error': 'max_points and forecast_days must be integers and levels numbers'}), 400
+        if not MIN_POINTS[method] <= max_points <= SERIES_MAX_POINTS:
+            return jsonify({'error': f'max_points must be between {MIN_POINTS[method]} and {SERIES_MAX_POINTS} for {method}'}), 400
+        if not 0 <= forecast_days <= MAX_FORECAST_HORIZON:
+            return jsonify({'error': f'forecast_days must be between 0 and {MAX_FORECAST_HORIZON}'}), 400
+        if not all(0 < level < 100 for level in levels):
+            return jsonify({'error': 'levels must be percentages between 0 and 100'}), 400
+        try:
+            start = pd.Timestamp(request.args['start']) if request.args.get('start') else None
+            end = pd.Timestamp(request.args['end']) if request.args.get('end') else None
+        except ValueError:
+            return jsonify({'error': 'start and end must be ISO timestamps'}), 400
+        # The data timestamps are naive UTC; JS toISOString() sends '...Z'
+        start, end = [value.tz_convert('UTC').tz_localize(None) if value is not None and value.tzinfo is not None else value
+                      for value in (start, end)]
+        if start is not None and end is not None and start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+
+        station = request.args.get('station')
+        rows = np.ones(len(data), dtype=bool)
+        if station:
+            rows &= (data['station_id'].astype(str) == station).to_numpy()
+            if not rows.any():
+                return jsonify({'error': f"Unknown station '{station}'"}), 404
+        if start is not None:
+            rows &= (data['timestamp'] >= start).to_numpy()
+        if end is not None:
+            rows &= (data['timestamp'] <= end).to_numpy()
+
+        history = data.loc[rows, ['timestamp', column]].dropna()
+        # One value per timestamp: the station's own, or the mean over the stations
+        history = history.groupby('timestamp', sort=True)[column].mean()
+        timestamps = history.index.to_numpy()
+        values = history.to_numpy(dtype=np.float64)
+        kept = downsample(timestamps.astype('datetime64[ns]').astype(np.int64), values, max_points, method)
+
+        response = {
+            'timestamp': datetime.now().isoformat(),
+            'column': column,
+            'station': station,
+            'method': method,
+            'history': {
+                'points': len(values),
+                'returned': len(kept),
+                'timestamps': [pd.Timestamp(value).isoformat() for value in timestamps[kept]],
+                'values': np.round(values[kept], 4).tolist()
+            }
+        }
+
+        target_name = next((name for name, target_col in ARIMA_TARGETS.items() if target_col == column), None)
+        if forecast_days:
+            if target_name is None:
+                return jsonify({'error': f"No forecast for {column}, expected one of {list(ARIMA_TARGETS.values())}"}), 400
+            level_fractions = [level / 100 for level in levels]
+            if station:
+                station_forecaster = predictor.active_station_forecaster()
+                if station_forecaster is None:
+                    return jsonify({'error': 'Per-station forecasts not available, fit them with batch_forecast.py'}), 500
+                forecast = station_forecaster.station_forecasts([station], [target_name], forecast_days,
+                                                                level_fractions).get(station, {}).get(target_name)
+            else:
+                forecast = predictor.forecast([target_name], forecast_days, level_fractions).get(target_name)
+            if forecast is None:
+                return jsonify({'error': f"Forecast for {target_name} not available"}), 500
+
+            # Downsample the mean path and take the interval bounds at the same days
+            mean = np.asarray(forecast['mean'], dtype=np.float64)
+            kept = downsample(np.arange(len(mean)), mean, max_points, method)
+            forecast = dict(forecast)
+            forecast['dates'] = [forecast['dates'][i] for i in kept] if forecast['dates'] is not None else None
+            forecast['mean'] = mean[kept]
+            forecast['intervals'] = {
+                level: {'lower': np.asarray(bounds['lower'])[kept], 'upper': np.asarray(bounds['upper'])[kept]}
+                for level, bounds in forecast['intervals'].items()
+            }
+            response['forecast'] = dict(format_forecast(forecast), target=target_name, points=len(mean), returned=len(kept))
+
+        return jsonify(response)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/model-info', methods=['GET'])
 def get_model_info():
     """Get information about the loaded models"""
@@ -765,24 +1126,155 @@ def get_model_info():
         
         info = {
             'timestamp': datetime.now().isoformat(),
-            'models_loaded': list(predictor.models.keys()) if hasattr(predictor, 'models') else [],
-            'arima_models_loaded': list(predictor.arima_models.keys()) if hasattr(predictor, 'arima_models') else [],
+            'models_loaded': list(predictor.scoring_models()),
+            'arima_models_loaded': [name for name in ARIMA_TARGETS if name in predictor.forecast_targets()],
             'scaler_loaded': predictor.scaler is not None,
-            'feature_columns': [
-                'sea_level_m', 'wave_height_m', 'wind_speed_kmph', 'rainfall_mm',
-                'sst_celsius', 'chlorophyll_mg_m3', 'turbidity_index', 'sea_level_anomaly_m',
-                'storm_surge_risk_index', 'coastal_erosion_risk', 'algal_bloom_risk_index',
-                'pollution_risk_index', 'cyclone_distance_km', 'ai_confidence_score',
-                'population_exposed', 'fisherfolk_activity', 'infrastructure_exposure_index',
-                'blue_carbon_loss_ton_co2'
-            ]
+            'feature_columns': FEATURE_COLUMNS,
+            'feature_schema': FEATURE_SCHEMA.to_dict()
+        }
+        
+        # Split-conformal calibration of the current models and its held-out coverage
+        calibrations = {threat_name: predictor.conformal_calibration(threat_name) for threat_name in predictor.scoring_models()}
+        info['conformal'] = {
+            threat_name: {key: calibration[key] for key in ('alphas', 'rows', 'label_rows', 'coverage')}
+            for threat_name, calibration in calibrations.items() if calibration is not None
         }
         
+        # Held-out permutation importance of the current models, largest first
+        info['feature_importance'] = {}
+        for threat_name in predictor.scoring_models():
+            result = predictor.current_permutation_importance(threat_name)
+            if result is None:
+                continue
+            ranked = sorted(result['importances'].items(), key=lambda item: item[1]['mean'], reverse=True)
+            info['feature_importance'][threat_name] = {
+                'method': 'permutation',
+                'model': result['model'],
+                'baseline_accuracy': round(result['baseline_accuracy'], 4),
+                'rows': result['rows'],
+                'repeats': result['repeats'],
+                'importances': [{'feature': feature, 'mean': round(stats['mean'], 4), 'std': round(stats['std'], 4)}
+                                for feature, stats in ranked]
+            }
+        
         return jsonify(info)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/robustness', methods=['GET'])
+def get_robustness():
+    """
+    Accuracy of each threat model over several random train/test splits
+    
+    Query arguments: threats (comma separated, default all) and refresh=true
+    to recompute results already cached for the current model versions.
+    """
+    try:
+        if predictor is None or predictor.data is None:
+            return jsonify({'error': 'Model not initialized'}), 500
+        if not predictor.models and predictor.shared_params is not None:
+            return jsonify({'error': SHARED_PARAMS_REFIT_ERROR}), 409
+        if not predictor.models:
+            return jsonify({'error': 'Model not initialized'}), 500
+        
+        threats = parse_list_arg('threats')
+        unknown = [name for name in threats or [] if name not in predictor.models]
+        if unknown:
+            return jsonify({'error': f"Unknown threats {unknown}, expected any of {list(predictor.models)}"}), 400
+        refresh = request.args.get('refresh', 'false').lower() in ('1', 'true', 'yes')
+        
+        started = time.perf_counter()
+        try:
+            report = predictor.evaluate_model_robustness(threats=threats, refresh=refresh)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'timestamp': datetime.now().isoformat(),
+            'elapsed_s': round(time.perf_counter() - started, 3),
+            'robustness': report
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/conformal/coverage', methods=['POST'])
+def conformal_coverage():
+    """
+    Coverage of the conformal prediction sets on a batch of readings
+    
+    Takes the same bodies as /predict/batch. The true labels are derived from
+    the readings with the training label rules. Returns, per threat and
+    calibrated alpha, the empirical coverage against the 1 - alpha target,
+    the coverage per label and the set sizes.
+    """
+    try:
+        if predictor is None:
+            return jsonify({'error': 'Model not initialized'}), 500
+        
+        try:
+            X, station_ids = decode_features(request.get_data(), request.content_type)
+        except SchemaError as e:
+            return jsonify({'error': str(e), 'details': e.errors[:100]}), 400
+        except UnsupportedMediaType as e:
+            return jsonify({'error': str(e)}), 415
+        except ValueError as e:
+            return jsonify({'error': f'Invalid request body: {e}'}), 400
+        
+        labels = derive_threat_labels(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+        _, probabilities, _ = predictor.predict_threats(X, station_ids=station_ids, include_forecasts=False)
+        
+        report = {}
+        for threat_name, proba in probabilities.items():
+            calibration = predictor.conformal_calibration(threat_name)
+            if calibration is not None:
+                report[threat_name] = coverage_report(proba, labels[THREAT_TARGETS[threat_name]].to_numpy(), calibration)
+        if not report:
+            return jsonify({'error': 'No conformal calibration for the current models, retrain to calibrate'}), 409
+        
+        return jsonify({
+            'timestamp': datetime.now().isoformat(),
+            'rows': len(X),
+            'coverage': report
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def format_explanation(explanation, row=0):
+    """JSON-ready attributions of one row, largest contributions first"""
+    contributions = explanation['contributions'][row]
+    order = np.argsort(-np.abs(contributions))
+    return {
+        'model': explanation['model'][row],
+        'output': explanation['output'][row],
+        'base': round(float(explanation['base'][row]), 4),
+        'value': round(float(explanation['value'][row]), 4),
+        # A list, since JSON object keys are re-sorted on output
+        'contributions': [{'feature': FEATURE_COLUMNS[i], 'contribution': round(float(contributions[i]), 4)} for i in order]
+    }
+
+def parse_alpha_arg():
+    """'?alpha=' conformal error rate as a float, or None when absent; raises ValueError"""
+    value = request.args.get('alpha')
+    if value is None:
+        return None
+    try:
+        alpha = float(value)
+    except ValueError:
+        raise ValueError('alpha must be a number')
+    if not 0 < alpha < 1:
+        raise ValueError('alpha must be between 0 and 1')
+    return alpha
+
+def parse_list_arg(name):
+    """Comma separated query argument as a list, or None when absent"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
 @app.route('/retrain', methods=['POST'])
 def retrain_models():
     """Retrain the models with new data"""
@@ -790,35 +1282,347 @@ def retrain_models():
         if predictor is None:
             return jsonify({'error': 'Model not initialized'}), 500
         
-        # Ensure data is loaded
-        if not hasattr(predictor, 'data') or predictor.data is None:
-            print("🔄 Loading and preprocessing data...")
-            predictor.load_and_preprocess_data()
+        # Retrain models ('?selection=halving' trains with successive halving)
+        selection = request.args.get('selection')
+        if selection and selection not in MODEL_SELECTION_MODES:
+            return jsonify({'error': f"Unknown selection '{selection}', expected one of {list(MODEL_SELECTION_MODES)}"}), 400
+        
+        # '?threats=cyclone,erosion' / '?targets=sea_level' retrain just those
+        # components; otherwise only components whose data changed are retrained
+        threats = parse_list_arg('threats')
+        targets = parse_list_arg('targets')
+        unknown = [name for name in threats or [] if name not in THREAT_TARGETS]
+        unknown += [name for name in targets or [] if name not in ARIMA_TARGETS]
+        if unknown:
+            return jsonify({'error': f"Unknown components {unknown}, expected threats from {list(THREAT_TARGETS)} "
+                                     f"or targets from {list(ARIMA_TARGETS)}"}), 400
+        force = request.args.get('force', 'false').lower() in ('1', 'true', 'yes')
+        # Refitting the scaler turns compact mode off; it is re-enabled after training
+        compact = predictor.compact_inference
+        
+        # Workers scoring with shared parameters unpickle the models only while retraining
+        released = predictor.shared_params is not None and not predictor.models
+        if released:
+            predictor.load_models()
+        
+        # Always reload so new rows in the data file are picked up
+        print("🔄 Loading and preprocessing data...")
+        predictor.load_and_preprocess_data()
+        
+        plan = predictor.plan_retrain(threats=threats, targets=targets, force=force)
+        print(f"🔄 Retrain plan: {plan}")
+        
+        if plan['threats']:
+            print("🔄 Training classification models...")
+            # Retraining every threat also refits the scaler; a subset keeps it
+            threat_subset = None if len(plan['threats']) == len(THREAT_TARGETS) else list(plan['threats'])
+            predictor.train_classification_models(selection=selection, threats=threat_subset)
+        
+        if plan['targets']:
+            print("🔄 Training ARIMA models...")
+            target_subset = None if len(plan['targets']) == len(ARIMA_TARGETS) else list(plan['targets'])
+            predictor.train_arima_models(targets=target_subset)
+        
+        if plan['threats'] or plan['targets']:
+            # Save models
+            print("💾 Saving models...")
+            predictor.save_models()
         
-        # Retrain models
-        print("🔄 Training classification models...")
-        predictor.train_classification_models()
+        if compact:
+            predictor.enable_compact_inference()
         
-        print("🔄 Training ARIMA models...")
-        predictor.train_arima_models()
+        if predictor.shared_params is not None and (plan['threats'] or plan['targets']):
+            # Other worker processes switch to the new version on their next request
+            version = predictor.publish_shared_params(predictor.shared_params.directory)
+            print(f"🔗 Published shared parameters {version}")
+        if released:
+            predictor.release_models()
         
-        # Save models
-        print("💾 Saving models...")
-        predictor.save_models()
+        # A refit scaler means a new reference distribution
+        if drift_monitors and predictor.drift_reference is not drift_monitors['predict'].reference:
+            initialize_drift_monitoring()
         
+        retrained = bool(plan['threats'] or plan['targets'])
         response = {
             'timestamp': datetime.now().isoformat(),
-            'message': 'Models retrained and saved successfully',
-            'models_updated': list(predictor.models.keys()) if hasattr(predictor, 'models') else [],
+            'message': 'Models retrained and saved successfully' if retrained else 'No data changes, models kept',
+            'models_updated': list(plan['threats']) + [f"arima:{name}" for name in plan['targets']],
+            'reasons': {**plan['threats'], **{f"arima:{name}": reason for name, reason in plan['targets'].items()}},
+            'skipped': plan['skipped'],
+            'versions': {component: profile.get('version') for component, profile in predictor.data_versions.items()},
+            'model_selection': {
+                threat_name: {
+                    'selection': report['selection'],
+                    'best_model': report['best_model'],
+                    'test_accuracy': round(report['test_accuracy'], 4),
+                    'elapsed_s': round(report['elapsed_s'], 3)
+                }
+                for threat_name, report in predictor.selection_report.items()
+                if threat_name in plan['threats']
+            },
             'scaler_ready': hasattr(predictor, 'scaler') and predictor.scaler is not None,
             'data_loaded': hasattr(predictor, 'data') and predictor.data is not None
         }
+        if predictor.training_cache is not None:
+            response['training_cache'] = predictor.training_cache.stats()
+        if predictor.shared_params is not None:
+            response['shared_params_version'] = predictor.shared_params.version
         
         return jsonify(response)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/drift', methods=['GET'])
+def get_drift():
+    """Per-feature drift of live inputs against the training reference"""
+    try:
+        if not drift_monitors:
+            return jsonify({'error': 'Drift monitoring not initialized'}), 500
+        
+        source = request.args.get('source')
+        if source and source not in drift_monitors:
+            return jsonify({'error': f"Unknown source '{source}', expected one of {list(drift_monitors)}"}), 400
+        
+        sources = [source] if source else list(drift_monitors)
+        return jsonify({
+            'timestamp': datetime.now().isoformat(),
+            'sources': {name: drift_monitors[name].report() for name in sources}
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/percentiles', methods=['GET'])
+def get_percentiles():
+    """Approximate feature percentiles from the training data sketches"""
+    try:
+        if predictor is None or predictor.feature_sketches is None:
+            return jsonify({'error': 'Feature sketches not available'}), 500
+        
+        sketches = predictor.feature_sketches
+        features = parse_list_arg('features') or FEATURE_COLUMNS
+        unknown = [name for name in features if name not in sketches.features]
+        if unknown:
+            return jsonify({'error': f"Unknown features {unknown}"}), 400
+        try:
+            qs = [float(q) for q in parse_list_arg('q') or ['0.05', '0.25', '0.5', '0.75', '0.95']]
+        except ValueError:
+            return jsonify({'error': 'q must be a comma separated list of numbers between 0 and 1'}), 400
+        if any(q < 0 or q > 1 for q in qs):
+            return jsonify({'error': 'q must be a comma separated list of numbers between 0 and 1'}), 400
+        
+        station = request.args.get('station')
+        if station and station not in sketches.stations:
+            return jsonify({'error': f"Unknown station '{station}'"}), 404
+        
+        return jsonify({
+            'station': station,
+            'stations_available': len(sketches.stations),
+            'features': sketches.summary(features, qs, station)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def require_online_models():
+    """Error response when online learning is disabled, else None"""
+    if online_models is None:
+        return jsonify({'error': 'Online learning is not enabled (set BLUEGUARD_ONLINE_LEARNING=1)'}), 409
+    return None
+
+@app.route('/online/update', methods=['POST'])
+def online_update():
+    """Update the online models with labelled (or self-labelling) observations"""
+    try:
+        disabled = require_online_models()
+        if disabled:
+            return disabled
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No observations provided'}), 400
+        
+        summary = online_models.update(observations_frame(data))
+        summary['timestamp'] = datetime.now().isoformat()
+        return jsonify(summary)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/online/checkpoint', methods=['POST'])
+def online_checkpoint():
+    """Checkpoint the online models now"""
+    try:
+        disabled = require_online_models()
+        if disabled:
+            return disabled
+        return jsonify({'version': online_models.checkpoint()})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/online/rollback', methods=['POST'])
+def online_rollback():
+    """Roll the online models back to a checkpoint (the previous one by default)"""
+    try:
+        disabled = require_online_models()
+        if disabled:
+            return disabled
+        
+        options = request.get_json(silent=True) or {}
+        version = online_models.rollback(options.get('version'))
+        return jsonify({'message': f'Rolled back to {version}', 'status': online_models.status()})
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/online/status', methods=['GET'])
+def online_status():
+    """State of the online models and their checkpoints"""
+    try:
+        disabled = require_online_models()
+        if disabled:
+            return disabled
+        return jsonify(online_models.status())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models/registry', methods=['GET'])
+def model_registry_status():
+    """Per-station model registry: cache statistics and registered stations"""
+    try:
+        if predictor is None:
+            return jsonify({'error': 'Model not initialized'}), 500
+        if predictor.model_registry is None:
+            return jsonify({'error': 'Model registry disabled, set BLUEGUARD_MODEL_REGISTRY to a directory'}), 404
+        
+        registry = predictor.model_registry
+        stations = registry.stations()
+        return jsonify({
+            'cache': registry.stats(),
+            'stations': {
+                station: {threat_name: registry.resolve(station, threat_name)
+                          for threat_name in THREAT_TARGETS if registry.versions(station, threat_name)}
+                for station in stations
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models/registry/train', methods=['POST'])
+def model_registry_train():
+    """Fit and publish per-station models (?threats=cyclone,erosion&min_rows=200)"""
+    try:
+        if predictor is None:
+            return jsonify({'error': 'Model not initialized'}), 500
+        if predictor.model_registry is None:
+            return jsonify({'error': 'Model registry disabled, set BLUEGUARD_MODEL_REGISTRY to a directory'}), 404
+        if predictor.compact_inference:
+            return jsonify({'error': 'Compact inference released the training data, unset BLUEGUARD_COMPACT_INFERENCE to train station models'}), 409
+        if not predictor.models and predictor.shared_params is not None:
+            return jsonify({'error': SHARED_PARAMS_REFIT_ERROR}), 409
+        
+        threats = parse_list_arg('threats')
+        unknown = [name for name in threats or [] if name not in predictor.models]
+        if unknown:
+            return jsonify({'error': f'Unknown threats {unknown}, expected any of {list(predictor.models)}'}), 400
+        try:
+            min_rows = int(request.args.get('min_rows', 200))
+        except ValueError:
+            return jsonify({'error': 'min_rows must be an integer'}), 400
+        
+        published = predictor.train_station_models(predictor.model_registry, threats, min_rows)
+        return jsonify({
+            'status': 'success',
+            'timestamp': datetime.now().isoformat(),
+            'published': published
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def check_debug_access():
+    """Return an error response if the debug endpoints are disabled or the token is wrong"""
+    token = os.environ.get('BLUEGUARD_DEBUG_TOKEN')
+    if not token:
+        return jsonify({'error': 'Not found'}), 404
+    supplied = request.headers.get('X-Debug-Token', '')
+    if not hmac.compare_digest(supplied, token):
+        return jsonify({'error': 'Invalid debug token'}), 403
+    return None
+
+@app.route('/debug/profile', methods=['GET', 'POST', 'DELETE'])
+def debug_profile():
+    """Arm, inspect or disarm on-demand profiling of the live predictor"""
+    denied = check_debug_access()
+    if denied:
+        return denied
+    
+    try:
+        if predictor is None:
+            return jsonify({'error': 'Model not initialized'}), 500
+        
+        if request.method == 'DELETE':
+            profiler_manager.disarm(predictor)
+            return jsonify(profiler_manager.status())
+        
+        if request.method == 'GET':
+            output_format = request.args.get('format')
+            clear = request.args.get('clear', 'false').lower() == 'true'
+            results = profiler_manager.get_results(output_format, clear=clear)
+            if request.args.get('raw', 'false').lower() == 'true':
+                # Plain text output that can be piped straight into flamegraph tools
+                body = '\n'.join(r['output'] for r in results)
+                return app.response_class(body, mimetype='text/plain')
+            status = profiler_manager.status()
+            status['results'] = results
+            return jsonify(status)
+        
+        options = request.get_json(silent=True) or {}
+        target = options.get('target', 'predict')
+        functions = options.get('functions') or PROFILE_TARGETS.get(target)
+        if not functions:
+            return jsonify({'error': f"Unknown profiling target '{target}'"}), 400
+        mode = options.get('mode', 'deterministic')
+        interval = float(options.get('interval_ms', 5)) / 1000
+        
+        if options.get('attach'):
+            # Sample a job that is already running, e.g. a long /retrain
+            attached = profiler_manager.attach(
+                functions,
+                duration=float(options.get('duration', 10)),
+                interval=interval
+            )
+            if not attached:
+                return jsonify({'error': 'No running thread found for ' + ', '.join(functions)}), 409
+            return jsonify({'message': f'Sampling {attached} running thread(s)', 'functions': functions})
+        
+        status = profiler_manager.arm(
+            predictor,
+            functions,
+            mode=mode,
+            count=int(options.get('count', 1)),
+            interval=interval
+        )
+        return jsonify(status)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     print("Initializing Coastal Threat Prediction API...")
     
@@ -838,12 +1642,25 @@ if __name__ == '__main__':
         print("   GET  /threat-report             - Threat analysis")
         print("   GET  /forecast                  - Time series forecasts")
         print("   POST /predict                   - Make predictions")
+        print("   POST /predict/batch             - Score many rows (JSON, Arrow, MessagePack)")
         print("   POST /retrain                   - Retrain models")
+        print("   GET  /drift                     - Input drift vs training data")
+        print("   GET  /metrics                   - Prometheus metrics")
+        print("   GET  /percentiles               - Feature percentiles")
+        if online_models is not None:
+            print("   🔁 ONLINE LEARNING ENDPOINTS:")
+            print("   POST /online/update             - Learn from new observations")
+            print("   POST /online/checkpoint         - Checkpoint online models")
+            print("   POST /online/rollback           - Roll back to a checkpoint")
+            print("   GET  /online/status             - Online model status")
         print("   🚨 CRISIS MONITORING ENDPOINTS:")
         print("   GET  /crisis-status             - Get current crisis status")
         print("   GET  /crisis-data/info          - Get crisis data information")
         print("   POST /crisis-monitoring/start   - Start crisis monitoring")
         print("   POST /crisis-monitoring/stop    - Stop crisis monitoring")
+        if os.environ.get('BLUEGUARD_DEBUG_TOKEN'):
+            print("   🔬 DEBUG ENDPOINTS:")
+            print("   GET/POST/DELETE /debug/profile  - On-demand profiling")
         
         # Run the Flask app
         app.run(
@@ -0,0 +1,127 @@
+"""
+Fast ARIMA order selection.
+
+Fitting every (p, q) candidate by maximum likelihood is the slow part of
+training the ARIMA models. Candidates are first ranked by the AIC of a
+Hannan-Rissanen fit. A long autoregression estimates the innovations, then one
+least-squares regression per order, on lagged values and lagged innovations,
+gives its residual variance. Ranking the whole grid costs a few small lstsq
+calls.
+
+Only the best-ranked orders are then fitted by MLE, best ranked first, until a
+wall-clock budget runs out; the best fit found so far is returned. The
+previous version's order is fitted before them, starting from its fitted
+parameters.
+"""
+
+import time
+import warnings
+
+import numpy as np
+
+DEFAULT_P_VALUES = range(0, 3)
+DEFAULT_Q_VALUES = range(0, 3)
+DEFAULT_TOP_K = 3
+DEFAULT_BUDGET_S = 30.0
+# The differencing order from the ADF tests is reused (see data_versions.change_reason)
+# until the series grows by half or its mean moves a full standard deviation
+D_RECHECK_THRESHOLDS = {'growth': 0.5, 'feature_drift': 1.0}
+
+
+def differencing_order(values):
+    """0, 1 or 2: differences needed before an ADF test rejects a unit root at 5%"""
+    from statsmodels.tsa.stattools import adfuller
+
+    if adfuller(values)[1] <= 0.05:
+        return 0
+    return 1 if adfuller(np.diff(values))[1] <= 0.05 else 2
+
+
+def _lags(x, lags, start):
+    """Columns x[t-1], ..., x[t-lags] for t = start .. len(x) - 1"""
+    return np.column_stack([x[start - lag:len(x) - lag] for lag in range(1, lags + 1)]) if lags else np.empty((len(x) - start, 0))
+
+
+def rank_orders(values, d, pq_pairs):
+    """
+    Approximate AIC of each (p, d, q) by Hannan-Rissanen regression
+
+    The regressions share one sample (after the longest lag), so their AICs
+    are comparable. A constant is included when d == 0, as ARIMA does by
+    default. Returns [(aic, (p, d, q))] sorted best first.
+    """
+    y = np.diff(np.asarray(values, dtype=np.float64), n=d)
+    n = len(y)
+    max_p = max(p for p, _ in pq_pairs)
+    max_q = max(q for _, q in pq_pairs)
+    constant = np.ones((n, 1)) if d == 0 else np.empty((n, 0))
+
+    # Long autoregression for the innovations
+    m = max(min(int(np.ceil(10 * np.log10(n))), n // 4), max_p + max_q, 1)
+    design = np.hstack([_lags(y, m, m), constant[m:]])
+    coef = np.linalg.lstsq(design, y[m:], rcond=None)[0]
+    innovations = np.zeros(n)
+    innovations[m:] = y[m:] - design @ coef
+
+    start = m + max(max_p, max_q)
+    target = y[start:]
+    n_eff = len(target)
+    ranked = []
+    for p, q in pq_pairs:
+        design = np.hstack([_lags(y, p, start), _lags(innovations, q, start), constant[start:]])
+        residual = target - design @ np.linalg.lstsq(design, target, rcond=None)[0] if design.shape[1] else target
+        rss = max(float(residual @ residual), np.finfo(float).tiny)
+        # Regression coefficients plus the innovation variance
+        ranked.append((n_eff * np.log(rss / n_eff) + 2 * (design.shape[1] + 1), (p, d, q)))
+    ranked.sort()
+    return ranked
+
+
+def search_order(values, d, fit, pq_pairs=None, top_k=DEFAULT_TOP_K, budget_s=DEFAULT_BUDGET_S,
+                 previous_order=None, previous_params=None):
+    """
+    Rank the (p, q) grid, then MLE-fit the top_k orders within budget_s seconds
+
+    fit(order, start_params) fits one order (start_params may be None) and
+    returns a result with .aic. The first fit always runs; later ones only
+    while the budget lasts. previous_order is fitted first, warm started
+    from previous_params, when its d matches. Returns (result, order, report)
+    with result None if every fit failed.
+    """
+    if pq_pairs is None:
+        pq_pairs = [(p, q) for p in DEFAULT_P_VALUES for q in DEFAULT_Q_VALUES]
+    started = time.perf_counter()
+    ranked = rank_orders(values, d, pq_pairs)
+    candidates = [order for _, order in ranked[:top_k]]
+    previous_order = tuple(previous_order) if previous_order is not None else None
+    if previous_order is not None and previous_order[1] == d:
+        # Warm started, so the cheapest fit and the likeliest winner: fit it first
+        candidates = [previous_order] + [order for order in candidates if order != previous_order]
+
+    best_result, best_order = None, None
+    fitted, failed = [], []
+    timed_out = False
+    for order in candidates:
+        if best_result is not None and time.perf_counter() - started > budget_s:
+            timed_out = True
+            break
+        start_params = previous_params if order == previous_order else None
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                result = fit(order, start_params)
+        except Exception:
+            failed.append(order)
+            continue
+        fitted.append((order, float(result.aic)))
+        if best_result is None or result.aic < best_result.aic:
+            best_result, best_order = result, order
+
+    report = {
+        'ranked': [(order, round(float(aic), 3)) for aic, order in ranked],
+        'fitted': fitted,
+        'failed': failed,
+        'timed_out': timed_out,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    return best_result, best_order, report
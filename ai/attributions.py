@@ -0,0 +1,195 @@
+"""
+Per-row feature attributions for the threat classifiers.
+
+Each model is explained in the space it computes in, on scaled features:
+
+- LogisticRegression: exact linear contributions coef_j * x_j to the log-odds,
+  relative to the training mean (0 after scaling); base = intercept.
+- RandomForest / GradientBoosting: path contributions. Along a row's
+  decision path, each split's change in node value is credited to the split
+  feature. The node-to-feature credit matrix is built once per model, so a
+  batch costs one decision_path and one sparse matrix product. Forests
+  explain the probability, boosting the log-odds.
+- SVC (and any other model with predict_proba): sampled Shapley values. A
+  fixed set of feature permutations (each with its reverse) switches
+  features one at a time from the training mean to the row's value, and
+  every intermediate point for a block of rows is scored in one
+  predict_proba call.
+
+The base is taken from the model itself: the intercept, the root node values
+(plus the prior log-odds for boosting) or the score of the training mean.
+Every batch is checked to satisfy base + sum(contributions) = explained value,
+so a change in the estimators' internals fails loudly.
+Results are cached per model version and input row (hash of its bytes) in an
+LRU, so a repeated reading is not explained twice.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+DEFAULT_CACHE_ENTRIES = 10_000
+DEFAULT_PERMUTATIONS = 32
+# Rows per predict_proba call in sampled Shapley (rows * permutations * (features + 1) points)
+SHAPLEY_BLOCK_ROWS = 64
+# Largest relative gap between base + sum(contributions) and the model output
+ADDITIVITY_TOLERANCE = 1e-6
+
+
+def _credit_matrix(tree, node_values, n_features):
+    """(nodes, features) sparse matrix: each node's value change from its parent, credited to the parent's split feature"""
+    structure = tree.tree_
+    parents = np.full(structure.node_count, -1)
+    internal = np.nonzero(structure.children_left >= 0)[0]
+    parents[structure.children_left[internal]] = internal
+    parents[structure.children_right[internal]] = internal
+    children = np.nonzero(parents >= 0)[0]
+    return sparse.csr_matrix(
+        (node_values[children] - node_values[parents[children]], (children, structure.feature[parents[children]])),
+        shape=(structure.node_count, n_features),
+    )
+
+
+def _tree_plan(model):
+    """(path function, stacked credit matrix, base, output) for a fitted forest or boosting model"""
+    n_features = model.n_features_in_
+    if hasattr(model, 'learning_rate'):
+        trees = list(model.estimators_[:, 0])
+        credits = sparse.vstack([_credit_matrix(tree, tree.tree_.value[:, 0, 0] * model.learning_rate, n_features)
+                                 for tree in trees]).tocsr()
+        # Initial log-odds of the class prior plus every tree's root value
+        prior = 0.0 if isinstance(model.init_, str) else model.init_.class_prior_[1]
+        init = 0.0 if isinstance(model.init_, str) else np.log(prior / (1 - prior))
+        base = init + model.learning_rate * sum(tree.tree_.value[0, 0, 0] for tree in trees)
+        return (lambda X: sparse.hstack([tree.decision_path(X) for tree in trees]).tocsr()), credits, base, 'log_odds'
+    credits = []
+    roots = []
+    for tree in model.estimators_:
+        value = tree.tree_.value[:, 0, :]
+        credits.append(_credit_matrix(tree, value[:, 1] / value.sum(axis=1), n_features))
+        roots.append(value[0, 1] / value[0].sum())
+    credits = sparse.vstack(credits).tocsr() / len(model.estimators_)
+    return (lambda X: model.decision_path(X)[0]), credits, float(np.mean(roots)), 'probability'
+
+
+def _sampled_shapley(predict_proba, X, permutations, seed=0):
+    """Shapley values of predict_proba[:, 1] against the all-zero (training mean) point"""
+    n, d = X.shape
+    rng = np.random.default_rng(seed)
+    orders = [rng.permutation(d) for _ in range(max(1, permutations // 2))]
+    orders = np.array(orders + [order[::-1] for order in orders])
+    # masks[p, k]: features switched to the row's value after k steps of order p
+    ranks = np.argsort(orders, axis=1)
+    masks = ranks[:, None, :] < np.arange(d + 1)[None, :, None]
+
+    contributions = np.empty((n, d))
+    for start in range(0, n, SHAPLEY_BLOCK_ROWS):
+        block = X[start:start + SHAPLEY_BLOCK_ROWS]
+        points = np.where(masks[None], block[:, None, None, :], 0.0)
+        values = predict_proba(points.reshape(-1, d))[:, 1].reshape(len(block), len(orders), d + 1)
+        steps = np.diff(values, axis=2)
+        # Step k of order p is the marginal contribution of feature orders[p, k]
+        contributions[start:start + len(block)] = np.take_along_axis(steps, ranks[None], axis=2).mean(axis=1)
+    return contributions
+
+
+class ThreatExplainer:
+    """Batched per-row attributions with an LRU cache keyed by model version and input row"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, permutations=DEFAULT_PERMUTATIONS):
+        self.max_entries = max_entries
+        self.permutations = permutations
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()   # (model key, row hash) -> (base, value, contributions)
+        self._plans = {}              # id(model) -> (model, plan)
+        self._lock = threading.Lock()
+
+    def _plan(self, model):
+        cached = self._plans.get(id(model))
+        if cached is not None and cached[0] is model:
+            return cached[1]
+        if hasattr(model, 'coef_'):
+            plan = ('linear',)
+        elif hasattr(model, 'estimators_'):
+            plan = ('tree',) + _tree_plan(model)
+        else:
+            plan = ('shapley',)
+        with self._lock:
+            if len(self._plans) >= 64:
+                self._plans.clear()
+            self._plans[id(model)] = (model, plan)
+        return plan
+
+    def _compute(self, model, X):
+        """(base, value, contributions, output) for the rows of X"""
+        plan = self._plan(model)
+        if plan[0] == 'linear':
+            contributions = X * np.asarray(model.coef_[0], dtype=np.float64)
+            base = float(model.intercept_[0])
+            value = model.decision_function(X)
+            output = 'log_odds'
+        elif plan[0] == 'tree':
+            _, path, credits, base, output = plan
+            contributions = np.asarray((path(X) @ credits).todense())
+            value = model.decision_function(X) if output == 'log_odds' else model.predict_proba(X)[:, 1]
+        else:
+            contributions = _sampled_shapley(model.predict_proba, X, self.permutations)
+            base = float(model.predict_proba(np.zeros((1, X.shape[1])))[0, 1])
+            value = model.predict_proba(X)[:, 1]
+            output = 'probability'
+        # The base comes from the model (intercept, root nodes, training-mean point),
+        # not from the value, so this checks the attributions against the model
+        gap = np.abs(base + contributions.sum(axis=1) - value)
+        if gap.size and gap.max() > ADDITIVITY_TOLERANCE * (1 + np.abs(value).max()):
+            raise RuntimeError(f"Attributions of {type(model).__name__} miss the model output by {gap.max():.3g}; "
+                               f"the model internals may have changed")
+        return np.full(len(X), base), value, contributions, output
+
+    def explain(self, model_key, model, X):
+        """
+        Attributions of `model` for the scaled rows X
+
+        model_key identifies the model version in the cache. Returns
+        {'output', 'base' (rows,), 'value' (rows,), 'contributions' (rows, features)}.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        keys = [(model_key, hashlib.blake2b(row.tobytes(), digest_size=16).digest()) for row in X]
+        base = np.empty(len(X))
+        value = np.empty(len(X))
+        contributions = np.empty(X.shape)
+        output = None
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._cache.get(key)
+                if entry is None:
+                    missing.append(i)
+                    continue
+                self._cache.move_to_end(key)
+                base[i], value[i], contributions[i], output = entry
+            self.hits += len(X) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = self._compute(model, X[missing])
+            output = computed[3]
+            base[missing], value[missing], contributions[missing] = computed[:3]
+            with self._lock:
+                for i in missing:
+                    self._cache[keys[i]] = (base[i], value[i], contributions[i].copy(), output)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return {'output': output, 'base': base, 'value': value, 'contributions': contributions}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._plans.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._cache), 'max_entries': self.max_entries}
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Per-station ARIMA forecasts for thousands of series at once.
+
+Each (station, target) daily series is fitted with statsmodels ARIMA; fits
+run in parallel worker processes (joblib). Only a snapshot of each fitted
+model's state-space form is kept: transition T, design Z, intercepts c and d,
+RQR' (state noise), observation noise H, and the one-step-ahead predicted
+state a and its covariance P at the end of the sample.
+
+BatchForecaster stacks the snapshots, zero-padded to a common state size, and
+runs the Kalman forecast recursion for all series together:
+
+    mean_h = d + Z a_h            var_h = Z P_h Z' + H
+    a_h+1  = c + T a_h            P_h+1 = T P_h T' + RQR'
+
+Each step is a few batched matrix products over (series, k, k) arrays, with
+no per-series Python. The means and variances are the same as each model's
+get_forecast, and intervals use the same mean +/- z * se formula as conf_int.
+
+    python batch_forecast.py cleaned_coastal_data.csv --models coastal_threat_models --n-jobs -1
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import ARIMA_TARGETS
+from arima_search import differencing_order
+
+# (p, d, q); d=None picks 0, 1 or 2 per series with ADF tests as train_arima_models does
+DEFAULT_ORDER = (1, None, 1)
+MIN_SERIES_LENGTH = 50
+
+
+def station_daily_series(frame, targets=ARIMA_TARGETS):
+    """Daily means per station: {(station, target): Series indexed by day}"""
+    columns = list(dict.fromkeys(targets.values()))
+    frame = frame.assign(timestamp=pd.to_datetime(frame['timestamp']))
+    daily = frame.groupby(['station_id', pd.Grouper(key='timestamp', freq='D')])[columns].mean()
+    series = {}
+    for station, station_daily in daily.groupby(level='station_id', sort=True):
+        station_daily = station_daily.droplevel('station_id')
+        for target_name, column in targets.items():
+            values = station_daily[column].dropna()
+            if len(values) >= MIN_SERIES_LENGTH:
+                series[(str(station), target_name)] = values
+    return series
+
+
+def state_space_snapshot(result):
+    """Arrays needed to forecast a fitted statsmodels state-space model"""
+    ssm = result.model.ssm
+    obs_intercept = np.asarray(ssm['obs_intercept'], dtype=np.float64).reshape(-1)
+    if np.ptp(obs_intercept) > 0:
+        raise ValueError("only constant trends can be batched")
+
+    def last(matrix, dims):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        return matrix[..., -1] if matrix.ndim > dims else matrix
+
+    selection = last(ssm['selection'], 2)
+    return {
+        'T': last(ssm['transition'], 2),
+        'Z': last(ssm['design'], 2)[0],
+        'c': last(ssm['state_intercept'], 1),
+        'd': float(obs_intercept[-1]),
+        'RQR': selection @ last(ssm['state_cov'], 2) @ selection.T,
+        'H': float(last(ssm['obs_cov'], 2)[0, 0]),
+        'a': np.asarray(result.filter_results.predicted_state[:, -1], dtype=np.float64),
+        'P': np.asarray(result.filter_results.predicted_state_cov[:, :, -1], dtype=np.float64),
+    }
+
+
+def _fit_series(values, order):
+    """Fit one series in a worker; returns (snapshot, order, aic) or None if the fit fails"""
+    from statsmodels.tsa.arima.model import ARIMA
+
+    p, d, q = order
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            if d is None:
+                d = differencing_order(values)
+            result = ARIMA(values, order=(p, d, q)).fit()
+        return state_space_snapshot(result), (p, d, q), float(result.aic)
+    except Exception:
+        return None
+
+
+class BatchForecaster:
+    """Stacked state-space snapshots of many fitted series, forecast together"""
+
+    # Stacked arrays, one row per series
+    ARRAY_FIELDS = ('T', 'RQR', 'P', 'Z', 'c', 'a', 'd', 'H')
+
+    def __init__(self, keys, snapshots, last_dates=None, orders=None):
+        self.keys = list(keys)
+        self.orders = list(orders) if orders is not None else [None] * len(self.keys)
+        self.last_dates = (np.asarray(last_dates, dtype='datetime64[D]') if last_dates is not None
+                           else np.full(len(self.keys), np.datetime64('NaT'), dtype='datetime64[D]'))
+        n = len(snapshots)
+        k = max((len(s['a']) for s in snapshots), default=1)
+        # Zero padding leaves the forecasts unchanged: padded states stay 0 with 0 variance
+        self.T = np.zeros((n, k, k))
+        self.RQR = np.zeros((n, k, k))
+        self.P = np.zeros((n, k, k))
+        self.Z = np.zeros((n, k))
+        self.c = np.zeros((n, k))
+        self.a = np.zeros((n, k))
+        self.d = np.array([s['d'] for s in snapshots], dtype=np.float64)
+        self.H = np.array([s['H'] for s in snapshots], dtype=np.float64)
+        for i, s in enumerate(snapshots):
+            m = len(s['a'])
+            self.T[i, :m, :m] = s['T']
+            self.RQR[i, :m, :m] = s['RQR']
+            self.P[i, :m, :m] = s['P']
+            self.Z[i, :m] = s['Z']
+            self.c[i, :m] = s['c']
+            self.a[i, :m] = s['a']
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_arrays(cls, keys, arrays, last_dates=None, orders=None):
+        """Forecaster over already stacked arrays (e.g. views into shared memory), without copying them"""
+        forecaster = cls.__new__(cls)
+        forecaster.keys = list(keys)
+        forecaster.orders = list(orders) if orders is not None else [None] * len(forecaster.keys)
+        forecaster.last_dates = np.array([np.datetime64('NaT') if date is None else date for date in last_dates]
+                                         if last_dates is not None else [np.datetime64('NaT')] * len(forecaster.keys),
+                                         dtype='datetime64[D]')
+        for field in cls.ARRAY_FIELDS:
+            setattr(forecaster, field, arrays[field])
+        return forecaster
+
+    @classmethod
+    def from_results(cls, results, last_dates=None):
+        """Stack already fitted statsmodels results ({key: result})"""
+        keys = list(results)
+        return cls(keys, [state_space_snapshot(results[key]) for key in keys], last_dates)
+
+    def stations(self):
+        return sorted({key[0] for key in self.keys})
+
+    def select(self, stations=None, targets=None):
+        """Row indexes of the series for these stations and targets (None = all)"""
+        stations = None if stations is None else {str(station) for station in stations}
+        return np.array([i for i, (station, target) in enumerate(self.keys)
+                         if (stations is None or station in stations) and (targets is None or target in targets)],
+                        dtype=np.intp)
+
+    def forecast(self, horizon, levels=(), rows=None):
+        """
+        Forecast `horizon` steps for the series at `rows` (default all)
+
+        Returns {'mean': (n, horizon), 'se': (n, horizon),
+        'intervals': {level: (lower, upper)}}.
+        """
+        rows = slice(None) if rows is None else rows
+        T, RQR, Z, c = self.T[rows], self.RQR[rows], self.Z[rows], self.c[rows]
+        d, H = self.d[rows], self.H[rows]
+        a, P = self.a[rows].copy(), self.P[rows].copy()
+        T_t = T.transpose(0, 2, 1)
+
+        mean = np.empty((len(d), horizon))
+        variance = np.empty((len(d), horizon))
+        for h in range(horizon):
+            mean[:, h] = d + np.einsum('nk,nk->n', Z, a)
+            variance[:, h] = np.einsum('nk,nk->n', Z, np.matmul(P, Z[:, :, None])[:, :, 0]) + H
+            a = c + np.matmul(T, a[:, :, None])[:, :, 0]
+            P = np.matmul(np.matmul(T, P), T_t) + RQR
+
+        se = np.sqrt(np.maximum(variance, 0))
+        intervals = {}
+        for level in levels:
+            z = norm.ppf(0.5 + level / 2)
+            intervals[level] = (mean - z * se, mean + z * se)
+        return {'mean': mean, 'se': se, 'intervals': intervals}
+
+    def station_forecasts(self, stations=None, targets=None, horizon=30, levels=()):
+        """forecast() for selected stations, as {station: {target: {'order', 'dates', 'mean', 'intervals'}}}"""
+        rows = self.select(stations, targets)
+        result = self.forecast(horizon, levels, rows)
+        steps = np.arange(1, horizon + 1)
+        forecasts = {}
+        for position, i in enumerate(rows):
+            station, target = self.keys[i]
+            forecasts.setdefault(station, {})[target] = {
+                'order': self.orders[i],
+                'dates': [str(date) for date in self.last_dates[i] + steps] if not np.isnat(self.last_dates[i]) else None,
+                'mean': result['mean'][position],
+                'intervals': {level: {'lower': bounds[0][position], 'upper': bounds[1][position]}
+                              for level, bounds in result['intervals'].items()},
+            }
+        return forecasts
+
+
+def fit_station_forecaster(frame, targets=ARIMA_TARGETS, order=DEFAULT_ORDER, n_jobs=-1):
+    """Fit every (station, target) series of `frame` in parallel and stack the fits"""
+    series = station_daily_series(frame, targets)
+    keys = list(series)
+    fits = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(_fit_series)(series[key].to_numpy(dtype=np.float64), order) for key in keys
+    )
+    fitted = [(key, fit) for key, fit in zip(keys, fits) if fit is not None]
+    return BatchForecaster(
+        [key for key, _ in fitted],
+        [fit[0] for _, fit in fitted],
+        last_dates=[series[key].index[-1].to_datetime64() for key, _ in fitted],
+        orders=[fit[1] for _, fit in fitted],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit per-station ARIMA forecasts for every station in a dataset")
+    parser.add_argument('data', help="CSV with timestamp, station_id and the forecast target columns")
+    parser.add_argument('--models', default='coastal_threat_models', help="Model file prefix to save next to")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel fitting processes (-1 = all CPUs)")
+    args = parser.parse_args()
+
+    from model import CoastalThreatPredictor
+
+    predictor = CoastalThreatPredictor(args.data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.load_and_preprocess_data()
+    print(f"📈 Fitting per-station forecasts for {predictor.data['station_id'].nunique():,} stations...")
+    started = time.perf_counter()
+    predictor.train_station_forecasts(n_jobs=args.n_jobs)
+    elapsed = time.perf_counter() - started
+    path = f"{args.models}_station_forecasts.pkl"
+    joblib.dump(predictor.station_forecaster, path)
+    print(f"✅ Fitted {len(predictor.station_forecaster):,} series in {elapsed:.1f}s, saved to {path}")
+
+if __name__ == '__main__':
+    main()
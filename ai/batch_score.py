@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Offline batch scoring of archived readings.
+
+Streams a CSV, Excel or Parquet file in chunks, scores each chunk with the
+saved models in a pool of worker processes and writes one output part per
+chunk:
+
+    python batch_score.py archive_2024.csv scores_2024/ --models coastal_threat_models --workers 8
+
+Each worker loads the models once, or with --shared-params maps one
+memory-mapped copy of the compiled parameters (see shared_params.py). Parts are written atomically
+(part-000042.csv or .parquet) and a _manifest.json records the input and the
+model versions, so an interrupted run picks up where it stopped when started
+again with the same arguments. A run against different input or models
+refuses to resume unless --overwrite is given. Progress and the final summary
+report rows per second.
+
+Output columns are the passthrough columns (timestamp, station_id when
+present), then <threat>_probability (percent), <threat>_prediction and
+<threat>_level for each threat.
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import CoastalThreatPredictor, score_columns
+from feature_schema import FEATURE_SCHEMA
+
+DEFAULT_CHUNK_ROWS = 50_000
+PASSTHROUGH_COLUMNS = ('timestamp', 'station_id')
+MANIFEST = '_manifest.json'
+SUCCESS = '_SUCCESS'
+
+# Set in each worker process by _init_worker
+_predictor = None
+
+
+def input_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm', '.xls'):
+        return 'excel'
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    return 'csv'
+
+
+def _excel_chunks(path, chunk_rows):
+    """Stream an Excel sheet with openpyxl's read-only mode instead of loading it whole"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(name) for name in next(rows)]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame.from_records(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def read_chunks(path, chunk_rows):
+    """Yield DataFrames of at most chunk_rows rows from a CSV, Excel or Parquet file"""
+    kind = input_format(path)
+    if kind == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif kind == 'excel':
+        yield from _excel_chunks(path, chunk_rows)
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+
+
+def _init_worker(model_prefix, shared_dir=None):
+    """
+    Load the models once per worker; one BLAS thread each so workers don't oversubscribe cores
+
+    With shared_dir the worker maps the compiled parameters published there
+    instead of unpickling its own copy of every model.
+    """
+    global _predictor
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    _predictor = CoastalThreatPredictor(None)
+    if shared_dir:
+        _predictor.attach_shared_params(shared_dir)
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        _predictor.load_models(model_prefix)
+    if not _predictor.models:
+        raise RuntimeError(f"No models found for prefix '{model_prefix}'")
+
+
+def _write_atomic(frame, path, output_format):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if output_format == 'parquet':
+        frame.to_parquet(tmp_path, index=False)
+    else:
+        frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def score_chunk(index, chunk, part_path, output_format):
+    """Score one chunk in a worker and write its part file; returns (index, rows, seconds)"""
+    started = time.perf_counter()
+    present = {name: chunk[name].to_numpy() for name in FEATURE_SCHEMA.columns if name in chunk.columns}
+    try:
+        X = FEATURE_SCHEMA.decode_columns(present, out=np.empty((len(chunk), len(FEATURE_SCHEMA))))
+    except ValueError as e:
+        raise ValueError(f"chunk {index}: {e}")
+    station_ids = chunk['station_id'].tolist() if 'station_id' in chunk.columns else None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictions, probabilities, _ = _predictor.predict_threats(
+            X, station_ids=station_ids, include_forecasts=False
+        )
+
+    output = {name: chunk[name].to_numpy() for name in PASSTHROUGH_COLUMNS if name in chunk.columns}
+    output.update(score_columns(predictions, probabilities))
+    _write_atomic(pd.DataFrame(output), part_path, output_format)
+    return index, len(chunk), time.perf_counter() - started
+
+
+def model_versions(model_prefix):
+    """Version ids recorded with the saved models (empty if none were recorded)"""
+    try:
+        with open(f"{model_prefix}_versions.json") as f:
+            return {component: profile.get('version') for component, profile in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def run_manifest(args):
+    stat = os.stat(args.input)
+    return {
+        'input': os.path.abspath(args.input),
+        'input_size': stat.st_size,
+        'input_mtime': stat.st_mtime,
+        'chunk_rows': args.chunk_rows,
+        'models': os.path.abspath(args.models),
+        'model_versions': model_versions(args.models),
+        'output_format': args.format,
+    }
+
+
+def discard_output(directory):
+    """Delete the files of a previous run; refuse a non-empty directory without a manifest"""
+    names = os.listdir(directory)
+    if names and MANIFEST not in names:
+        raise SystemExit(f"❌ {directory} is not empty and has no {MANIFEST}, so it is not a batch_score output; "
+                         f"refusing to overwrite it")
+    for name in names:
+        if name in (MANIFEST, SUCCESS) or name.startswith('part-'):
+            os.remove(os.path.join(directory, name))
+
+
+def prepare_output(args):
+    """Create or validate the output directory; returns the set of chunk indexes already written"""
+    manifest = run_manifest(args)
+    manifest_path = os.path.join(args.output, MANIFEST)
+    if os.path.isdir(args.output) and args.overwrite:
+        discard_output(args.output)
+    os.makedirs(args.output, exist_ok=True)
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if {key: previous.get(key) for key in manifest} != manifest:
+            raise SystemExit(f"❌ {args.output} holds a run with different input, chunking or models; "
+                             f"use --overwrite or another output directory")
+    else:
+        manifest['started_at'] = datetime.now().isoformat()
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    done = set()
+    for name in os.listdir(args.output):
+        if name.startswith('part-') and not name.endswith('.tmp'):
+            done.add(int(name[len('part-'):].split('.')[0]))
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score an archive of readings with the saved models")
+    parser.add_argument('input', help="CSV, Excel (.xlsx) or Parquet file")
+    parser.add_argument('output', help="Output directory for part files")
+    parser.add_argument('--models', default='coastal_threat_models', help="Model file prefix")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="Output part format")
+    parser.add_argument('--overwrite', action='store_true', help="Discard the parts and manifest of an existing run instead of resuming")
+    parser.add_argument('--shared-params', default=None, metavar='DIR',
+                        help="Publish the models as memory-mapped parameters in DIR and have workers map them")
+    args = parser.parse_args()
+
+    done = prepare_output(args)
+    if args.shared_params:
+        publisher = CoastalThreatPredictor(None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            publisher.load_models(args.models)
+        version = publisher.publish_shared_params(args.shared_params)
+        del publisher
+        print(f"🔗 Workers map shared parameters {version} from {args.shared_params}")
+    extension = 'parquet' if args.format == 'parquet' else 'csv'
+    print(f"🗂️  Scoring {args.input} -> {args.output} with {args.workers} worker(s), "
+          f"{args.chunk_rows:,} rows per chunk" + (f", resuming ({len(done)} parts done)" if done else ''))
+
+    started = time.perf_counter()
+    scored_rows = 0
+    max_pending = args.workers * 2
+    with concurrent.futures.ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                                                initargs=(args.models, args.shared_params)) as pool:
+        pending = set()
+
+        def collect(wait_for):
+            nonlocal scored_rows
+            finished, still_pending = concurrent.futures.wait(pending, return_when=wait_for)
+            for future in finished:
+                index, rows, _ = future.result()
+                scored_rows += rows
+                elapsed = time.perf_counter() - started
+                print(f"  part {index:06d}: {rows:,} rows | total {scored_rows:,} rows, {scored_rows / elapsed:,.0f} rows/s")
+            return still_pending
+
+        for index, chunk in enumerate(read_chunks(args.input, args.chunk_rows)):
+            if index in done:
+                continue
+            part_path = os.path.join(args.output, f"part-{index:06d}.{extension}")
+            pending.add(pool.submit(score_chunk, index, chunk, part_path, args.format))
+            # Bound the chunks held in memory while workers catch up
+            if len(pending) >= max_pending:
+                pending = collect(concurrent.futures.FIRST_COMPLETED)
+        while pending:
+            pending = collect(concurrent.futures.ALL_COMPLETED)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'finished_at': datetime.now().isoformat(),
+        'rows_scored': scored_rows,
+        'parts_skipped': len(done),
+        'seconds': round(elapsed, 3),
+        'rows_per_s': round(scored_rows / elapsed, 1) if elapsed > 0 else None,
+        'workers': args.workers,
+    }
+    with open(os.path.join(args.output, SUCCESS), 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"✅ Scored {scored_rows:,} rows in {elapsed:.1f}s ({summary['rows_per_s'] or 0:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark suite for the prediction and training hot paths.
+
+Runs directly against CoastalThreatPredictor and the Flask app's test client
+(no live server needed) on synthetic datasets, and writes machine-readable
+JSON results that can be compared between commits:
+
+    python benchmarks.py --sizes 1k,100k --output bench_results
+    python benchmarks.py --compare bench_results/old.json bench_results/new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import CoastalThreatPredictor
+from data_generator import generate_dataframe
+
+DATASET_SIZES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# The classification training benchmark is capped by default: SVC(probability=True)
+# scales quadratically with rows, so 100k+ rows takes hours. Raise with
+# --max-train-rows. ARIMA trains on the daily series, which does not grow with
+# the row count, so it runs at every size.
+DEFAULT_MAX_TRAIN_ROWS = 1_000
+
+# Rows used to train the models that the prediction benchmarks score against
+MODEL_TRAINING_ROWS = 1_000
+
+# Series counts for the batched forecasting benchmark, and the number of real
+# statsmodels fits that are tiled up to those counts
+FORECAST_SERIES = (1_000, 10_000)
+FORECAST_FIT_STATIONS = 8
+FORECAST_HORIZON = 30
+
+# A regression is flagged when a benchmark gets slower than this ratio
+REGRESSION_THRESHOLD = 1.10
+
+
+def make_synthetic_frame(n_rows, seed=42):
+    """Build a synthetic multi-station dataset with the same columns as the real CSV"""
+    # One station per 10k rows; small datasets use a 3-hour step so they still
+    # cover ~120 days and the ARIMA models have enough daily points
+    n_stations = max(1, n_rows // 10_000)
+    freq = '3h' if n_rows < 10_000 else '1h'
+    return generate_dataframe(n_rows, n_stations=n_stations, seed=seed, start='2000-01-01', freq=freq)
+
+
+def make_predictor(workdir, n_rows, seed=42):
+    """Write a synthetic dataset to disk and return a preprocessed predictor for it"""
+    data_path = os.path.join(workdir, f"synthetic_{n_rows}.csv")
+    if not os.path.exists(data_path):
+        make_synthetic_frame(n_rows, seed=seed).to_csv(data_path, index=False)
+    predictor = CoastalThreatPredictor(data_path)
+    with quiet():
+        predictor.load_and_preprocess_data()
+    return predictor
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the predictor's progress output while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def time_call(func, repeats, setup=None):
+    """Run func `repeats` times and return the wall-clock durations in seconds"""
+    durations = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        with quiet():
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(name, rows, durations, **extra):
+    result = {
+        'name': name,
+        'rows': rows,
+        'repeats': len(durations),
+        'min_s': min(durations),
+        'median_s': statistics.median(durations),
+        'mean_s': statistics.fmean(durations),
+        'stdev_s': statistics.stdev(durations) if len(durations) > 1 else 0.0,
+    }
+    if rows:
+        result['rows_per_s'] = rows / result['median_s'] if result['median_s'] > 0 else None
+    result.update(extra)
+    return result
+
+
+class BenchmarkSuite:
+    """Collection of hot-path benchmarks sharing one working directory"""
+
+    def __init__(self, workdir, sizes, repeats=3, max_train_rows=DEFAULT_MAX_TRAIN_ROWS):
+        self.workdir = workdir
+        self.sizes = sizes
+        self.repeats = repeats
+        self.max_train_rows = max_train_rows
+        self.results = []
+        self._trained = None
+        self._station_fits = None
+
+    def trained_predictor(self):
+        """Predictor with trained models, shared by the prediction benchmarks"""
+        if self._trained is None:
+            predictor = make_predictor(self.workdir, MODEL_TRAINING_ROWS)
+            with quiet():
+                predictor.train_classification_models()
+                predictor.train_arima_models()
+                predictor.save_models(os.path.join(self.workdir, 'bench_models'))
+            self._trained = predictor
+        return self._trained
+
+    def record(self, result):
+        self.results.append(result)
+        rate = result.get('rows_per_s')
+        rate_text = f", {rate:,.0f} rows/s" if rate else ""
+        print(f"  {result['name']:<36} rows={result['rows']:<9} median={result['median_s'] * 1000:10.2f} ms{rate_text}")
+
+    def skip(self, name, rows, reason):
+        self.results.append({'name': name, 'rows': rows, 'skipped': reason})
+        print(f"  {name:<36} rows={rows:<9} skipped ({reason})")
+
+    def bench_prepare_features(self, n_rows):
+        predictor = make_predictor(self.workdir, n_rows)
+        durations = time_call(predictor.prepare_features, self.repeats)
+        self.record(summarize('prepare_features', n_rows, durations))
+
+    def bench_predict_single(self):
+        predictor = self.trained_predictor()
+        row = make_synthetic_frame(1, seed=7)
+        durations = time_call(lambda: predictor.predict_threats(row), max(self.repeats, 20))
+        self.record(summarize('predict_threats[single]', 1, durations))
+
+    def bench_predict_batch(self, n_rows):
+        predictor = self.trained_predictor()
+        batch = make_synthetic_frame(n_rows, seed=7)
+        durations = time_call(lambda: predictor.predict_threats(batch), self.repeats)
+        self.record(summarize('predict_threats[batch]', n_rows, durations))
+
+    def bench_train_classification(self, n_rows):
+        if n_rows > self.max_train_rows:
+            self.skip('train_classification_models', n_rows, f"above --max-train-rows {self.max_train_rows}")
+            return
+        predictor = make_predictor(self.workdir, n_rows)
+        durations = time_call(predictor.train_classification_models, self.repeats)
+        self.record(summarize('train_classification_models', n_rows, durations))
+
+    def bench_train_arima(self, n_rows):
+        predictor = make_predictor(self.workdir, n_rows)
+        durations = time_call(predictor.train_arima_models, self.repeats)
+        self.record(summarize('train_arima_models', n_rows, durations,
+                              models_trained=len(predictor.arima_models),
+                              daily_points=len(predictor._daily_series())))
+
+    def bench_load_models(self):
+        self.trained_predictor()
+        prefix = os.path.join(self.workdir, 'bench_models')
+
+        def load():
+            CoastalThreatPredictor(None).load_models(prefix)
+
+        durations = time_call(load, max(self.repeats, 5))
+        self.record(summarize('load_models', 0, durations))
+
+    def bench_predict_endpoint(self):
+        import app as server
+
+        server.predictor = self.trained_predictor()
+        client = server.app.test_client()
+        payload = make_synthetic_frame(1, seed=11).drop(columns=['timestamp', 'station_id']).iloc[0].to_dict()
+        payload = {key: float(value) for key, value in payload.items()}
+
+        def post():
+            response = client.post('/predict', json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f"/predict returned {response.status_code}: {response.get_data(as_text=True)}")
+
+        durations = time_call(post, max(self.repeats, 20))
+        self.record(summarize('/predict[end-to-end]', 1, durations))
+
+    def bench_transport(self, n_rows):
+        """End-to-end /predict/batch throughput per wire format (JSON rows, JSON columns, MessagePack, Arrow)"""
+        import app as server
+        import transport
+
+        server.predictor = self.trained_predictor()
+        client = server.app.test_client()
+        frame = make_synthetic_frame(n_rows, seed=13)
+        features = frame[transport.FEATURE_SCHEMA.columns]
+
+        bodies = {
+            'json-rows': (json.dumps(features.to_dict(orient='records')), transport.JSON),
+            'json-columns': (json.dumps({name: features[name].tolist() for name in features.columns}), transport.JSON),
+        }
+        available = transport.available_formats()
+        if transport.MSGPACK in available:
+            import msgpack
+            bodies['msgpack'] = (msgpack.packb({name: features[name].to_numpy(dtype='<f8').tobytes()
+                                                for name in features.columns}), transport.MSGPACK)
+        if transport.ARROW in available:
+            body, _ = transport.encode_columns({name: features[name].to_numpy() for name in features.columns},
+                                               transport.ARROW)
+            bodies['arrow'] = (body, transport.ARROW)
+
+        for name, (body, content_type) in bodies.items():
+            def post():
+                response = client.post('/predict/batch', data=body,
+                                       headers={'Content-Type': content_type, 'Accept': content_type})
+                if response.status_code != 200:
+                    raise RuntimeError(f"/predict/batch returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+            durations = time_call(post, self.repeats)
+            self.record(summarize(f'/predict/batch[{name}]', n_rows, durations, request_bytes=len(body)))
+        for missing in sorted({transport.MSGPACK, transport.ARROW} - set(available)):
+            self.skip(f'/predict/batch[{missing}]', n_rows, 'library not installed')
+
+    def station_fits(self):
+        """Fitted statsmodels ARIMA results for every (station, target) of a small multi-station dataset"""
+        if self._station_fits is None:
+            import warnings
+            from statsmodels.tsa.arima.model import ARIMA
+            import batch_forecast
+
+            # 100 days per station at a 3-hour step
+            frame = generate_dataframe(FORECAST_FIT_STATIONS * 800, n_stations=FORECAST_FIT_STATIONS,
+                                       seed=21, start='2000-01-01', freq='3h')
+            durations = time_call(lambda: batch_forecast.fit_station_forecaster(frame, n_jobs=-1), 1)
+            series = batch_forecast.station_daily_series(frame)
+            self.record(summarize('fit_station_forecaster', len(series), durations, unit='series'))
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                self._station_fits = [ARIMA(values.to_numpy(), order=(1, 0, 1)).fit() for values in series.values()]
+        return self._station_fits
+
+    def bench_batch_forecast(self, n_series):
+        """Batched state-space forecasts for n_series against a loop of statsmodels get_forecast calls"""
+        from batch_forecast import BatchForecaster
+
+        fits = self.station_fits()
+        results = {(f"station{i}", 'series'): fits[i % len(fits)] for i in range(n_series)}
+        forecaster = BatchForecaster.from_results(results)
+        durations = time_call(lambda: forecaster.forecast(FORECAST_HORIZON, [0.95]), self.repeats)
+        self.record(summarize(f'batch_forecast[h={FORECAST_HORIZON}]', n_series, durations, unit='series'))
+
+        # The per-series loop is timed on a sample and scaled up to n_series
+        sample = min(n_series, 200)
+
+        def loop():
+            for i in range(sample):
+                fits[i % len(fits)].get_forecast(FORECAST_HORIZON).conf_int(alpha=0.05)
+
+        loop_durations = time_call(loop, 1)
+        self.record(summarize(f'statsmodels get_forecast loop[h={FORECAST_HORIZON}]', sample, loop_durations,
+                              unit='series', estimated_s_for_all=loop_durations[0] / sample * n_series,
+                              series=n_series))
+
+    def run(self, only=None):
+        benchmarks = [
+            ('prepare', lambda: [self.bench_prepare_features(n) for n in self.sizes]),
+            ('predict', lambda: [self.bench_predict_single()] + [self.bench_predict_batch(n) for n in self.sizes]),
+            ('train', lambda: [self.bench_train_classification(n) for n in self.sizes]),
+            ('arima', lambda: [self.bench_train_arima(n) for n in self.sizes]),
+            ('load', self.bench_load_models),
+            ('endpoint', self.bench_predict_endpoint),
+            ('transport', lambda: [self.bench_transport(n) for n in self.sizes]),
+            ('forecast', lambda: [self.bench_batch_forecast(n) for n in FORECAST_SERIES]),
+        ]
+        for group, bench in benchmarks:
+            if only and group not in only:
+                continue
+            print(f"\n⏱️  {group}")
+            bench()
+        return self.results
+
+
+def environment_info():
+    """Metadata identifying the code and machine a result file came from"""
+    import sklearn
+    import statsmodels
+
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        commit = 'unknown'
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'statsmodels': statsmodels.__version__,
+    }
+
+
+def compare_results(baseline_path, candidate_path, threshold=REGRESSION_THRESHOLD):
+    """Print a per-benchmark comparison of two result files; returns the regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    def index(results):
+        return {(r['name'], r['rows']): r for r in results['results'] if 'median_s' in r}
+
+    old, new = index(baseline), index(candidate)
+    print(f"Baseline:  {baseline['environment']['commit']} ({baseline['environment']['timestamp']})")
+    print(f"Candidate: {candidate['environment']['commit']} ({candidate['environment']['timestamp']})")
+    print(f"\n{'benchmark':<36} {'rows':>9} {'baseline ms':>12} {'candidate ms':>13} {'ratio':>7}")
+
+    regressions = []
+    for key in sorted(set(old) & set(new)):
+        ratio = new[key]['median_s'] / old[key]['median_s'] if old[key]['median_s'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            flag = '  ⚠️ slower'
+            regressions.append({'name': key[0], 'rows': key[1], 'ratio': ratio})
+        elif ratio < 1 / threshold:
+            flag = '  ✅ faster'
+        print(f"{key[0]:<36} {key[1]:>9} {old[key]['median_s'] * 1000:12.2f} {new[key]['median_s'] * 1000:13.2f} {ratio:7.2f}{flag}")
+
+    return regressions
+
+
+def parse_sizes(text):
+    sizes = []
+    for token in text.split(','):
+        token = token.strip().lower()
+        sizes.append(DATASET_SIZES[token] if token in DATASET_SIZES else int(token))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction and training hot paths")
+    parser.add_argument('--sizes', default='1k,100k,1m',
+                        help="Comma separated dataset sizes (1k, 100k, 1m or row counts)")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed repetitions per benchmark")
+    parser.add_argument('--only', default=None,
+                        help="Comma separated groups: prepare,predict,train,arima,load,endpoint,transport,forecast")
+    parser.add_argument('--max-train-rows', type=int, default=DEFAULT_MAX_TRAIN_ROWS,
+                        help="Skip the classification training benchmark above this many rows")
+    parser.add_argument('--output', default='bench_results', help="Directory for the JSON result file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Compare two result files instead of running benchmarks")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare_results(*args.compare)
+        sys.exit(1 if regressions else 0)
+
+    only = set(args.only.split(',')) if args.only else None
+    workdir = tempfile.mkdtemp(prefix='blueguard_bench_')
+    try:
+        print("🚀 Running BlueGuard benchmarks")
+        suite = BenchmarkSuite(workdir, parse_sizes(args.sizes), args.repeats, args.max_train_rows)
+        results = suite.run(only)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    env = environment_info()
+    os.makedirs(args.output, exist_ok=True)
+    output_path = os.path.join(args.output, f"bench_{env['commit']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_path, 'w') as f:
+        json.dump({'environment': env, 'results': results}, f, indent=2)
+    print(f"\n💾 Results written to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
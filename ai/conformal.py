@@ -0,0 +1,94 @@
+"""
+Split-conformal prediction sets for the threat classifiers.
+
+At training time each threat's held-out rows are split in two. On the
+calibration half the nonconformity score of a row is 1 - p(true label), where
+p is the probability the API serves. For each error rate alpha the score
+quantile qhat at rank ceil((n + 1)(1 - alpha)) is stored, separately for each
+label (Mondrian conformal), so a rare threat label gets its own guarantee
+instead of being traded off against the common one.
+
+At inference a label is in a row's prediction set when its score is at most
+that label's qhat, one comparison per label and no stored data. For
+exchangeable data the set holds the true label with probability at least
+1 - alpha, whichever the true label is. The other half of the held-out rows
+checks this: coverage_report gives the empirical coverage, the average set
+size and the share of singleton and empty sets.
+"""
+
+import math
+
+import numpy as np
+
+DEFAULT_ALPHAS = (0.1, 0.05)
+# Prediction set members, by label
+SET_LABELS = ('clear', 'threat')
+
+
+def alpha_key(alpha):
+    """Key of an error rate in the stored quantiles ('0.1', '0.05')"""
+    return f"{float(alpha):g}"
+
+
+def nonconformity(p1, labels):
+    """1 - probability of each row's label, given the threat probabilities p1"""
+    return np.where(np.asarray(labels) == 1, 1 - p1, p1)
+
+
+def conformal_quantile(scores, alpha):
+    """Score at rank ceil((n + 1)(1 - alpha)); 1.0 (always include) when there are too few scores"""
+    n = len(scores)
+    rank = math.ceil((n + 1) * (1 - alpha))
+    if rank > n:
+        return 1.0
+    return float(np.partition(scores, rank - 1)[rank - 1])
+
+
+def calibrate(p1, labels, alphas=DEFAULT_ALPHAS):
+    """Per-label quantiles {'alphas', 'rows', 'label_rows', 'qhat': {alpha_key: [q_clear, q_threat]}}"""
+    p1 = np.asarray(p1, dtype=np.float64)
+    labels = np.asarray(labels)
+    qhat = {}
+    for alpha in alphas:
+        qhat[alpha_key(alpha)] = [
+            conformal_quantile(nonconformity(p1[labels == label], label), alpha) for label in (0, 1)
+        ]
+    return {
+        'alphas': [float(alpha) for alpha in alphas],
+        'rows': int(len(labels)),
+        'label_rows': [int(np.sum(labels == label)) for label in (0, 1)],
+        'qhat': qhat,
+    }
+
+
+def prediction_sets(p1, qhat):
+    """(rows, 2) boolean membership of [clear, threat] for threat probabilities p1"""
+    p1 = np.asarray(p1, dtype=np.float64)
+    return np.column_stack([p1 <= qhat[0], 1 - p1 <= qhat[1]])
+
+
+def format_sets(sets):
+    """Prediction sets as '|'-joined labels per row ('threat', 'clear|threat', '' for an empty set)"""
+    names = np.array(['', SET_LABELS[0], SET_LABELS[1], '|'.join(SET_LABELS)])
+    return names[sets[:, 0] * 1 + sets[:, 1] * 2]
+
+
+def coverage_report(p1, labels, calibration):
+    """Empirical coverage, overall and per label, average set size and singleton/empty shares for each alpha"""
+    labels = np.asarray(labels).astype(int)
+    report = {}
+    for key, qhat in calibration['qhat'].items():
+        sets = prediction_sets(p1, qhat)
+        covered = sets[np.arange(len(labels)), labels]
+        size = sets.sum(axis=1)
+        report[key] = {
+            'target_coverage': round(1 - float(key), 4),
+            'coverage': round(float(covered.mean()), 4) if len(labels) else None,
+            'label_coverage': {SET_LABELS[label]: round(float(covered[labels == label].mean()), 4)
+                               for label in (0, 1) if np.any(labels == label)},
+            'average_set_size': round(float(size.mean()), 4) if len(labels) else None,
+            'singleton_rate': round(float(np.mean(size == 1)), 4) if len(labels) else None,
+            'empty_rate': round(float(np.mean(size == 0)), 4) if len(labels) else None,
+            'rows': int(len(labels)),
+        }
+    return report
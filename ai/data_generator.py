@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Vectorized synthetic coastal data generator for benchmarks and capacity tests.
+
+Produces multi-station datasets in the same schema as cleaned_coastal_data.csv
+(plus a station_id column). Each station's series follow autocorrelated AR(1)
+processes with tides and seasonality, and occasional cyclone events that pull
+the cyclone distance down while driving up wind, waves, rain and surge.
+
+Data is generated in time chunks covering all stations, with the AR and event
+filter states carried between chunks, so memory stays bounded by --chunk-rows
+no matter how many rows are written. The same seed and chunk size always
+produce the same data.
+
+    python data_generator.py synthetic.csv --rows 1000000 --stations 100
+    python data_generator.py synthetic.parquet --rows 100000000 --stations 2000 --format parquet
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Latent AR(1) drivers: name -> lag-1 autocorrelation at an hourly step
+AR_DRIVERS = {
+    'sea_level': 0.97,
+    'wave': 0.90,
+    'wind': 0.85,
+    'rain': 0.80,
+    'sst': 0.995,
+    'chlorophyll': 0.98,
+    'turbidity': 0.95,
+    'erosion': 0.99,
+    'pollution': 0.98,
+    'cyclone': 0.995,
+    'confidence': 0.50,
+    'fisherfolk': 0.90,
+    'carbon': 0.95,
+}
+
+# One cyclone event per station roughly every 10 days
+DEFAULT_CYCLONE_EVENTS_PER_DAY = 0.1
+CYCLONE_EVENT_HOURS = 72
+
+TIDE_PERIOD_HOURS = 12.42
+
+# Six significant digits is well beyond sensor precision and formats ~35% faster
+CSV_FLOAT_FORMAT = '%.6g'
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class CoastalDataGenerator:
+    """Chunked generator of synthetic multi-station coastal readings"""
+
+    def __init__(self, n_stations=10, seed=42, start='2023-01-01', freq='1h',
+                 cyclone_events_per_day=DEFAULT_CYCLONE_EVENTS_PER_DAY):
+        self.n_stations = n_stations
+        self.rng = np.random.default_rng(seed)
+        self.start = np.datetime64(pd.Timestamp(start), 'ns')
+        self.step = pd.Timedelta(freq)
+        self.step_hours = self.step / pd.Timedelta(hours=1)
+
+        # Convert hourly autocorrelation to the configured step
+        self.phi = {name: phi ** self.step_hours for name, phi in AR_DRIVERS.items()}
+        # Filter state is phi * previous value; start from the stationary distribution
+        self.ar_state = {name: phi * self.rng.standard_normal((1, n_stations)) for name, phi in self.phi.items()}
+
+        # Cyclone intensity is the event starts convolved with a rise-and-decay profile
+        event_steps = max(2, int(round(CYCLONE_EVENT_HOURS / self.step_hours)))
+        self.event_kernel = np.concatenate([
+            np.linspace(0.2, 1.0, event_steps // 3, endpoint=False),
+            np.linspace(1.0, 0.0, event_steps - event_steps // 3),
+        ])
+        self.event_probability = min(1.0, cyclone_events_per_day * self.step_hours / 24)
+        self.event_state = np.zeros((len(self.event_kernel) - 1, n_stations))
+
+        # Static per-station characteristics
+        self.station_ids = np.array([f"STAT{i:03d}" if n_stations <= 1000 else f"STAT{i:06d}"
+                                     for i in range(n_stations)])
+        self.sea_level_offset = self.rng.normal(0, 0.15, n_stations)
+        self.sst_offset = self.rng.normal(0, 1.5, n_stations)
+        self.tide_amplitude = self.rng.uniform(0.2, 0.6, n_stations)
+        self.population = self.rng.integers(1000, 100000, n_stations)
+        self.infrastructure = self.rng.uniform(0.1, 0.9, n_stations)
+
+        self.steps_done = 0
+
+    def _ar(self, name, steps):
+        """Advance one AR(1) driver by `steps` for every station (unit stationary variance)"""
+        phi = self.phi[name]
+        noise = self.rng.standard_normal((steps, self.n_stations)) * math.sqrt(1 - phi ** 2)
+        values, self.ar_state[name] = lfilter([1.0], [1.0, -phi], noise, axis=0, zi=self.ar_state[name])
+        return values
+
+    def _cyclone_intensity(self, steps):
+        starts = self.rng.random((steps, self.n_stations)) < self.event_probability
+        strength = np.where(starts, self.rng.uniform(0.6, 1.0, (steps, self.n_stations)), 0.0)
+        intensity, self.event_state = lfilter(self.event_kernel, [1.0], strength, axis=0, zi=self.event_state)
+        return np.clip(intensity, 0.0, 1.0)
+
+    def next_chunk(self, steps):
+        """Generate the next `steps` time steps for all stations as a DataFrame"""
+        n = self.n_stations
+        z = {name: self._ar(name, steps) for name in AR_DRIVERS}
+        storm = self._cyclone_intensity(steps)
+
+        step_index = np.arange(self.steps_done, self.steps_done + steps)
+        hours = (step_index * self.step_hours)[:, None]
+        tide = self.tide_amplitude * np.sin(2 * np.pi * hours / TIDE_PERIOD_HOURS)
+        season = np.sin(2 * np.pi * hours / (24 * 365.25))
+
+        sea_level_anomaly = 0.2 * z['sea_level'] + 0.8 * storm
+        cyclone_base = 350 + 250 * _sigmoid(z['cyclone'])
+        sst = 25 + 3 * season + self.sst_offset + 0.6 * z['sst']
+        chlorophyll = 0.5 * np.exp(0.6 * z['chlorophyll'])
+
+        columns = {
+            'sea_level_m': 1.5 + self.sea_level_offset + tide + sea_level_anomaly,
+            'wave_height_m': 0.8 * np.exp(0.4 * z['wave']) + 3.0 * storm,
+            'wind_speed_kmph': 20 * np.exp(0.35 * z['wind']) + 90 * storm,
+            'rainfall_mm': np.maximum(0.0, 6 * (z['rain'] - 0.6)) + 40 * storm,
+            'sst_celsius': sst,
+            'chlorophyll_mg_m3': chlorophyll,
+            'turbidity_index': _sigmoid(z['turbidity'] + 2 * storm),
+            'sea_level_anomaly_m': sea_level_anomaly,
+            'storm_surge_risk_index': np.clip(0.15 + 0.8 * storm + 0.05 * z['sea_level'], 0, 1),
+            'coastal_erosion_risk': _sigmoid(z['erosion'] + 3 * storm - 0.3),
+            'algal_bloom_risk_index': _sigmoid(1.2 * z['chlorophyll'] + 0.3 * (sst - 25)),
+            'pollution_risk_index': _sigmoid(z['pollution']),
+            'cyclone_distance_km': np.maximum(5.0, cyclone_base * (1 - 0.95 * storm)),
+            'ai_confidence_score': 0.7 + 0.3 * _sigmoid(z['confidence']),
+            'population_exposed': np.broadcast_to(self.population, (steps, n)),
+            'fisherfolk_activity': _sigmoid(z['fisherfolk']) * (1 - storm),
+            'infrastructure_exposure_index': np.clip(self.infrastructure + 0.02 * z['erosion'], 0, 1),
+            'blue_carbon_loss_ton_co2': 50 * np.exp(0.5 * z['carbon']) + 100 * storm,
+        }
+
+        timestamps = self.start + (step_index * self.step.value).astype('timedelta64[ns]')
+        frame = {
+            'timestamp': np.repeat(timestamps, n),
+            'station_id': np.tile(self.station_ids, steps),
+        }
+        # Row order is time-major: all stations for step t, then step t+1
+        for name, values in columns.items():
+            frame[name] = np.ascontiguousarray(values).reshape(-1)
+
+        self.steps_done += steps
+        return pd.DataFrame(frame)
+
+    def chunks(self, n_rows, chunk_rows=500_000):
+        """Yield DataFrames totalling exactly `n_rows` rows"""
+        steps_per_chunk = max(1, chunk_rows // self.n_stations)
+        remaining = n_rows
+        while remaining > 0:
+            steps = min(steps_per_chunk, math.ceil(remaining / self.n_stations))
+            chunk = self.next_chunk(steps)
+            if len(chunk) > remaining:
+                chunk = chunk.iloc[:remaining]
+            remaining -= len(chunk)
+            yield chunk
+
+
+def generate_dataframe(n_rows, n_stations=1, seed=42, start='2023-01-01', freq='1h', **kwargs):
+    """Generate a dataset small enough to hold in memory as one DataFrame"""
+    generator = CoastalDataGenerator(n_stations=n_stations, seed=seed, start=start, freq=freq, **kwargs)
+    return pd.concat(list(generator.chunks(n_rows)), ignore_index=True)
+
+
+def write_dataset(path, n_rows, n_stations=10, seed=42, start='2023-01-01', freq='1h',
+                  file_format=None, chunk_rows=500_000, verbose=False, **kwargs):
+    """Stream a synthetic dataset to CSV or Parquet chunk by chunk"""
+    if file_format is None:
+        file_format = 'parquet' if path.endswith('.parquet') else 'csv'
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError(f"Unsupported format '{file_format}', expected 'csv' or 'parquet'")
+
+    generator = CoastalDataGenerator(n_stations=n_stations, seed=seed, start=start, freq=freq, **kwargs)
+    tmp_path = path + '.tmp'
+    written = 0
+    started = time.perf_counter()
+
+    writer = None
+    try:
+        if file_format == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+
+        for chunk in generator.chunks(n_rows, chunk_rows):
+            if file_format == 'csv':
+                chunk.to_csv(tmp_path, mode='w' if written == 0 else 'a', header=written == 0, index=False,
+                             float_format=CSV_FLOAT_FORMAT)
+            else:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            written += len(chunk)
+            if verbose:
+                rate = written / (time.perf_counter() - started)
+                print(f"  {written:,}/{n_rows:,} rows ({rate:,.0f} rows/s)")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    os.replace(tmp_path, path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic multi-station coastal data")
+    parser.add_argument('output', help="Output file (.csv or .parquet)")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--stations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start', default='2023-01-01')
+    parser.add_argument('--freq', default='1h', help="Time step between readings, e.g. 1h, 30min")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None)
+    parser.add_argument('--chunk-rows', type=int, default=500_000, help="Rows generated per chunk (bounds memory)")
+    parser.add_argument('--cyclones-per-day', type=float, default=DEFAULT_CYCLONE_EVENTS_PER_DAY,
+                        help="Cyclone events per station per day")
+    args = parser.parse_args()
+
+    print(f"🌊 Generating {args.rows:,} rows for {args.stations} stations -> {args.output}")
+    started = time.perf_counter()
+    written = write_dataset(
+        args.output, args.rows, n_stations=args.stations, seed=args.seed, start=args.start,
+        freq=args.freq, file_format=args.format, chunk_rows=args.chunk_rows, verbose=True,
+        cyclone_events_per_day=args.cyclones_per_day
+    )
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Data version tracking for change-aware retraining.
+
+Each trained component (one classifier per threat, one ARIMA model per
+target) records a profile of the data it was trained on: row count, a content
+hash, and summary statistics. When a retrain is requested, the current data is
+profiled again. A component is retrained only if its inputs have grown, its
+label distribution has drifted, or its features have shifted past a threshold.
+"""
+
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+from training_cache import fingerprint
+
+# Retrain when the row count grew by at least this fraction
+DEFAULT_GROWTH_THRESHOLD = 0.10
+# Retrain a classifier when its positive label rate moved by this much (absolute)
+DEFAULT_LABEL_DRIFT_THRESHOLD = 0.05
+# Retrain when any feature mean moved by this many training standard deviations
+DEFAULT_FEATURE_DRIFT_THRESHOLD = 0.25
+
+DEFAULT_THRESHOLDS = {
+    'growth': DEFAULT_GROWTH_THRESHOLD,
+    'label_drift': DEFAULT_LABEL_DRIFT_THRESHOLD,
+    'feature_drift': DEFAULT_FEATURE_DRIFT_THRESHOLD,
+}
+
+
+def classifier_profile(features, labels):
+    """Profile of a threat classifier's inputs (raw feature frame and label series)"""
+    stds = features.std().replace(0, 1.0).fillna(1.0)
+    return {
+        'rows': int(len(labels)),
+        'hash': fingerprint(features) + fingerprint(labels),
+        'positive_rate': float(np.mean(labels)),
+        'feature_means': {name: float(value) for name, value in features.mean().items()},
+        'feature_stds': {name: float(value) for name, value in stds.items()},
+    }
+
+
+def series_profile(series):
+    """Profile of an ARIMA target series"""
+    std = float(series.std()) or 1.0
+    return {
+        'rows': int(len(series)),
+        'hash': fingerprint(series),
+        'feature_means': {'value': float(series.mean())},
+        'feature_stds': {'value': std},
+        'last_timestamp': str(series.index[-1]) if len(series) else None,
+    }
+
+
+def stamp_version(profile):
+    """Attach a version id and training time to a profile"""
+    trained_at = datetime.now().isoformat()
+    profile = dict(profile)
+    profile['trained_at'] = trained_at
+    profile['version'] = hashlib.blake2b(f"{profile['hash']}|{trained_at}".encode(), digest_size=6).hexdigest()
+    return profile
+
+
+def change_reason(previous, current, thresholds=None):
+    """
+    Why a component needs retraining, or None if it does not.
+
+    Returns None when the inputs are unchanged or changed less than every
+    threshold.
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+
+    if previous is None:
+        return 'no recorded training version'
+    if previous.get('hash') == current['hash']:
+        return None
+
+    old_rows = previous.get('rows') or 0
+    if old_rows == 0:
+        return 'no recorded row count'
+    growth = (current['rows'] - old_rows) / old_rows
+    if abs(growth) >= thresholds['growth']:
+        return f"rows changed by {growth:+.1%} ({old_rows} -> {current['rows']})"
+
+    if 'positive_rate' in current and 'positive_rate' in previous:
+        drift = current['positive_rate'] - previous['positive_rate']
+        if abs(drift) >= thresholds['label_drift']:
+            return f"positive rate drifted {previous['positive_rate']:.3f} -> {current['positive_rate']:.3f}"
+
+    old_means = previous.get('feature_means', {})
+    old_stds = previous.get('feature_stds', {})
+    worst_name, worst_shift = None, 0.0
+    for name, mean in current.get('feature_means', {}).items():
+        if name not in old_means:
+            continue
+        shift = abs(mean - old_means[name]) / (old_stds.get(name) or 1.0)
+        if shift > worst_shift:
+            worst_name, worst_shift = name, shift
+    if worst_shift >= thresholds['feature_drift']:
+        return f"{worst_name} mean shifted {worst_shift:.2f} standard deviations"
+
+    return None
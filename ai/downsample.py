@@ -0,0 +1,92 @@
+"""
+Shape-preserving downsampling of time series for charts.
+
+Both methods return the indices of the points to keep, in order, so the
+caller can take timestamps, values and any aligned columns (forecast
+intervals) with one fancy index. The first and last points are always kept.
+
+- lttb (Largest-Triangle-Three-Buckets): the points between the ends are
+  split into n_out - 2 equal buckets. From each bucket the point forming the
+  largest triangle with the point kept from the previous bucket and the
+  average of the next bucket is kept. Peaks and troughs survive and the
+  line keeps its visual shape with exactly n_out points.
+- minmax: the points are split into buckets and each bucket keeps its minimum
+  and its maximum. No extreme is lost (a storm surge spike always shows), at
+  up to two points per bucket, so it needs n_out >= 4.
+"""
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+# Smallest n_out of each method: both ends plus one point, or one bucket's minimum and maximum
+MIN_POINTS = {'lttb': 3, 'minmax': 4}
+
+
+def _bucket_edges(n, buckets, offset=0):
+    """Start positions of `buckets` equal buckets over n points, plus the end"""
+    return offset + (np.arange(buckets + 1) * n) // buckets
+
+
+def lttb(x, y, n_out):
+    """Indices of n_out (at least 3) points of (x, y) chosen by Largest-Triangle-Three-Buckets"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out < MIN_POINTS['lttb']:
+        raise ValueError(f"lttb needs n_out >= {MIN_POINTS['lttb']}")
+    if n <= n_out:
+        return np.arange(n)
+
+    edges = _bucket_edges(n - 2, n_out - 2, offset=1)
+    # Average of each bucket, and of the last point as the bucket after the last one
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    next_x = np.append(sums_x[1:] / counts[1:], x[-1])
+    next_y = np.append(sums_y[1:] / counts[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area, up to sign; the constant factor does not change the argmax
+        area = np.abs((x[previous] - next_x[bucket]) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax(x, y, n_out):
+    """Indices of the minimum and maximum of each bucket, at most n_out (at least 4) points in x order"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out < MIN_POINTS['minmax']:
+        raise ValueError(f"minmax needs n_out >= {MIN_POINTS['minmax']}")
+    if n <= n_out:
+        return np.arange(n)
+
+    # Two points per bucket between the ends
+    buckets = (n_out - 2) // 2
+    edges = _bucket_edges(n - 2, buckets, offset=1)
+    starts = edges[:-1]
+    lowest = np.minimum.reduceat(y[1:n - 1], starts - 1)
+    highest = np.maximum.reduceat(y[1:n - 1], starts - 1)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+    inner = np.arange(1, n - 1)
+    # First position of each bucket's minimum and maximum
+    is_min = y[1:n - 1] == lowest[bucket_of]
+    is_max = y[1:n - 1] == highest[bucket_of]
+    first_min = inner[is_min][np.unique(bucket_of[is_min], return_index=True)[1]]
+    first_max = inner[is_max][np.unique(bucket_of[is_max], return_index=True)[1]]
+    return np.unique(np.concatenate([[0], first_min, first_max, [n - 1]]))
+
+
+def downsample(x, y, n_out, method='lttb'):
+    """Indices kept by `method` ('lttb' or 'minmax')"""
+    if method == 'lttb':
+        return lttb(x, y, n_out)
+    if method == 'minmax':
+        return minmax(x, y, n_out)
+    raise ValueError(f"Unknown downsampling method '{method}', expected one of {list(DOWNSAMPLE_METHODS)}")
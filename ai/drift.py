@@ -0,0 +1,170 @@
+"""
+Streaming feature drift detection.
+
+At training time a reference profile is captured for every feature column:
+quantile bin edges and the share of training rows in each bin. Live inputs
+are counted into the same bins by a DriftMonitor, which keeps a sliding window
+as a ring of fixed-size block histograms. Memory is constant
+(blocks x features x bins integers) and observing a row is one vectorized
+comparison against the bin edges for all features.
+
+Drift is scored per feature with the Population Stability Index and a binned
+Kolmogorov-Smirnov statistic (the largest gap between the two cumulative bin
+distributions).
+"""
+
+import json
+import threading
+
+import numpy as np
+
+DEFAULT_BINS = 10
+DEFAULT_BLOCK_ROWS = 200
+DEFAULT_WINDOW_BLOCKS = 10
+# Windows with fewer rows than this are reported but not classified
+MIN_WINDOW_ROWS = 50
+
+# Conventional PSI bands: below 0.1 stable, below 0.25 moderate shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+_EPSILON = 1e-4
+
+
+def build_reference(frame, bins=DEFAULT_BINS):
+    """Reference profile (bin edges and proportions) for each column of `frame`"""
+    features = {}
+    quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+    for name in frame.columns:
+        values = frame[name].to_numpy(dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            continue
+        # Interior edges only; duplicate edges (constant or discrete columns) are merged
+        edges = np.unique(np.quantile(values, quantiles))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        features[name] = {
+            'edges': edges.tolist(),
+            'proportions': (counts / counts.sum()).tolist(),
+        }
+    return {'rows': int(len(frame)), 'bins': bins, 'features': features}
+
+
+def save_reference(reference, path):
+    with open(path, 'w') as f:
+        json.dump(reference, f)
+
+
+def load_reference(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, actual):
+    """Population Stability Index between two bin distributions"""
+    expected = np.clip(np.asarray(expected, dtype=np.float64), _EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), _EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(expected, actual):
+    """Largest gap between the cumulative bin distributions"""
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+
+
+def drift_status(value):
+    if value >= PSI_SIGNIFICANT:
+        return 'significant'
+    if value >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+class DriftMonitor:
+    """Sliding-window bin counts for live inputs, compared against a reference profile"""
+
+    def __init__(self, reference, block_rows=DEFAULT_BLOCK_ROWS, window_blocks=DEFAULT_WINDOW_BLOCKS):
+        self.reference = reference
+        self.block_rows = block_rows
+        self.window_blocks = window_blocks
+        self.feature_names = list(reference['features'])
+        self._edges = [np.asarray(reference['features'][name]['edges']) for name in self.feature_names]
+        self._expected = [np.asarray(reference['features'][name]['proportions']) for name in self.feature_names]
+        width = max(len(edges) + 1 for edges in self._edges) if self._edges else 1
+        # Edges padded with +inf so every feature has the same number of edges
+        self._edge_matrix = np.full((len(self.feature_names), width - 1), np.inf)
+        for i, edges in enumerate(self._edges):
+            self._edge_matrix[i, :len(edges)] = edges
+        # Ring of per-block histograms; the window is the sum over all blocks
+        self._blocks = np.zeros((window_blocks, len(self.feature_names), width), dtype=np.int64)
+        self._block_fill = np.zeros(window_blocks, dtype=np.int64)
+        self._current = 0
+        self._lock = threading.Lock()
+        self.rows_observed = 0
+
+    def observe(self, frame):
+        """Count rows into the window; `frame` is a DataFrame or an array in feature_names order"""
+        if hasattr(frame, 'columns'):
+            X = frame[self.feature_names].to_numpy(dtype=np.float64)
+        else:
+            X = np.atleast_2d(np.asarray(frame, dtype=np.float64))
+        # Bin index = number of edges <= value (searchsorted side='right' for all features at once)
+        bins = (X[:, :, None] >= self._edge_matrix[None]).sum(axis=2)
+        finite = np.isfinite(X)
+        feature_index = np.broadcast_to(np.arange(len(self.feature_names)), bins.shape)
+
+        with self._lock:
+            start = 0
+            while start < len(bins):
+                if self._block_fill[self._current] >= self.block_rows:
+                    # Oldest block drops out of the window
+                    self._current = (self._current + 1) % self.window_blocks
+                    self._blocks[self._current] = 0
+                    self._block_fill[self._current] = 0
+                stop = min(len(bins), start + self.block_rows - self._block_fill[self._current])
+                mask = finite[start:stop]
+                np.add.at(self._blocks[self._current], (feature_index[start:stop][mask], bins[start:stop][mask]), 1)
+                self._block_fill[self._current] += stop - start
+                start = stop
+            self.rows_observed += len(X)
+
+    def report(self):
+        """PSI and binned KS per feature over the current window"""
+        with self._lock:
+            window = self._blocks.sum(axis=0)
+            window_rows = int(self._block_fill.sum())
+
+        features = {}
+        for i, name in enumerate(self.feature_names):
+            expected = self._expected[i]
+            counts = window[i, :len(expected)]
+            total = counts.sum()
+            if total == 0:
+                continue
+            actual = counts / total
+            features[name] = {
+                'psi': round(psi(expected, actual), 6),
+                'ks': round(binned_ks(expected, actual), 6),
+                'rows': int(total),
+            }
+            if window_rows >= MIN_WINDOW_ROWS:
+                features[name]['status'] = drift_status(features[name]['psi'])
+
+        drifted = sorted((name for name, stats in features.items() if stats.get('status') == 'significant'),
+                         key=lambda name: features[name]['psi'], reverse=True)
+        return {
+            'window_rows': window_rows,
+            'window_capacity': self.block_rows * self.window_blocks,
+            'rows_observed': self.rows_observed,
+            'reference_rows': self.reference['rows'],
+            'sufficient_data': window_rows >= MIN_WINDOW_ROWS,
+            'max_psi': max((stats['psi'] for stats in features.values()), default=0.0),
+            'drifted_features': drifted,
+            'features': features,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._blocks[:] = 0
+            self._block_fill[:] = 0
+            self._current = 0
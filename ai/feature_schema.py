@@ -0,0 +1,198 @@
+"""
+Compiled schema for the model's input features.
+
+FEATURE_SCHEMA fixes the column order the scaler and classifiers expect, each
+column's type, the default used when a request omits it, and the physically
+plausible range. decode()/decode_batch() turn request JSON (dicts) straight
+into rows of a float64 buffer in that order, without building a DataFrame.
+
+Absent fields take the default. Explicit nulls become NaN and are imputed by
+the predictor with training-time medians. Values of the wrong type or outside
+the range raise SchemaError listing every problem.
+"""
+
+import math
+import numbers
+import threading
+
+import numpy as np
+
+
+class SchemaError(ValueError):
+    """Request values that do not match the feature schema"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f"{error['field']}: {error['message']}" for error in errors[:5])
+                         + (f" (+{len(errors) - 5} more)" if len(errors) > 5 else ''))
+
+
+class FeatureField:
+    """One input column: type ('float' or 'int'), default and inclusive range (None = unbounded)"""
+
+    def __init__(self, name, dtype='float', default=0.0, minimum=None, maximum=None):
+        self.name = name
+        self.dtype = dtype
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+
+
+class FeatureSchema:
+    """Column order, defaults and ranges compiled into arrays for fast decoding"""
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.columns = [field.name for field in self.fields]
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.defaults = np.array([field.default for field in self.fields], dtype=np.float64)
+        self.minimum = np.array([-math.inf if f.minimum is None else f.minimum for f in self.fields])
+        self.maximum = np.array([math.inf if f.maximum is None else f.maximum for f in self.fields])
+        self.integer = np.array([field.dtype == 'int' for field in self.fields])
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.columns)
+
+    def buffer(self, rows):
+        """Per-thread reusable (rows, n_features) buffer; overwritten by the next decode on this thread"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < rows:
+            capacity = 1 << max(0, rows - 1).bit_length()
+            buffer = self._local.buffer = np.empty((capacity, len(self.columns)), dtype=np.float64)
+        return buffer[:rows]
+
+    @staticmethod
+    def _coerce(value):
+        """float(value) for numbers and numeric strings, NaN for None/NaN; raises TypeError otherwise"""
+        if value is None:
+            return math.nan
+        if isinstance(value, (bool, np.bool_)):
+            raise TypeError("expected a number, got a boolean")
+        if isinstance(value, numbers.Real):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                raise TypeError(f"expected a number, got '{value[:40]}'")
+        raise TypeError(f"expected a number, got {type(value).__name__}")
+
+    def _decode_into(self, record, row, errors, position=None):
+        if not isinstance(record, dict):
+            errors.append({'field': '<record>', 'row': position, 'message': 'expected an object'})
+            return
+        row[:] = self.defaults
+        index = self.index
+        for name, value in record.items():
+            i = index.get(name)
+            if i is None:
+                continue  # timestamp, station_id and other metadata
+            try:
+                row[i] = self._coerce(value)
+            except TypeError as e:
+                # The default stays in place so range checks still cover the other fields
+                errors.append({'field': name, 'row': position, 'message': str(e)})
+
+    def _validate(self, X, errors, batch):
+        finite = np.isfinite(X)
+        with np.errstate(invalid='ignore'):
+            bad_range = finite & ((X < self.minimum) | (X > self.maximum))
+            bad_int = finite & self.integer & (X != np.round(X))
+        bad_inf = np.isinf(X)
+        for kind, mask in (('range', bad_range), ('int', bad_int), ('inf', bad_inf)):
+            for r, c in zip(*np.nonzero(mask)):
+                field = self.fields[c]
+                if kind == 'range':
+                    message = f"{X[r, c]:g} outside [{field.minimum}, {field.maximum}]"
+                elif kind == 'int':
+                    message = f"expected an integer, got {X[r, c]:g}"
+                else:
+                    message = "must be finite"
+                errors.append({'field': field.name, 'row': int(r) if batch else None, 'message': message})
+
+    def decode(self, record, out=None):
+        """Decode one JSON object into a (1, n_features) array"""
+        X = out if out is not None else self.buffer(1)
+        errors = []
+        self._decode_into(record, X[0], errors)
+        self._validate(X, errors, batch=False)
+        if errors:
+            raise SchemaError(errors)
+        return X
+
+    def decode_batch(self, records, out=None):
+        """Decode a list of JSON objects into a (len(records), n_features) array"""
+        if not isinstance(records, list) or not records:
+            raise SchemaError([{'field': '<batch>', 'row': None, 'message': 'expected a non-empty list of objects'}])
+        X = out if out is not None else self.buffer(len(records))
+        errors = []
+        for position, record in enumerate(records):
+            self._decode_into(record, X[position], errors, position)
+        self._validate(X, errors, batch=True)
+        if errors:
+            raise SchemaError(errors)
+        return X
+
+    def decode_columns(self, columns, out=None):
+        """
+        Decode columnar input (name -> sequence or array) into a (rows, n_features) array
+
+        Each column is converted with one NumPy call, so there is no per-row
+        parsing. Absent columns take the default; None/null becomes NaN.
+        """
+        lengths = {len(values) for name, values in columns.items() if name in self.index}
+        if len(lengths) > 1:
+            raise SchemaError([{'field': '<columns>', 'row': None, 'message': f'columns have different lengths {sorted(lengths)}'}])
+        rows = lengths.pop() if lengths else 0
+        if rows == 0:
+            raise SchemaError([{'field': '<columns>', 'row': None, 'message': 'expected at least one row of feature columns'}])
+        X = out if out is not None else self.buffer(rows)
+        X[:] = self.defaults
+        errors = []
+        for name, values in columns.items():
+            i = self.index.get(name)
+            if i is None:
+                continue
+            try:
+                array = np.asarray(values)
+                if array.dtype == np.bool_:
+                    raise TypeError("expected numbers, got booleans")
+                X[:, i] = array if array.dtype.kind in 'fiu' else np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError) as e:
+                errors.append({'field': name, 'row': None, 'message': f"expected numbers ({e})"})
+        self._validate(X, errors, batch=True)
+        if errors:
+            raise SchemaError(errors)
+        return X
+
+    def to_dict(self):
+        return [{'name': f.name, 'dtype': f.dtype, 'default': f.default, 'minimum': f.minimum, 'maximum': f.maximum}
+                for f in self.fields]
+
+
+# Feature columns in the order the scaler and classifiers were trained on.
+# Risk and score indices are 0-1 in the training data but some feeds send
+# them as percentages, so they accept 0-100.
+FEATURE_SCHEMA = FeatureSchema([
+    FeatureField('sea_level_m', default=25.0, minimum=-50, maximum=50),
+    FeatureField('wave_height_m', default=0.0, minimum=0, maximum=50),
+    FeatureField('wind_speed_kmph', default=0.0, minimum=0, maximum=500),
+    FeatureField('rainfall_mm', default=0.0, minimum=0, maximum=2000),
+    FeatureField('sst_celsius', default=25.0, minimum=-5, maximum=45),
+    FeatureField('chlorophyll_mg_m3', default=0.5, minimum=0, maximum=1000),
+    FeatureField('turbidity_index', default=0.0, minimum=0, maximum=100),
+    FeatureField('sea_level_anomaly_m', default=0.0, minimum=-20, maximum=20),
+    FeatureField('storm_surge_risk_index', default=0.0, minimum=0, maximum=100),
+    FeatureField('coastal_erosion_risk', default=0.0, minimum=0, maximum=100),
+    FeatureField('algal_bloom_risk_index', default=0.0, minimum=0, maximum=100),
+    FeatureField('pollution_risk_index', default=0.0, minimum=0, maximum=100),
+    FeatureField('cyclone_distance_km', default=0.0, minimum=0, maximum=40075),
+    FeatureField('ai_confidence_score', default=0.0, minimum=0, maximum=100),
+    FeatureField('population_exposed', dtype='int', default=0, minimum=0),
+    FeatureField('fisherfolk_activity', default=0.0, minimum=0),
+    FeatureField('infrastructure_exposure_index', default=0.0, minimum=0, maximum=100),
+    FeatureField('blue_carbon_loss_ton_co2', default=0.5, minimum=0),
+])
+
+FEATURE_COLUMNS = FEATURE_SCHEMA.columns
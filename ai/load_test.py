@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the Coastal Threat Prediction API.
+
+Three ways to drive the server:
+
+- rate:        open loop, requests are issued on a fixed schedule (--rate per second)
+- concurrency: closed loop, N workers send requests back to back
+- replay:      re-send a recording made with BLUEGUARD_RECORD_PATH at its
+               original timing, or faster with --speed
+
+Reports throughput and p50/p95/p99/p999 latency per endpoint. In rate and
+replay mode latency is measured from the scheduled send time, so a server that
+falls behind is not hidden by the load generator waiting for it.
+
+    python load_test.py rate --rate 50 --duration 30
+    python load_test.py concurrency --concurrency 16 --duration 30 --mix predict:8,health:1,crisis-status:1
+    python load_test.py replay recorded_predict.jsonl --speed 4
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from traffic_recorder import read_recording
+
+# app.py serves on port 5001
+BASE_URL = "http://localhost:5001"
+
+PERCENTILES = [50, 95, 99, 99.9]
+
+# Sample /predict body used when no recording is supplied (same as test_api.py)
+SAMPLE_PREDICT_PAYLOAD = {
+    "sea_level_m": 1.8,
+    "wave_height_m": 2.5,
+    "wind_speed_kmph": 45,
+    "rainfall_mm": 12.5,
+    "sst_celsius": 28.5,
+    "chlorophyll_mg_m3": 0.8,
+    "turbidity_index": 0.6,
+    "sea_level_anomaly_m": 0.4,
+    "storm_surge_risk_index": 0.7,
+    "coastal_erosion_risk": 0.5,
+    "algal_bloom_risk_index": 0.6,
+    "pollution_risk_index": 0.4,
+    "cyclone_distance_km": 120,
+    "ai_confidence_score": 0.85,
+    "population_exposed": 50000,
+    "fisherfolk_activity": 0.8,
+    "infrastructure_exposure_index": 0.6,
+    "blue_carbon_loss_ton_co2": 75.0
+}
+
+# Endpoints that can be part of a synthetic traffic mix: name -> (method, path)
+ENDPOINTS = {
+    'predict': ('POST', '/predict'),
+    'health': ('GET', '/health'),
+    'crisis-status': ('GET', '/crisis-status'),
+    'model-info': ('GET', '/model-info'),
+    'threat-report': ('GET', '/threat-report'),
+    'forecast': ('GET', '/forecast'),
+}
+
+
+def jittered_payload(rng):
+    """Sample /predict body with +/-10% noise so requests are not identical"""
+    return {key: round(value * rng.uniform(0.9, 1.1), 4) for key, value in SAMPLE_PREDICT_PAYLOAD.items()}
+
+
+class LatencyStats:
+    """Thread-safe collection of per-endpoint latencies and errors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+        self.started = None
+        self.finished = None
+
+    def add(self, endpoint, latency, status_code):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.status_codes[endpoint][status_code] += 1
+            if status_code is None or status_code >= 400:
+                self.errors[endpoint] += 1
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        report = {'elapsed_s': elapsed, 'endpoints': {}}
+        total = 0
+        for endpoint, values in sorted(self.latencies.items()):
+            latencies_ms = np.asarray(values) * 1000
+            total += len(values)
+            stats = {
+                'requests': len(values),
+                'errors': self.errors[endpoint],
+                'throughput_rps': len(values) / elapsed if elapsed > 0 else 0.0,
+                'mean_ms': float(latencies_ms.mean()),
+                'max_ms': float(latencies_ms.max()),
+                'status_codes': {str(code): count for code, count in self.status_codes[endpoint].items()},
+            }
+            for p, value in zip(PERCENTILES, np.percentile(latencies_ms, PERCENTILES)):
+                stats[f"p{str(p).replace('.', '')}_ms"] = float(value)
+            report['endpoints'][endpoint] = stats
+        report['total_requests'] = total
+        report['throughput_rps'] = total / elapsed if elapsed > 0 else 0.0
+        return report
+
+
+class LoadGenerator:
+    """Sends requests to the API and records their latency"""
+
+    def __init__(self, base_url=BASE_URL, timeout=30, max_workers=64):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.stats = LatencyStats()
+        self._local = threading.local()
+
+    def _session(self):
+        # One keep-alive session per worker thread
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, endpoint, method, path, payload=None, scheduled=None):
+        """Send one request; latency is counted from `scheduled` when given"""
+        start = scheduled if scheduled is not None else time.perf_counter()
+        status_code = None
+        try:
+            if method == 'POST':
+                response = self._session().post(self.base_url + path, json=payload, timeout=self.timeout)
+            else:
+                response = self._session().get(self.base_url + path, timeout=self.timeout)
+            status_code = response.status_code
+        except requests.RequestException:
+            pass
+        self.stats.add(endpoint, time.perf_counter() - start, status_code)
+
+    def run_schedule(self, schedule):
+        """
+        Open loop: send each (offset_s, endpoint, method, path, payload) at its offset.
+
+        Requests are handed to a thread pool so a slow response never delays
+        the next scheduled send.
+        """
+        self.stats.started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for offset, endpoint, method, path, payload in schedule:
+                scheduled = self.stats.started + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, endpoint, method, path, payload, scheduled)
+        self.stats.finished = time.perf_counter()
+        return self.stats
+
+    def run_closed_loop(self, concurrency, duration, next_request):
+        """Closed loop: `concurrency` workers send back to back for `duration` seconds"""
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                endpoint, method, path, payload = next_request()
+                self.send(endpoint, method, path, payload)
+
+        self.stats.started = time.perf_counter()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stats.finished = time.perf_counter()
+        return self.stats
+
+
+def parse_mix(text):
+    """Parse 'predict:8,health:1' into a list of (endpoint, weight)"""
+    mix = []
+    for item in text.split(','):
+        name, _, weight = item.partition(':')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {sorted(ENDPOINTS)}")
+        mix.append((name, float(weight) if weight else 1.0))
+    return mix
+
+
+def request_picker(mix, seed=None):
+    """Return a function that draws (endpoint, method, path, payload) from the mix"""
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    lock = threading.Lock()
+
+    def pick():
+        with lock:
+            name = rng.choices(names, weights)[0]
+            payload = jittered_payload(rng) if name == 'predict' else None
+        method, path = ENDPOINTS[name]
+        return name, method, path, payload
+
+    return pick
+
+
+def rate_schedule(rate, duration, pick):
+    """Evenly spaced schedule at `rate` requests per second"""
+    count = int(rate * duration)
+    return [(i / rate,) + pick() for i in range(count)]
+
+
+def replay_schedule(recording_path, speed=1.0, limit=None):
+    """Schedule recorded requests at their original relative timing divided by `speed`"""
+    entries = read_recording(recording_path)
+    if limit:
+        entries = entries[:limit]
+    if not entries:
+        return []
+    first = entries[0]['ts']
+    schedule = []
+    for entry in entries:
+        offset = (entry['ts'] - first) / speed if speed > 0 else 0.0
+        path = entry.get('path', '/predict')
+        endpoint = path.strip('/') or path
+        schedule.append((offset, endpoint, entry.get('method', 'POST'), path, entry.get('payload')))
+    return schedule
+
+
+def print_report(report, title):
+    print("\n" + "=" * 96)
+    print(f"📊 {title}")
+    print("=" * 96)
+    print(f"{'endpoint':<16} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'p999 ms':>9} {'max ms':>9}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<16} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps']:>9.1f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['p999_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    print(f"\nTotal: {report['total_requests']} requests in {report['elapsed_s']:.1f}s ({report['throughput_rps']:.1f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Coastal Threat Prediction API")
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--max-workers', type=int, default=64, help="Thread pool size for open-loop modes")
+    parser.add_argument('--json', dest='json_path', help="Write the report as JSON to this file")
+    parser.add_argument('--seed', type=int, default=None)
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    rate_parser = subparsers.add_parser('rate', help="Open loop at a fixed request rate")
+    rate_parser.add_argument('--rate', type=float, required=True, help="Requests per second")
+    rate_parser.add_argument('--duration', type=float, default=30)
+    rate_parser.add_argument('--mix', default='predict:1')
+
+    concurrency_parser = subparsers.add_parser('concurrency', help="Closed loop with N concurrent workers")
+    concurrency_parser.add_argument('--concurrency', type=int, required=True)
+    concurrency_parser.add_argument('--duration', type=float, default=30)
+    concurrency_parser.add_argument('--mix', default='predict:1')
+
+    replay_parser = subparsers.add_parser('replay', help="Replay a recording made with BLUEGUARD_RECORD_PATH")
+    replay_parser.add_argument('recording')
+    replay_parser.add_argument('--speed', type=float, default=1.0,
+                               help="Time compression factor (2 = twice as fast, 0 = as fast as possible)")
+    replay_parser.add_argument('--limit', type=int, default=None, help="Replay only the first N requests")
+
+    args = parser.parse_args()
+    generator = LoadGenerator(args.base_url, timeout=args.timeout, max_workers=args.max_workers)
+
+    if args.mode == 'rate':
+        schedule = rate_schedule(args.rate, args.duration, request_picker(parse_mix(args.mix), args.seed))
+        print(f"🚀 Sending {len(schedule)} requests at {args.rate:g} req/s to {args.base_url}")
+        stats = generator.run_schedule(schedule)
+        title = f"OPEN LOOP @ {args.rate:g} req/s"
+    elif args.mode == 'concurrency':
+        print(f"🚀 Running {args.concurrency} workers for {args.duration:g}s against {args.base_url}")
+        stats = generator.run_closed_loop(args.concurrency, args.duration,
+                                          request_picker(parse_mix(args.mix), args.seed))
+        title = f"CLOSED LOOP x{args.concurrency}"
+    else:
+        schedule = replay_schedule(args.recording, args.speed, args.limit)
+        if not schedule:
+            print(f"❌ No requests found in {args.recording}")
+            sys.exit(1)
+        print(f"🚀 Replaying {len(schedule)} requests spanning {schedule[-1][0]:.1f}s (speed x{args.speed:g})")
+        stats = generator.run_schedule(schedule)
+        title = f"REPLAY x{args.speed:g}"
+
+    report = stats.summary()
+    if not report['endpoints']:
+        print("❌ No requests were sent")
+        sys.exit(1)
+    print_report(report, title)
+
+    if args.json_path:
+        report['mode'] = args.mode
+        report['base_url'] = args.base_url
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
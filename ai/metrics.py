@@ -0,0 +1,79 @@
+"""
+Minimal Prometheus metrics registry.
+
+Counters and gauges are kept in memory with optional labels and rendered in
+the Prometheus text exposition format by /metrics. Collectors are callbacks
+that produce gauge samples at scrape time, for values that are expensive to
+keep current on every request (e.g. drift statistics).
+"""
+
+import threading
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in sorted(labels.items()):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and scrape-time collectors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _declare(self, name, kind, help_text):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = {'type': kind, 'help': help_text, 'samples': {}}
+            return self._metrics[name]
+
+    def counter(self, name, help_text):
+        self._declare(name, 'counter', help_text)
+
+    def gauge(self, name, help_text):
+        self._declare(name, 'gauge', help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            samples = self._metrics[name]['samples']
+            samples[key] = samples.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._metrics[name]['samples'][key] = value
+
+    def register_collector(self, collect):
+        """collect() returns [(name, help, type, [(labels_dict, value), ...]), ...]"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            families = [(name, metric['help'], metric['type'],
+                         [(dict(key), value) for key, value in metric['samples'].items()])
+                        for name, metric in self._metrics.items()]
+            collectors = list(self._collectors)
+        for collect in collectors:
+            families.extend(collect())
+
+        lines = []
+        for name, help_text, kind, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {float(value):.10g}")
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the API
+registry = MetricsRegistry()
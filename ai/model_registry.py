@@ -0,0 +1,185 @@
+"""
+On-demand registry of per-station models.
+
+Artifacts are joblib files under <directory>/<station>/<threat>/<version>.pkl.
+Each (station, threat) directory has a CURRENT file naming its active version,
+swapped atomically on publish. get(station, threat, version=None) resolves
+the version (CURRENT when None) and loads the artifact on first use.
+
+Loaded artifacts stay in an in-memory LRU bounded by memory_budget bytes.
+An artifact's footprint is estimated by its file size, which for uncompressed
+joblib pickles of NumPy-backed estimators is close to its size in memory.
+When several threads ask for the same artifact that is not loaded yet, one
+thread loads it and the others wait for that load.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import joblib
+
+DEFAULT_REGISTRY_DIR = 'model_registry'
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+CURRENT = 'CURRENT'
+
+
+class ModelNotFound(KeyError):
+    """No artifact registered for a (station, threat, version)"""
+
+
+def _check_name(kind, value):
+    value = str(value)
+    if not value or value in ('.', '..') or '/' in value or '\\' in value or value == CURRENT:
+        raise ValueError(f"Invalid {kind} '{value}'")
+    return value
+
+
+class ModelRegistry:
+    """Lazily loaded (station, threat, version) artifacts with an LRU memory budget"""
+
+    def __init__(self, directory=DEFAULT_REGISTRY_DIR, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()   # (station, threat, version) -> (artifact, size)
+        self._bytes = 0
+        self._loading = {}            # key -> Future of the load in progress
+        self._current = {}            # (station, threat) -> (CURRENT mtime_ns, version)
+        os.makedirs(directory, exist_ok=True)
+
+    def _dir(self, station, threat):
+        return os.path.join(self.directory, _check_name('station', station), _check_name('threat', threat))
+
+    def publish(self, station, threat, artifact, version, activate=True):
+        """Write an artifact as `version` and, by default, make it the CURRENT version"""
+        directory = self._dir(station, threat)
+        version = _check_name('version', version)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{version}.pkl")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)
+        if activate:
+            self.activate(station, threat, version)
+        return path
+
+    def activate(self, station, threat, version):
+        directory = self._dir(station, threat)
+        if not os.path.exists(os.path.join(directory, f"{version}.pkl")):
+            raise ModelNotFound((str(station), threat, version))
+        pointer = os.path.join(directory, CURRENT)
+        tmp_path = f"{pointer}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, pointer)
+
+    def resolve(self, station, threat, version=None):
+        """Concrete version for a lookup; CURRENT is re-read only when its file changes"""
+        if version is not None:
+            return _check_name('version', version)
+        pointer = os.path.join(self._dir(station, threat), CURRENT)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+        except OSError:
+            raise ModelNotFound((str(station), threat, None))
+        key = (str(station), threat)
+        cached = self._current.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(pointer) as f:
+            current = f.read().strip()
+        self._current[key] = (mtime, current)
+        return current
+
+    def get(self, station, threat, version=None):
+        """The artifact for (station, threat, version), loading it on first use; raises ModelNotFound"""
+        version = self.resolve(station, threat, version)
+        key = (str(station), threat, version)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            path = os.path.join(self._dir(station, threat), f"{version}.pkl")
+            try:
+                artifact = joblib.load(path)
+            except FileNotFoundError:
+                raise ModelNotFound(key)
+            size = os.path.getsize(path)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._cache[key] = (artifact, size)
+            self._bytes += size
+            del self._loading[key]
+            self._evict(keep=key)
+        future.set_result(artifact)
+        return artifact
+
+    def find(self, station, threat, version=None):
+        """get(), or None when nothing is registered (or the station id is not a valid name)"""
+        try:
+            return self.get(station, threat, version)
+        except (ModelNotFound, ValueError):
+            return None
+
+    def _evict(self, keep=None):
+        """Drop least recently used artifacts until the cache fits the budget (caller holds the lock)"""
+        for key in list(self._cache):
+            if self._bytes <= self.memory_budget:
+                break
+            if key == keep:
+                continue
+            _, size = self._cache.pop(key)
+            self._bytes -= size
+            self.evictions += 1
+
+    def versions(self, station, threat):
+        directory = self._dir(station, threat)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.pkl')] for name in os.listdir(directory) if name.endswith('.pkl'))
+
+    def stations(self):
+        return sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+
+    def clear(self):
+        """Drop every loaded artifact (files on disk are kept)"""
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+            self._current.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'loaded': len(self._cache),
+                'loaded_bytes': self._bytes,
+                'memory_budget': self.memory_budget,
+            }
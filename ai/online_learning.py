@@ -0,0 +1,262 @@
+"""
+Online learning for the threat classifiers.
+
+OnlineThreatModels keeps one incremental SGD logistic regression per threat
+and a StreamingScaler whose mean and variance are updated with every batch of
+observations, so new readings are learned in milliseconds instead of a full
+batch retrain. Observations may carry their own labels (the THREAT_TARGETS
+label columns); unlabelled rows are labelled with the same threshold rules
+used for batch training.
+
+State is checkpointed every `checkpoint_every` updates to numbered files in
+the checkpoint directory. A CURRENT file names the active checkpoint and is
+replaced atomically, so a crash never leaves a half-written model active and
+rollback() can return to any retained checkpoint.
+"""
+
+import os
+import threading
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+
+from model import FEATURE_COLUMNS, THREAT_TARGETS, derive_threat_labels
+
+DEFAULT_CHECKPOINT_DIR = 'online_checkpoints'
+DEFAULT_CHECKPOINT_EVERY = 50
+DEFAULT_KEEP_CHECKPOINTS = 20
+
+CURRENT_POINTER = 'CURRENT'
+
+
+class StreamingScaler:
+    """StandardScaler equivalent with mean and variance updated batch by batch (Chan et al.)"""
+
+    def __init__(self, n_features):
+        self.count = 0
+        self.mean_ = np.zeros(n_features)
+        self._m2 = np.zeros(n_features)
+
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n = X.shape[0]
+        if n == 0:
+            return self
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean_
+        self.mean_ = self.mean_ + delta * n / total
+        self._m2 = self._m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        return self
+
+    @property
+    def var_(self):
+        return self._m2 / self.count if self.count else np.ones_like(self._m2)
+
+    @property
+    def scale_(self):
+        scale = np.sqrt(self.var_)
+        scale[scale == 0] = 1.0
+        return scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def _new_classifier():
+    return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+
+
+class OnlineThreatModels:
+    """Incremental per-threat classifiers with periodic checkpoints and rollback"""
+
+    def __init__(self, checkpoint_dir=DEFAULT_CHECKPOINT_DIR, checkpoint_every=DEFAULT_CHECKPOINT_EVERY,
+                 keep=DEFAULT_KEEP_CHECKPOINTS):
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._state = self._empty_state()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    @staticmethod
+    def _empty_state():
+        return {
+            'scaler': StreamingScaler(len(FEATURE_COLUMNS)),
+            'models': {threat_name: _new_classifier() for threat_name in THREAT_TARGETS},
+            'rows_seen': 0,
+            'updates': 0,
+            'updates_since_checkpoint': 0,
+            'version': None,
+            'updated_at': None,
+        }
+
+    @property
+    def ready(self):
+        return self._state['rows_seen'] > 0
+
+    def _labels(self, frame):
+        """Label columns from the observations, falling back to the threshold rules"""
+        derived = None
+        labels = {}
+        for threat_name, label_col in THREAT_TARGETS.items():
+            if label_col in frame.columns and frame[label_col].notna().all():
+                labels[threat_name] = frame[label_col].astype(int).to_numpy()
+            else:
+                if derived is None:
+                    derived = derive_threat_labels(frame)
+                labels[threat_name] = derived[label_col].to_numpy()
+        return labels
+
+    def update(self, frame):
+        """Learn from a DataFrame of observations; returns a summary of the update"""
+        missing = [col for col in FEATURE_COLUMNS if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Observations are missing feature columns: {missing}")
+        X = frame[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        if not np.isfinite(X).all():
+            raise ValueError("Observations contain missing or non-finite feature values")
+        labels = self._labels(frame)
+
+        with self._lock:
+            state = self._state
+            state['scaler'].partial_fit(X)
+            X_scaled = state['scaler'].transform(X)
+            for threat_name, model in state['models'].items():
+                model.partial_fit(X_scaled, labels[threat_name], classes=np.array([0, 1]))
+            state['rows_seen'] += len(frame)
+            state['updates'] += 1
+            state['updates_since_checkpoint'] += 1
+            state['updated_at'] = datetime.now().isoformat()
+
+            checkpoint = None
+            if state['updates_since_checkpoint'] >= self.checkpoint_every:
+                checkpoint = self._checkpoint_locked()
+
+        return {
+            'rows': len(frame),
+            'rows_seen': state['rows_seen'],
+            'updates': state['updates'],
+            'positive_rates': {name: float(np.mean(values)) for name, values in labels.items()},
+            'checkpoint': checkpoint,
+        }
+
+    def bootstrap(self, frame, chunk_rows=500):
+        """Warm start from historical data, in chunks as if it had been streamed"""
+        for start in range(0, len(frame), chunk_rows):
+            self.update(frame.iloc[start:start + chunk_rows])
+        return self.checkpoint()
+
+    def predict_proba(self, frame):
+        """Positive-class probability per threat for each row of `frame` (DataFrame or FEATURE_COLUMNS-ordered array)"""
+        X = frame[FEATURE_COLUMNS].to_numpy(dtype=np.float64) if hasattr(frame, 'columns') else np.atleast_2d(frame)
+        with self._lock:
+            if not self.ready:
+                raise RuntimeError("Online models have not seen any observations yet")
+            X_scaled = self._state['scaler'].transform(X)
+            return {threat_name: model.predict_proba(X_scaled)[:, 1]
+                    for threat_name, model in self._state['models'].items()}
+
+    # Checkpoints
+
+    def _checkpoint_path(self, version):
+        return os.path.join(self.checkpoint_dir, f"{version}.joblib")
+
+    def versions(self):
+        """Retained checkpoint versions, oldest first"""
+        return sorted(name[:-len('.joblib')] for name in os.listdir(self.checkpoint_dir)
+                      if name.startswith('v') and name.endswith('.joblib'))
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.checkpoint_dir, CURRENT_POINTER)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _replace_file(self, path, write):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _set_current(self, version):
+        def write(path):
+            with open(path, 'w') as f:
+                f.write(version)
+        self._replace_file(os.path.join(self.checkpoint_dir, CURRENT_POINTER), write)
+
+    def _checkpoint_locked(self):
+        existing = self.versions()
+        number = int(existing[-1][1:]) + 1 if existing else 1
+        version = f"v{number:06d}"
+        state = self._state
+        state['version'] = version
+        state['updates_since_checkpoint'] = 0
+        self._replace_file(self._checkpoint_path(version), lambda path: joblib.dump(state, path))
+        self._set_current(version)
+
+        # Drop the oldest checkpoints, never the active one
+        for old_version in existing[:max(0, len(existing) + 1 - self.keep)]:
+            try:
+                os.remove(self._checkpoint_path(old_version))
+            except OSError:
+                pass
+        return version
+
+    def checkpoint(self):
+        """Write the current state as a new checkpoint and make it CURRENT"""
+        with self._lock:
+            return self._checkpoint_locked()
+
+    def load(self, version=None):
+        """Activate a checkpoint (CURRENT by default); returns its version or None"""
+        version = version or self.current_version()
+        if version is None:
+            return None
+        state = joblib.load(self._checkpoint_path(version))
+        with self._lock:
+            self._state = state
+            self._set_current(version)
+        return version
+
+    def rollback(self, version=None):
+        """Return to `version`, or to the checkpoint before the current one"""
+        if version is None:
+            versions = self.versions()
+            current = self._state['version'] or self.current_version()
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                raise ValueError("No earlier checkpoint to roll back to")
+            version = older[-1]
+        elif version not in self.versions():
+            raise ValueError(f"Unknown checkpoint '{version}', available: {self.versions()}")
+        return self.load(version)
+
+    def status(self):
+        with self._lock:
+            state = self._state
+            scaler = state['scaler']
+            return {
+                'ready': self.ready,
+                'version': state['version'],
+                'rows_seen': state['rows_seen'],
+                'updates': state['updates'],
+                'updates_since_checkpoint': state['updates_since_checkpoint'],
+                'updated_at': state['updated_at'],
+                'checkpoint_every': self.checkpoint_every,
+                'checkpoints': self.versions(),
+                'feature_means': dict(zip(FEATURE_COLUMNS, np.round(scaler.mean_, 6).tolist())),
+            }
+
+
+def observations_frame(payload):
+    """DataFrame from a JSON observation or list of observations"""
+    records = payload if isinstance(payload, list) else [payload]
+    if not records or not all(isinstance(record, dict) for record in records):
+        raise ValueError("Expected an observation object or a non-empty list of them")
+    return pd.DataFrame.from_records(records)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Accuracy and resource report for compact float32 inference.
+
+Compares float64 and compact float32 inference (see
+CoastalThreatPredictor.enable_compact_inference) on the same rows. For each
+threat it reports the probability differences and how often the threat
+levels and binary predictions agree. It then starts one worker process per
+mode, set up the way app.py sets up the server, and measures resident memory
+and single-row / batch throughput in each.
+
+    python precision_report.py --data cleaned_coastal_data.csv --models coastal_threat_models
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import CoastalThreatPredictor, FEATURE_COLUMNS, threat_level
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS is the best portable fallback (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def load_predictor(data_path, model_prefix):
+    """Set up a predictor the way initialize_predictor does"""
+    predictor = CoastalThreatPredictor(data_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.load_models(model_prefix)
+        predictor.load_and_preprocess_data()
+        if not predictor.models:
+            predictor.train_classification_models()
+            predictor.save_models(model_prefix)
+    return predictor
+
+
+def compare_precision(predictor, frame):
+    """Per-threat agreement between float64 and compact float32 inference on `frame`"""
+    full = copy.deepcopy(predictor)
+    compact = copy.deepcopy(predictor)
+    with contextlib.redirect_stdout(io.StringIO()):
+        compact.enable_compact_inference()
+        preds64, probs64, _ = full.predict_threats(frame)
+        preds32, probs32, _ = compact.predict_threats(frame)
+
+    report = {}
+    for threat_name in probs64:
+        p64 = np.asarray(probs64[threat_name], dtype=np.float64) * 100
+        p32 = np.asarray(probs32[threat_name], dtype=np.float64) * 100
+        levels64 = np.array([threat_level(p) for p in p64])
+        levels32 = np.array([threat_level(p) for p in p32])
+        diff = np.abs(p64 - p32)
+        report[threat_name] = {
+            'model': type(predictor.models[threat_name]).__name__,
+            'rows': int(len(p64)),
+            'max_abs_diff_pct': float(diff.max()),
+            'mean_abs_diff_pct': float(diff.mean()),
+            'level_agreement': float((levels64 == levels32).mean()),
+            'prediction_agreement': float((np.asarray(preds64[threat_name]) == np.asarray(preds32[threat_name])).mean()),
+        }
+    return report
+
+
+def _worker(data_path, model_prefix, compact, iterations, batch_rows, results):
+    """Measure RSS and throughput for one inference mode in a fresh process"""
+    rss_start = current_rss_mb()
+    predictor = load_predictor(data_path, model_prefix)
+    if compact:
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor.enable_compact_inference()
+    rss_loaded = current_rss_mb()
+
+    source = pd.read_csv(data_path, nrows=max(batch_rows, 1))
+    row = source[FEATURE_COLUMNS].head(1)
+    batch = source[FEATURE_COLUMNS].sample(n=batch_rows, replace=True, random_state=0)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.predict_threats(row)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            predictor.predict_threats(row)
+        single_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        predictor.predict_threats(batch)
+        batch_elapsed = time.perf_counter() - start
+
+    results.put({
+        'mode': 'float32' if compact else 'float64',
+        'rss_start_mb': rss_start,
+        'rss_loaded_mb': rss_loaded,
+        'rss_after_inference_mb': current_rss_mb(),
+        'single_row_per_s': iterations / single_elapsed,
+        'batch_rows_per_s': batch_rows / batch_elapsed,
+    })
+
+
+def measure_workers(data_path, model_prefix, iterations=200, batch_rows=10_000):
+    """Run one spawned worker per mode so their memory footprints do not interfere"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    measurements = []
+    for compact in (False, True):
+        process = context.Process(target=_worker,
+                                  args=(data_path, model_prefix, compact, iterations, batch_rows, results))
+        process.start()
+        measurements.append(results.get())
+        process.join()
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare float64 and compact float32 inference")
+    parser.add_argument('--data', default='cleaned_coastal_data.csv')
+    parser.add_argument('--models', default='coastal_threat_models', help="Model file prefix")
+    parser.add_argument('--iterations', type=int, default=200, help="Single-row predictions per worker")
+    parser.add_argument('--batch-rows', type=int, default=10_000)
+    parser.add_argument('--json', dest='json_path', help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    print("🔬 Float32 compact inference report")
+    predictor = load_predictor(args.data, args.models)
+    accuracy = compare_precision(predictor, predictor.data)
+
+    print(f"\n{'threat':<12} {'model':<28} {'max |dp| %':>11} {'mean |dp| %':>12} {'levels':>8} {'preds':>8}")
+    for threat_name, stats in accuracy.items():
+        print(f"{threat_name:<12} {stats['model']:<28} {stats['max_abs_diff_pct']:>11.5f} "
+              f"{stats['mean_abs_diff_pct']:>12.6f} {stats['level_agreement']:>8.2%} {stats['prediction_agreement']:>8.2%}")
+
+    workers = measure_workers(args.data, args.models, args.iterations, args.batch_rows)
+    print(f"\n{'mode':<8} {'RSS start MB':>13} {'RSS loaded MB':>14} {'RSS after MB':>13} {'single/s':>9} {'batch rows/s':>13}")
+    for stats in workers:
+        print(f"{stats['mode']:<8} {stats['rss_start_mb']:>13.1f} {stats['rss_loaded_mb']:>14.1f} "
+              f"{stats['rss_after_inference_mb']:>13.1f} {stats['single_row_per_s']:>9.1f} {stats['batch_rows_per_s']:>13,.0f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'accuracy': accuracy, 'workers': workers}, f, indent=2)
+        print(f"\n💾 Report written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
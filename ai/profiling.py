@@ -0,0 +1,261 @@
+"""
+On-demand profiling for the live predictor.
+
+Profiling is armed by installing wrappers on the predictor *instance* for the
+next N calls of the selected methods and removed again once the budget is
+used up, so an unarmed predictor runs the plain class methods with no extra
+work at all. Two modes are supported:
+
+- deterministic: cProfile around each call, reported as pstats text
+- sampling: a background thread samples the calling thread's stack and
+  reports collapsed stacks (flamegraph.pl / speedscope format)
+
+A sampling session can also attach to a job that is already running (for
+example a long /retrain) by looking for threads whose stack contains one of
+the target functions.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import deque, Counter
+from datetime import datetime
+
+# Methods of CoastalThreatPredictor that may be profiled
+PROFILABLE_FUNCTIONS = [
+    'predict_threats',
+    'train_classification_models',
+    'train_arima_models',
+]
+
+# Shorthand targets accepted by the /debug/profile endpoint
+PROFILE_TARGETS = {
+    'predict': ['predict_threats'],
+    'retrain': ['train_classification_models', 'train_arima_models'],
+}
+
+PROFILE_MODES = ('deterministic', 'sampling')
+
+
+def _frame_label(frame):
+    """Short 'file.py:function' label for a stack frame"""
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse_stack(frame):
+    """Return the stack of a frame as a root-first ';' separated string"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class StackSampler:
+    """Samples the stack of one or more threads at a fixed interval"""
+
+    def __init__(self, thread_ids, interval=0.005):
+        self.thread_ids = set(thread_ids)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        while not self._stop.is_set():
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[_collapse_stack(frame)] += 1
+                    self.samples += 1
+            del frames
+            self._stop.wait(self.interval)
+
+    def collapsed(self):
+        """Collapsed stack output, one 'stack count' line per unique stack"""
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return '\n'.join(lines)
+
+
+class ProfilerManager:
+    """Arms, runs and collects on-demand profiling sessions"""
+
+    def __init__(self, max_results=20):
+        self.results = deque(maxlen=max_results)
+        self.session = None
+        self._lock = threading.Lock()
+        # Only one call is profiled at a time; concurrent calls run unprofiled
+        self._profile_lock = threading.Lock()
+
+    def arm(self, predictor, functions, mode='deterministic', count=1, interval=0.005):
+        """Profile the next `count` calls of each of `functions` on `predictor`"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {PROFILE_MODES}")
+        unknown = [name for name in functions if name not in PROFILABLE_FUNCTIONS]
+        if unknown:
+            raise ValueError(f"Cannot profile {unknown}, expected any of {PROFILABLE_FUNCTIONS}")
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        with self._lock:
+            self._disarm_locked(predictor)
+            self.session = {
+                'functions': list(functions),
+                'mode': mode,
+                'interval': interval,
+                'remaining': {name: count for name in functions},
+                'armed_at': datetime.now().isoformat(),
+            }
+            for name in functions:
+                setattr(predictor, name, self._make_wrapper(predictor, name))
+
+        return self.status()
+
+    def disarm(self, predictor):
+        """Remove any installed wrappers from the predictor"""
+        with self._lock:
+            self._disarm_locked(predictor)
+
+    def _disarm_locked(self, predictor):
+        if self.session is None:
+            return
+        for name in self.session['functions']:
+            # Instance attributes shadow the class methods; deleting them restores the originals
+            predictor.__dict__.pop(name, None)
+        self.session = None
+
+    def _make_wrapper(self, predictor, name):
+        original = getattr(type(predictor), name).__get__(predictor)
+        session = self.session
+
+        def wrapper(*args, **kwargs):
+            if not self._profile_lock.acquire(blocking=False):
+                return original(*args, **kwargs)
+            try:
+                if session['mode'] == 'deterministic':
+                    return self._run_deterministic(name, original, args, kwargs)
+                return self._run_sampling(name, original, args, kwargs, session['interval'])
+            finally:
+                self._profile_lock.release()
+                with self._lock:
+                    session['remaining'][name] -= 1
+                    # A newer session may have re-armed this function; leave its wrapper alone
+                    if session['remaining'][name] <= 0 and predictor.__dict__.get(name) is wrapper:
+                        predictor.__dict__.pop(name, None)
+                    if self.session is session and all(n <= 0 for n in session['remaining'].values()):
+                        self.session = None
+
+        wrapper.__wrapped__ = original
+        return wrapper
+
+    def _run_deterministic(self, name, func, args, kwargs):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats('cumulative').print_stats(40)
+            self._record(name, 'deterministic', 'pstats', elapsed, stream.getvalue())
+
+    def _run_sampling(self, name, func, args, kwargs, interval):
+        sampler = StackSampler([threading.get_ident()], interval=interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - start
+            self._record(name, 'sampling', 'collapsed', elapsed, sampler.collapsed(),
+                         samples=sampler.samples)
+
+    def attach(self, functions, duration=10.0, interval=0.005):
+        """
+        Sample threads that are currently running any of `functions`.
+
+        Runs in the background for `duration` seconds and records one result.
+        Returns the number of threads attached to.
+        """
+        targets = set(functions)
+        current = threading.get_ident()
+        thread_ids = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == current:
+                continue
+            while frame is not None:
+                if frame.f_code.co_name in targets:
+                    thread_ids.append(thread_id)
+                    break
+                frame = frame.f_back
+
+        if not thread_ids:
+            return 0
+
+        def run():
+            sampler = StackSampler(thread_ids, interval=interval)
+            sampler.start()
+            time.sleep(duration)
+            sampler.stop()
+            self._record(','.join(functions), 'sampling', 'collapsed', duration,
+                         sampler.collapsed(), samples=sampler.samples, attached=True)
+
+        threading.Thread(target=run, daemon=True).start()
+        return len(thread_ids)
+
+    def _record(self, function, mode, output_format, elapsed, output, **extra):
+        result = {
+            'function': function,
+            'mode': mode,
+            'format': output_format,
+            'finished_at': datetime.now().isoformat(),
+            'duration_ms': round(elapsed * 1000, 3),
+            'output': output,
+        }
+        result.update(extra)
+        with self._lock:
+            self.results.append(result)
+
+    def status(self):
+        with self._lock:
+            session = None
+            if self.session is not None:
+                session = {
+                    'functions': self.session['functions'],
+                    'mode': self.session['mode'],
+                    'remaining': dict(self.session['remaining']),
+                    'armed_at': self.session['armed_at'],
+                }
+            return {
+                'armed': session is not None,
+                'session': session,
+                'results_available': len(self.results),
+            }
+
+    def get_results(self, output_format=None, clear=False):
+        with self._lock:
+            results = [r for r in self.results if output_format is None or r['format'] == output_format]
+            if clear:
+                self.results.clear()
+            return results
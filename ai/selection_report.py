@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare successive-halving model selection with exhaustive selection.
+
+Trains the classifiers twice on the same data, once per strategy, and reports
+for each threat which model each strategy picked, its held-out accuracy and
+the time spent.
+
+    python selection_report.py --data cleaned_coastal_data.csv
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import CoastalThreatPredictor, MODEL_SELECTION_MODES
+
+
+def run_selection(data_path, selection):
+    """Train with one selection strategy and return (selection_report, total seconds)"""
+    predictor = CoastalThreatPredictor(data_path, model_selection=selection)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.load_and_preprocess_data()
+        started = time.perf_counter()
+        predictor.train_classification_models()
+        elapsed = time.perf_counter() - started
+    return predictor.selection_report, elapsed
+
+
+def compare_selection(data_path):
+    reports = {}
+    totals = {}
+    for selection in MODEL_SELECTION_MODES:
+        reports[selection], totals[selection] = run_selection(data_path, selection)
+
+    comparison = {}
+    for threat_name in reports['exhaustive']:
+        exhaustive = reports['exhaustive'][threat_name]
+        halving = reports['halving'][threat_name]
+        comparison[threat_name] = {
+            'exhaustive_model': exhaustive['best_model'],
+            'halving_model': halving['best_model'],
+            'same_choice': exhaustive['best_model'] == halving['best_model'],
+            'exhaustive_accuracy': exhaustive['test_accuracy'],
+            'halving_accuracy': halving['test_accuracy'],
+            'accuracy_delta': halving['test_accuracy'] - exhaustive['test_accuracy'],
+            'exhaustive_s': exhaustive['elapsed_s'],
+            'halving_s': halving['elapsed_s'],
+        }
+    return comparison, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare halving and exhaustive model selection")
+    parser.add_argument('--data', default='cleaned_coastal_data.csv')
+    parser.add_argument('--json', dest='json_path', help="Write the comparison as JSON to this file")
+    args = parser.parse_args()
+
+    print("⚖️  Model selection comparison")
+    comparison, totals = compare_selection(args.data)
+
+    print(f"\n{'threat':<12} {'exhaustive':<20} {'halving':<20} {'acc exh':>8} {'acc halv':>9} {'time exh':>9} {'time halv':>10}")
+    for threat_name, row in comparison.items():
+        print(f"{threat_name:<12} {row['exhaustive_model']:<20} {row['halving_model']:<20} "
+              f"{row['exhaustive_accuracy']:>8.4f} {row['halving_accuracy']:>9.4f} "
+              f"{row['exhaustive_s']:>8.2f}s {row['halving_s']:>9.2f}s")
+
+    speedup = totals['exhaustive'] / totals['halving'] if totals['halving'] else float('inf')
+    agreement = sum(row['same_choice'] for row in comparison.values())
+    print(f"\nTotal: exhaustive {totals['exhaustive']:.2f}s, halving {totals['halving']:.2f}s ({speedup:.1f}x faster)")
+    print(f"Same model chosen for {agreement}/{len(comparison)} threats")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'threats': comparison, 'total_s': totals, 'speedup': speedup}, f, indent=2)
+        print(f"💾 Comparison written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
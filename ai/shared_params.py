@@ -0,0 +1,428 @@
+"""
+Memory-mapped model parameters shared by worker processes.
+
+publish() compiles a trained predictor into flat NumPy arrays:
+  - scaler means and scales
+  - per threat: logistic regression coefficients, SVC support vectors with
+    dual coefficients and Platt parameters, or the node arrays of every tree
+    in a random forest / gradient boosting ensemble (concatenated, with
+    child indexes offset into the combined arrays)
+  - ARIMA models as stacked state-space arrays (see batch_forecast.py), for
+    the global models and the per-station forecaster
+  - training-time median vectors, overall and per station, for imputation
+They are written into one params.bin (64-byte aligned sections) plus an
+index.json under <directory>/<version>/, and a CURRENT file naming the active
+version is swapped with os.replace.
+
+SharedParams.current() maps params.bin read-only with np.memmap. All arrays
+are views into the mapping, so every process that attaches shares the same
+page-cache pages instead of unpickling a private copy. The evaluators
+reproduce sklearn's predict/predict_proba with NumPy. When CURRENT changes,
+the next current() call attaches the new version; the old mapping stays valid
+until nothing references it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from batch_forecast import BatchForecaster, state_space_snapshot
+
+DEFAULT_SHARED_DIR = 'shared_params'
+CURRENT = 'CURRENT'
+KEEP_VERSIONS = 5
+_ALIGN = 64
+
+
+class LinearEvaluator:
+    """LogisticRegression: P(1) = sigmoid(X w + b)"""
+
+    def __init__(self, arrays, meta):
+        self.coef = arrays['coef']
+        self.intercept = float(meta['intercept'])
+        self.classes_ = arrays['classes']
+
+    def decision_function(self, X):
+        return X @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        p = expit(self.decision_function(X))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+class SVCEvaluator:
+    """RBF SVC: decision = sum(dual * K(sv, x)) + b, probabilities from libsvm's Platt scaling"""
+
+    def __init__(self, arrays, meta):
+        self.support_vectors = arrays['support_vectors']
+        self.dual_coef = arrays['dual_coef']
+        self.sv_norms = arrays['sv_norms']
+        self.intercept = float(meta['intercept'])
+        self.gamma = float(meta['gamma'])
+        self.prob_a = float(meta['prob_a'])
+        self.prob_b = float(meta['prob_b'])
+        self.classes_ = arrays['classes']
+
+    def decision_function(self, X):
+        # ||x - sv||^2 = ||x||^2 - 2 x.sv + ||sv||^2
+        distances = (X * X).sum(axis=1)[:, None] - 2 * X @ self.support_vectors.T + self.sv_norms
+        return np.exp(-self.gamma * np.maximum(distances, 0)) @ self.dual_coef + self.intercept
+
+    def predict_proba(self, X):
+        # libsvm's decision value has the opposite sign; its Platt sigmoid gives P(class 0 vs 1)
+        r = expit(-(-self.decision_function(X) * self.prob_a + self.prob_b))
+        r = np.clip(r, 1e-7, 1 - 1e-7)
+        return _pairwise_coupling(r)
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+def _pairwise_coupling(r, max_iter=100, eps=0.005 / 2):
+    """
+    libsvm's multiclass_probability for two classes, vectorized over rows
+
+    The fixed point is p0 = r, but libsvm stops iterating once the error is
+    below eps, and sklearn's predict_proba returns that iterate.
+    """
+    q00, q11, q01 = (1 - r) ** 2, r ** 2, -r * (1 - r)
+    p = np.full((len(r), 2), 0.5)
+    active = np.ones(len(r), dtype=bool)
+    for _ in range(max_iter):
+        Qp = np.column_stack([q00 * p[:, 0] + q01 * p[:, 1], q01 * p[:, 0] + q11 * p[:, 1]])
+        pQp = (p * Qp).sum(axis=1)
+        active &= np.abs(Qp - pQp[:, None]).max(axis=1) >= eps
+        if not active.any():
+            break
+        for t, q_tt, q_jt in ((0, q00, (q00, q01)), (1, q11, (q01, q11))):
+            diff = np.where(active, (-Qp[:, t] + pQp) / q_tt, 0.0)
+            p[:, t] += diff
+            pQp = (pQp + diff * (diff * q_tt + 2 * Qp[:, t])) / (1 + diff) ** 2
+            Qp = (Qp + diff[:, None] * np.column_stack(q_jt)) / (1 + diff)[:, None]
+            p /= (1 + diff)[:, None]
+    return p
+
+
+class TreeEnsembleEvaluator:
+    """
+    RandomForest (mean of leaf class fractions) or GradientBoosting
+    (sigmoid of init + learning_rate * sum of leaf values)
+
+    All trees are walked together: one gather per depth level over a
+    (rows, trees) array of node indexes.
+    """
+
+    def __init__(self, arrays, meta):
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.classes_ = arrays['classes']
+        self.kind = meta['kind']
+        self.depth = int(meta['max_depth'])
+        self.learning_rate = float(meta.get('learning_rate', 1.0))
+        self.init = float(meta.get('init', 0.0))
+
+    def leaves(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.depth):
+            left = self.left[node]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.right[node]), node)
+        return node
+
+    def predict_proba(self, X):
+        leaves = self.leaves(X)
+        if self.kind == 'forest':
+            p = self.value[leaves].mean(axis=1)
+        else:
+            p = expit(self.init + self.learning_rate * self.value[leaves].sum(axis=1))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+EVALUATORS = {
+    'linear': LinearEvaluator,
+    'svc': SVCEvaluator,
+    'forest': TreeEnsembleEvaluator,
+    'boosting': TreeEnsembleEvaluator,
+}
+
+
+def _compile_trees(trees):
+    """Concatenate sklearn tree_ arrays, offsetting child indexes into the combined arrays"""
+    left, right, feature, threshold, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        t = tree.tree_
+        internal = t.children_left >= 0
+        left.append(np.where(internal, t.children_left + offset, -1))
+        right.append(np.where(internal, t.children_right + offset, -1))
+        feature.append(np.where(internal, t.feature, 0))
+        threshold.append(t.threshold)
+        values.append(t.value)
+        roots.append(offset)
+        offset += t.node_count
+        max_depth = max(max_depth, t.max_depth)
+    arrays = {
+        'left': np.concatenate(left).astype(np.int64),
+        'right': np.concatenate(right).astype(np.int64),
+        'feature': np.concatenate(feature).astype(np.int64),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int64),
+    }
+    return arrays, np.concatenate(values), max_depth
+
+
+def compile_estimator(model):
+    """(kind, arrays, meta) for a fitted binary classifier; raises ValueError if unsupported"""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import SVC
+
+    classes = np.asarray(model.classes_, dtype=np.int64)
+    if len(classes) != 2:
+        raise ValueError(f"only binary classifiers can be compiled, got {len(classes)} classes")
+
+    if isinstance(model, LogisticRegression):
+        arrays = {'coef': np.asarray(model.coef_[0], dtype=np.float64)}
+        return 'linear', {**arrays, 'classes': classes}, {'intercept': float(model.intercept_[0])}
+
+    if isinstance(model, SVC):
+        if model.kernel != 'rbf' or not model.probability:
+            raise ValueError("only SVC(kernel='rbf', probability=True) can be compiled")
+        support_vectors = np.asarray(model.support_vectors_, dtype=np.float64)
+        arrays = {
+            'support_vectors': support_vectors,
+            'dual_coef': np.asarray(model.dual_coef_[0], dtype=np.float64),
+            'sv_norms': (support_vectors ** 2).sum(axis=1),
+            'classes': classes,
+        }
+        meta = {'intercept': float(model.intercept_[0]), 'gamma': float(model._gamma),
+                'prob_a': float(model._probA[0]), 'prob_b': float(model._probB[0])}
+        return 'svc', arrays, meta
+
+    if isinstance(model, RandomForestClassifier):
+        arrays, values, max_depth = _compile_trees(model.estimators_)
+        fractions = values[:, 0, :] / values[:, 0, :].sum(axis=1, keepdims=True)
+        arrays.update(value=fractions[:, 1].astype(np.float64), classes=classes)
+        return 'forest', arrays, {'kind': 'forest', 'max_depth': max_depth}
+
+    if isinstance(model, GradientBoostingClassifier):
+        arrays, values, max_depth = _compile_trees(model.estimators_[:, 0])
+        arrays.update(value=values[:, 0, 0].astype(np.float64), classes=classes)
+        init = float(np.ravel(model._raw_predict_init(np.zeros((1, model.n_features_in_))))[0])
+        return 'boosting', arrays, {'kind': 'boosting', 'max_depth': max_depth,
+                                    'learning_rate': float(model.learning_rate), 'init': init}
+
+    raise ValueError(f"cannot compile {type(model).__name__}")
+
+
+class CompiledModels:
+    """Evaluators and parameters of one published version, all views into its memory map"""
+
+    def __init__(self, directory, version):
+        self.version = version
+        self.path = os.path.join(directory, version)
+        with open(os.path.join(self.path, 'index.json')) as f:
+            self.index = json.load(f)
+        self._map = np.memmap(os.path.join(self.path, 'params.bin'), dtype=np.uint8, mode='r')
+        self.scaler_mean = self.array('scaler/mean')
+        self.scaler_scale = self.array('scaler/scale')
+
+        self.models = {}
+        for threat_name, spec in self.index['models'].items():
+            arrays = {name: self.array(f"models/{threat_name}/{name}") for name in spec['arrays']}
+            self.models[threat_name] = EVALUATORS[spec['kind']](arrays, spec['meta'])
+
+        self.forecasters = {}
+        for name, spec in self.index['forecasters'].items():
+            self.forecasters[name] = BatchForecaster.from_arrays(
+                [tuple(key) for key in spec['keys']],
+                {field: self.array(f"forecasters/{name}/{field}") for field in BatchForecaster.ARRAY_FIELDS},
+                last_dates=spec['last_dates'],
+                orders=[tuple(order) if order else None for order in spec['orders']],
+            )
+
+        self.component_versions = self.index.get('component_versions', {})
+        self.conformal = self.index.get('conformal', {})
+
+        medians = self.index.get('medians')
+        self._medians = self.array('medians') if medians else None
+        self._median_rows = {station: i for i, station in enumerate(medians['stations'])} if medians else {}
+
+    def array(self, name):
+        spec = self.index['arrays'][name]
+        return np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=self._map, offset=spec['offset'])
+
+    def transform(self, X):
+        return (X - self.scaler_mean) / self.scaler_scale
+
+    def median_vector(self, station=None):
+        """Training medians in feature order, per station when known (same as FeatureSketches.median_vector)"""
+        if self._medians is None:
+            return None
+        return self._medians[self._median_rows.get(str(station), 0) if station is not None else 0]
+
+    def forecaster(self, name='global'):
+        return self.forecasters.get(name)
+
+
+def _collect_arrays(predictor):
+    """Flat {name: array} of everything publish() stores, plus the index metadata"""
+    arrays = {
+        'scaler/mean': np.asarray(predictor.scaler.mean_, dtype=np.float64),
+        'scaler/scale': np.asarray(predictor.scaler.scale_, dtype=np.float64),
+    }
+    index = {'models': {}, 'forecasters': {}, 'component_versions': {
+        component: profile.get('version') for component, profile in (getattr(predictor, 'data_versions', None) or {}).items()
+    }, 'conformal': getattr(predictor, 'conformal', None) or {}}
+
+    for threat_name, model in predictor.models.items():
+        kind, model_arrays, meta = compile_estimator(model)
+        index['models'][threat_name] = {'kind': kind, 'meta': meta, 'arrays': sorted(model_arrays)}
+        for name, array in model_arrays.items():
+            arrays[f"models/{threat_name}/{name}"] = array
+
+    forecasters = {}
+    arima_models = getattr(predictor, 'arima_models', {}) or {}
+    if arima_models:
+        keys = [('global', target_name) for target_name in arima_models]
+        last_dates = []
+        for result in arima_models.values():
+            labels = result.model.data.row_labels
+            dated = isinstance(labels, pd.DatetimeIndex) and len(labels)
+            last_dates.append(labels[-1].to_datetime64() if dated else np.datetime64('NaT'))
+        forecasters['global'] = BatchForecaster(keys, [state_space_snapshot(result) for result in arima_models.values()],
+                                                last_dates=last_dates)
+    if getattr(predictor, 'station_forecaster', None) is not None:
+        forecasters['stations'] = predictor.station_forecaster
+    for name, forecaster in forecasters.items():
+        index['forecasters'][name] = {
+            'keys': [list(key) for key in forecaster.keys],
+            'last_dates': [None if np.isnat(date) else str(date) for date in forecaster.last_dates],
+            'orders': [list(order) if order else None for order in forecaster.orders],
+        }
+        for field in BatchForecaster.ARRAY_FIELDS:
+            arrays[f"forecasters/{name}/{field}"] = np.ascontiguousarray(getattr(forecaster, field), dtype=np.float64)
+
+    sketches = getattr(predictor, 'feature_sketches', None)
+    if sketches is not None:
+        stations = [None] + sorted(sketches.stations)
+        arrays['medians'] = np.vstack([sketches.median_vector(station) for station in stations])
+        index['medians'] = {'stations': stations}
+    return arrays, index
+
+
+def _write_params(path, arrays):
+    """Write arrays back to back (64-byte aligned) into one file; returns the array index"""
+    entries = {}
+    offset = 0
+    with open(path, 'wb') as f:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            padding = -offset % _ALIGN
+            f.write(b'\0' * padding)
+            offset += padding
+            entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            f.write(array.tobytes())
+            offset += array.nbytes
+    return entries
+
+
+def publish(predictor, directory=DEFAULT_SHARED_DIR, keep=KEEP_VERSIONS):
+    """
+    Compile the predictor's models into a new version and make it CURRENT
+
+    The version id is a hash of the parameters, so publishing unchanged
+    models only re-activates the existing version. Returns the version id.
+    """
+    arrays, index = _collect_arrays(predictor)
+    digest = hashlib.blake2b(digest_size=8)
+    for name, array in arrays.items():
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(json.dumps(index, sort_keys=True, default=str).encode())
+    version = digest.hexdigest()
+
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, version)
+    if not os.path.isdir(target):
+        tmp_dir = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(tmp_dir)
+        index['arrays'] = _write_params(os.path.join(tmp_dir, 'params.bin'), arrays)
+        index['version'] = version
+        index['created_at'] = datetime.now().isoformat()
+        with open(os.path.join(tmp_dir, 'index.json'), 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_dir, target)
+
+    pointer = os.path.join(directory, CURRENT)
+    tmp_pointer = f"{pointer}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_pointer, 'w') as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer)
+    _prune(directory, keep, version)
+    return version
+
+
+def _prune(directory, keep, current):
+    """Delete all but the newest `keep` versions (mapped files stay readable until unmapped)"""
+    versions = [entry for entry in os.scandir(directory)
+                if entry.is_dir() and not entry.name.endswith('.tmp') and entry.name != current]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[max(0, keep - 1):]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class SharedParams:
+    """Attachment to the CURRENT published version, re-attached when CURRENT changes"""
+
+    def __init__(self, directory=DEFAULT_SHARED_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._attached = None
+        self._pointer_mtime = None
+
+    def current(self):
+        pointer = os.path.join(self.directory, CURRENT)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+        except OSError:
+            raise FileNotFoundError(f"No shared parameters published in {self.directory}")
+        attached = self._attached
+        if attached is not None and mtime == self._pointer_mtime:
+            return attached
+        with self._lock:
+            if self._attached is None or mtime != self._pointer_mtime:
+                with open(pointer) as f:
+                    version = f.read().strip()
+                if self._attached is None or self._attached.version != version:
+                    self._attached = CompiledModels(self.directory, version)
+                self._pointer_mtime = mtime
+            return self._attached
+
+    @property
+    def version(self):
+        return self.current().version
@@ -0,0 +1,251 @@
+"""
+Mergeable quantile sketches for feature statistics.
+
+KLLSketch is a KLL quantile sketch (Karnin, Lang and Liberty, 2016): a stack
+of compactors where level h holds items of weight 2^h. When a level overflows
+it is sorted and every other item (random offset) is promoted to the next
+level. Memory is O(k) regardless of stream length, rank error is about
+1.7/k, and two sketches merge by concatenating levels and compacting.
+
+FeatureSketches keeps one sketch per feature overall and per station. The
+predictor uses its medians to impute missing request values with
+training-time statistics, and /percentiles answers quantile queries from it.
+Sketches of separate chunks (e.g. built in parallel workers) merge into the
+same result as one pass over the data, up to the sketch error.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_K = 200
+# Seed of the compaction offsets, so the same data gives the same sketch in every run
+DEFAULT_SEED = 0
+_CAPACITY_DECAY = 2 / 3
+
+
+class KLLSketch:
+    """KLL quantile sketch over a stream of floats"""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.seed = seed
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * _CAPACITY_DECAY ** depth)))
+
+    def update(self, values):
+        """Add an array (or scalar) of values; NaN and infinite values are ignored"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd item stays behind so the promoted half has exactly half the weight
+            keep = items[:1] if len(items) % 2 else items[:0]
+            paired = items[len(keep):]
+            promoted = paired[self._rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        if other.count == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _sorted_weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """Approximate values at quantiles `qs` (0..1); NaN for an empty sketch"""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        values, cumulative = self._sorted_weighted()
+        index = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = values[np.minimum(index, len(values) - 1)]
+        # The extremes are tracked exactly
+        result = np.where(qs <= 0, self.min, result)
+        return np.where(qs >= 1, self.max, result)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def rank(self, value):
+        """Approximate fraction of values <= `value`"""
+        if self.count == 0:
+            return math.nan
+        values, cumulative = self._sorted_weighted()
+        position = np.searchsorted(values, value, side='right')
+        return float(cumulative[position - 1] / cumulative[-1]) if position else 0.0
+
+    def retained(self):
+        return sum(len(items) for items in self.levels)
+
+    def __getstate__(self):
+        # The generator state rather than the Generator, so updates after loading continue the same stream
+        state = dict(self.__dict__)
+        state['_rng'] = self._rng.bit_generator.state
+        return state
+
+    def __setstate__(self, state):
+        rng_state = state.pop('_rng', None)
+        self.__dict__.update(state)
+        # Sketches pickled without a seed or generator state restart from DEFAULT_SEED
+        self.seed = state.get('seed', DEFAULT_SEED)
+        self._rng = np.random.default_rng(self.seed)
+        if rng_state is not None:
+            self._rng.bit_generator.state = rng_state
+
+
+class FeatureSketches:
+    """Per-feature KLL sketches, overall and per station"""
+
+    def __init__(self, features, k=DEFAULT_K, seed=DEFAULT_SEED):
+        self.features = list(features)
+        self.k = k
+        self.seed = seed
+        self.overall = {name: KLLSketch(k, seed) for name in self.features}
+        self.stations = {}
+        self._median_cache = {}
+
+    def __setstate__(self, state):
+        # Sketches pickled before the median cache and seed existed
+        state.setdefault('_median_cache', {})
+        state.setdefault('seed', DEFAULT_SEED)
+        self.__dict__.update(state)
+
+    def update(self, frame):
+        self._median_cache = {}
+        columns = [name for name in self.features if name in frame.columns]
+        for name in columns:
+            self.overall[name].update(frame[name].to_numpy(dtype=np.float64))
+        if 'station_id' in frame.columns:
+            for station, group in frame.groupby('station_id', sort=False):
+                station_sketches = self.stations.setdefault(
+                    str(station), {name: KLLSketch(self.k, self.seed) for name in self.features}
+                )
+                for name in columns:
+                    station_sketches[name].update(group[name].to_numpy(dtype=np.float64))
+        return self
+
+    def merge(self, other):
+        self._median_cache = {}
+        for name in self.features:
+            self.overall[name].merge(other.overall[name])
+        for station, sketches in other.stations.items():
+            if station not in self.stations:
+                self.stations[station] = sketches
+                continue
+            for name in self.features:
+                self.stations[station][name].merge(sketches[name])
+        return self
+
+    def _sketches_for(self, station=None):
+        """Station sketches when the station has data, else the overall sketches"""
+        if station is not None and str(station) in self.stations:
+            return self.stations[str(station)]
+        return self.overall
+
+    def quantiles(self, name, qs, station=None):
+        return self._sketches_for(station)[name].quantiles(qs)
+
+    def medians(self, station=None):
+        """Median of each feature as a Series (station falls back to overall per feature)"""
+        sketches = self._sketches_for(station)
+        values = {}
+        for name in self.features:
+            sketch = sketches[name] if sketches[name].count else self.overall[name]
+            values[name] = sketch.quantile(0.5)
+        return pd.Series(values, dtype=np.float64)
+
+    def median_vector(self, station=None):
+        """medians() as a cached array in feature order"""
+        key = str(station) if station is not None and str(station) in self.stations else None
+        if key not in self._median_cache:
+            self._median_cache[key] = self.medians(key).to_numpy()
+        return self._median_cache[key]
+
+    def fill_missing(self, frame):
+        """Fill NaNs in the feature columns of `frame` with training-time medians (per station if known)"""
+        columns = [name for name in self.features if name in frame.columns]
+        if not frame[columns].isna().any().any():
+            return frame
+        frame = frame.copy()
+        if 'station_id' in frame.columns and self.stations:
+            for station, index in frame.groupby('station_id', sort=False).groups.items():
+                frame.loc[index, columns] = frame.loc[index, columns].fillna(self.medians(station)[columns])
+        return frame.fillna(self.medians()[columns])
+
+    def summary(self, names=None, qs=(0.05, 0.25, 0.5, 0.75, 0.95), station=None):
+        sketches = self._sketches_for(station)
+        result = {}
+        for name in names or self.features:
+            sketch = sketches[name]
+            result[name] = {
+                'count': sketch.count,
+                'min': sketch.min if sketch.count else None,
+                'max': sketch.max if sketch.count else None,
+                'quantiles': {f"{q:g}": (None if np.isnan(v) else float(v))
+                              for q, v in zip(qs, sketch.quantiles(qs))},
+            }
+        return result
+
+
+def _sketch_chunk(frame, features, k):
+    return FeatureSketches(features, k).update(frame)
+
+
+def build_feature_sketches(frame, features, k=DEFAULT_K, chunk_rows=250_000, n_jobs=1):
+    """
+    Sketch `frame` in chunks and merge the partial sketches.
+
+    n_jobs > 1 sketches chunks in parallel worker processes (joblib).
+    """
+    chunks = [frame.iloc[start:start + chunk_rows] for start in range(0, len(frame), chunk_rows)] or [frame]
+    if n_jobs == 1 or len(chunks) == 1:
+        partials = [_sketch_chunk(chunk, features, k) for chunk in chunks]
+    else:
+        from joblib import Parallel, delayed
+        partials = Parallel(n_jobs=n_jobs)(delayed(_sketch_chunk)(chunk, features, k) for chunk in chunks)
+    result = partials[0]
+    for partial in partials[1:]:
+        result.merge(partial)
+    return result
@@ -10,7 +10,7 @@ import time
 def test_health_and_prediction():
     """Test health endpoint and prediction functionality"""
     
-    base_url = "http://localhost:5000"
+    base_url = "http://localhost:5001"
     
     print("🧪 Testing Fixed Coastal Threat Prediction API")
     print("=" * 60)
@@ -40,7 +40,7 @@ def test_prediction():
     # Test health endpoint
     try:
         print("🔍 Testing health endpoint...")
-        response = requests.get("http://localhost:5000/health")
+        response = requests.get("http://localhost:5001/health")
         if response.status_code == 200:
             print("✅ Health check passed")
             print(f"   Response: {response.json()}")
@@ -55,7 +55,7 @@ def test_prediction():
     try:
         print("\n🔮 Testing prediction endpoint...")
         response = requests.post(
-            "http://localhost:5000/predict",
+            "http://localhost:5001/predict",
             json=test_data,
             headers={'Content-Type': 'application/json'}
         )
@@ -88,7 +88,7 @@ def test_prediction():
     # Test test-prediction endpoint
     try:
         print("\n🧪 Testing test-prediction endpoint...")
-        response = requests.get("http://localhost:5000/test-prediction")
+        response = requests.get("http://localhost:5001/test-prediction")
         
         if response.status_code == 200:
             print("✅ Test prediction successful!")
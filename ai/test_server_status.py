@@ -3,7 +3,7 @@ import json
 
 def test_server_endpoints():
     """Test various server endpoints to check status"""
-    base_url = "http://localhost:5000"
+    base_url = "http://localhost:5001"
     
     endpoints = [
         "/health",
@@ -0,0 +1,56 @@
+"""
+The compiled evaluators in shared_params.py reimplement sklearn and libsvm
+internals (tree_.value, _probA/_probB, the boosting init). These tests fit
+each supported estimator, compile it and compare against sklearn, so an
+sklearn upgrade that changes those internals fails here instead of serving
+different scores.
+
+Run with: python -m pytest ai/tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import SVC
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_params import EVALUATORS, compile_estimator
+
+ESTIMATORS = {
+    'linear': lambda: LogisticRegression(max_iter=1000),
+    'svc': lambda: SVC(probability=True, random_state=0),
+    'forest': lambda: RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0),
+    'boosting': lambda: GradientBoostingClassifier(n_estimators=25, max_depth=3, random_state=0),
+}
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 19))
+    y = ((X[:, 0] + X[:, 1] ** 2 - X[:, 2] * X[:, 3] + rng.normal(scale=0.5, size=600)) > 1).astype(int)
+    return X[:400], y[:400], X[400:]
+
+
+@pytest.mark.parametrize('kind', list(ESTIMATORS))
+def test_compiled_estimator_matches_sklearn(kind, data):
+    X_train, y_train, X_test = data
+    model = ESTIMATORS[kind]().fit(X_train, y_train)
+
+    compiled_kind, arrays, meta = compile_estimator(model)
+    assert compiled_kind == kind
+    evaluator = EVALUATORS[compiled_kind](arrays, meta)
+
+    np.testing.assert_allclose(evaluator.predict_proba(X_test), model.predict_proba(X_test), rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(evaluator.predict(X_test), model.predict(X_test))
+
+
+def test_unsupported_estimator_is_rejected(data):
+    X_train, y_train, _ = data
+    with pytest.raises(ValueError):
+        compile_estimator(SVC(kernel='linear', probability=True).fit(X_train, y_train))
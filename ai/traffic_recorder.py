@@ -0,0 +1,50 @@
+"""
+Recording and reading of real API traffic for replay by load_test.py.
+
+The server records /predict payloads when BLUEGUARD_RECORD_PATH is set. Each
+request is appended as one JSON line:
+
+    {"ts": 1714550400.123, "method": "POST", "path": "/predict", "payload": {...}}
+"""
+
+import json
+import threading
+import time
+
+
+class TrafficRecorder:
+    """Appends request payloads to a JSON lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Line buffered so a crash loses at most the request being written
+        self._file = open(path, 'a', buffering=1)
+        self.recorded = 0
+
+    def record(self, path, payload, method='POST'):
+        line = json.dumps({'ts': time.time(), 'method': method, 'path': path, 'payload': payload})
+        with self._lock:
+            self._file.write(line + '\n')
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path):
+    """Load a recording and return its entries sorted by time"""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A partially written last line is expected if the server was killed
+                continue
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
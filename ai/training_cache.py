@@ -0,0 +1,135 @@
+"""
+Persistent, size-bounded cache for training results.
+
+Cross-validation scores, fitted candidates, selected models and ARIMA fits
+are memoized on disk under a key made from content hashes of the training
+inputs and the estimator's class and hyperparameters. A retrain on unchanged
+data therefore reuses everything, and a change that only touches one threat's
+labels recomputes only that threat.
+
+Entries are joblib files; hits refresh the file's mtime and the oldest
+entries are evicted once the directory grows past max_bytes.
+"""
+
+import hashlib
+import os
+import threading
+
+import joblib
+import numpy as np
+
+DEFAULT_CACHE_DIR = 'training_cache'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_MISSING = object()
+
+
+def fingerprint(value):
+    """Content hash of an array, Series, DataFrame or index"""
+    digest = hashlib.blake2b(digest_size=16)
+    if hasattr(value, 'to_numpy'):
+        if hasattr(value, 'index'):
+            digest.update(fingerprint(value.index).encode())
+        value = value.to_numpy()
+    array = np.ascontiguousarray(value)
+    digest.update(str(array.dtype).encode())
+    digest.update(str(array.shape).encode())
+    if array.dtype == object:
+        digest.update(repr(array.tolist()).encode())
+    else:
+        digest.update(array.view(np.uint8).reshape(-1).data)
+    return digest.hexdigest()
+
+
+def estimator_fingerprint(estimator):
+    """Hash of an estimator's class and hyperparameters"""
+    params = sorted((name, repr(value)) for name, value in estimator.get_params(deep=True).items())
+    text = f"{type(estimator).__module__}.{type(estimator).__name__}:{params}"
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class TrainingCache:
+    """Disk-backed memoization of training results with LRU eviction"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(kind, *parts):
+        text = '|'.join(str(part) for part in parts)
+        return f"{kind}-{hashlib.blake2b(text.encode(), digest_size=20).hexdigest()}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            value = joblib.load(path)
+        except (OSError, EOFError, ValueError, ImportError, AttributeError):
+            # Missing, truncated or written by an incompatible library version
+            with self._lock:
+                self.misses += 1
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.pkl'):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                os.remove(entry.path)
+
+    def stats(self):
+        size = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.pkl'))
+        return {
+            'directory': self.directory,
+            'hits': self.hits,
+            'misses': self.misses,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,173 @@
+"""
+Content negotiation for bulk scoring: JSON, Arrow IPC and MessagePack.
+
+Requests pick their body format with Content-Type and their response format
+with Accept. Binary bodies are columnar: an Arrow IPC stream (one column per
+feature) or a MessagePack map of column name -> list of values (or raw
+little-endian float64 bytes). Each column goes into the feature buffer with a
+single NumPy conversion (feature_schema.FeatureSchema.decode_columns), with
+no per-row parsing. JSON bodies may be an object, a list of objects, or a
+columnar map of column name -> list.
+
+pyarrow and msgpack are optional. Without them, requests in those formats
+get 415 and Accept falls back to JSON.
+"""
+
+import json
+
+import numpy as np
+
+from feature_schema import FEATURE_SCHEMA, SchemaError
+
+JSON = 'application/json'
+ARROW = 'application/vnd.apache.arrow.stream'
+MSGPACK = 'application/msgpack'
+
+_ALIASES = {
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+    'application/vnd.apache.arrow.file': ARROW,
+}
+
+
+class UnsupportedMediaType(ValueError):
+    """Request body in a format that is unknown or whose library is not installed"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+        return pa
+    except ImportError:
+        return None
+
+
+def _msgpack():
+    try:
+        import msgpack
+        return msgpack
+    except ImportError:
+        return None
+
+
+def available_formats():
+    formats = [JSON]
+    if _pyarrow() is not None:
+        formats.append(ARROW)
+    if _msgpack() is not None:
+        formats.append(MSGPACK)
+    return formats
+
+
+def media_type(header):
+    """Bare, canonical media type of a Content-Type header value"""
+    value = (header or '').split(';')[0].strip().lower()
+    return _ALIASES.get(value, value)
+
+
+def negotiate(accept_header):
+    """Best available response format for an Accept header (JSON if none match)"""
+    available = available_formats()
+    candidates = []
+    for position, part in enumerate((accept_header or '').split(',')):
+        fields = part.split(';')
+        kind = media_type(fields[0])
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if kind in available and quality > 0:
+            candidates.append((-quality, position, kind))
+    return min(candidates)[2] if candidates else JSON
+
+
+def _station_ids(values, rows):
+    """Optional station_id column, which must have one entry per row"""
+    if values is None:
+        return None
+    values = list(values)
+    if len(values) != rows:
+        raise SchemaError([{'field': 'station_id', 'row': None,
+                            'message': f'expected {rows} station ids, got {len(values)}'}])
+    return values
+
+
+def decode_features(body, content_type):
+    """
+    Decode a request body into (X, station_ids)
+
+    X is a (rows, n_features) view of the schema's per-thread buffer and
+    station_ids a list (or None). Raises SchemaError for bad values and
+    UnsupportedMediaType for formats that cannot be read.
+    """
+    kind = media_type(content_type) or JSON
+    if kind == JSON:
+        data = json.loads(body)
+        if isinstance(data, dict) and data and all(isinstance(values, list) for values in data.values()):
+            # Columnar JSON: {column: [values, ...]}
+            station_ids = data.pop('station_id', None)
+            X = FEATURE_SCHEMA.decode_columns(data)
+            return X, _station_ids(station_ids, len(X))
+        records = data if isinstance(data, list) else [data]
+        X = FEATURE_SCHEMA.decode_batch(records)
+        station_ids = [record.get('station_id') if isinstance(record, dict) else None for record in records]
+        return X, station_ids
+
+    if kind == ARROW:
+        pa = _pyarrow()
+        if pa is None:
+            raise UnsupportedMediaType("Arrow requests require pyarrow (pip install pyarrow)")
+        table = pa.ipc.open_stream(body).read_all()
+        columns = {name: table.column(name).to_numpy() for name in table.column_names if name in FEATURE_SCHEMA.index}
+        station_ids = table.column('station_id').to_pylist() if 'station_id' in table.column_names else None
+        X = FEATURE_SCHEMA.decode_columns(columns)
+        return X, _station_ids(station_ids, len(X))
+
+    if kind == MSGPACK:
+        msgpack = _msgpack()
+        if msgpack is None:
+            raise UnsupportedMediaType("MessagePack requests require msgpack (pip install msgpack)")
+        data = msgpack.unpackb(body, raw=False)
+        if not isinstance(data, dict):
+            raise UnsupportedMediaType("MessagePack body must be a map of column name -> values")
+        columns = {}
+        for name, values in data.items():
+            if name in FEATURE_SCHEMA.index:
+                # Raw bytes are little-endian float64, the fastest form to produce and decode
+                columns[name] = np.frombuffer(values, dtype='<f8') if isinstance(values, bytes) else values
+        X = FEATURE_SCHEMA.decode_columns(columns)
+        return X, _station_ids(data.get('station_id'), len(X))
+
+    raise UnsupportedMediaType(f"Unsupported Content-Type '{kind}', expected one of {available_formats()}")
+
+
+def encode_columns(columns, kind):
+    """
+    Encode a map of column name -> 1-D array as `kind`; returns (body, content_type)
+
+    JSON and MessagePack produce {column: [values]} maps; Arrow produces a
+    table with one column per entry.
+    """
+    if kind == ARROW:
+        pa = _pyarrow()
+        table = pa.table({name: pa.array(values) for name, values in columns.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW
+    payload = {name: values.tolist() if hasattr(values, 'tolist') else list(values) for name, values in columns.items()}
+    if kind == MSGPACK:
+        return _msgpack().packb(payload, use_bin_type=True), MSGPACK
+    return json.dumps(payload), JSON
+
+
+def encode_object(payload, kind):
+    """Encode a nested response object as JSON or MessagePack; returns (body, content_type)"""
+    if kind == MSGPACK:
+        return _msgpack().packb(payload, use_bin_type=True, default=str), MSGPACK
+    return json.dumps(payload, default=str), JSON
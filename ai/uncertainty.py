@@ -0,0 +1,134 @@
+"""
+Monte Carlo input uncertainty for single readings.
+
+A probability scored from one reading hides how far it could move within the
+sensors' measurement error. MonteCarloUncertainty perturbs the reading with a
+noise model per feature: Gaussian with standard deviation
+absolute + relative * |value|, clipped to the schema's range. It scores every
+perturbed copy in one predict_threats call and summarises each threat's
+probability distribution as quantiles and as the chance that the threat level
+is at least Medium, High or Critical.
+
+Missing values stay missing in every copy and are imputed as usual. The
+number of copies adapts to a latency budget: the scoring cost per copy is
+tracked with a moving average, and the sample count is capped so that one
+estimate fits the budget.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from feature_schema import FEATURE_SCHEMA
+from model import THREAT_LEVELS
+
+DEFAULT_SAMPLES = 2000
+MIN_SAMPLES = 100
+# Hard cap on copies per estimate, whatever the request or budget
+MAX_SAMPLES = 20000
+DEFAULT_BUDGET_MS = 100.0
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Level boundaries in percent, as in threat_level
+LEVEL_THRESHOLDS = (25, 50, 75)
+
+
+class SensorNoise:
+    """Measurement error of one feature: standard deviation = absolute + relative * |value|"""
+
+    def __init__(self, absolute=0.0, relative=0.0):
+        self.absolute = absolute
+        self.relative = relative
+
+
+# Typical error of the coastal sensors and derived indices; features without an
+# entry (counts, exposure figures, model confidence) are taken as exact
+DEFAULT_SENSOR_NOISE = {
+    'sea_level_m': SensorNoise(absolute=0.05),
+    'wave_height_m': SensorNoise(absolute=0.1, relative=0.05),
+    'wind_speed_kmph': SensorNoise(absolute=2.0, relative=0.05),
+    'rainfall_mm': SensorNoise(absolute=0.5, relative=0.1),
+    'sst_celsius': SensorNoise(absolute=0.2),
+    'chlorophyll_mg_m3': SensorNoise(relative=0.2),
+    'turbidity_index': SensorNoise(absolute=0.02, relative=0.05),
+    'sea_level_anomaly_m': SensorNoise(absolute=0.05),
+    'storm_surge_risk_index': SensorNoise(absolute=0.02),
+    'coastal_erosion_risk': SensorNoise(absolute=0.02),
+    'algal_bloom_risk_index': SensorNoise(absolute=0.02),
+    'pollution_risk_index': SensorNoise(absolute=0.02),
+    'cyclone_distance_km': SensorNoise(absolute=10.0, relative=0.05),
+    'blue_carbon_loss_ton_co2': SensorNoise(relative=0.1),
+}
+
+
+class MonteCarloUncertainty:
+    """Probability quantiles and level chances of one reading under sensor noise"""
+
+    def __init__(self, noise=None, samples=DEFAULT_SAMPLES, budget_ms=DEFAULT_BUDGET_MS, quantiles=DEFAULT_QUANTILES):
+        noise = DEFAULT_SENSOR_NOISE if noise is None else noise
+        self.absolute = np.array([noise[name].absolute if name in noise else 0.0 for name in FEATURE_SCHEMA.columns])
+        self.relative = np.array([noise[name].relative if name in noise else 0.0 for name in FEATURE_SCHEMA.columns])
+        self.samples = samples
+        self.budget_ms = budget_ms
+        self.quantiles = tuple(quantiles)
+        self._seconds_per_sample = None
+        self._lock = threading.Lock()
+
+    def sample_count(self, requested=None):
+        """Copies to score: the request (default self.samples), capped by the latency budget and MAX_SAMPLES"""
+        samples = min(self.samples if requested is None else int(requested), MAX_SAMPLES)
+        with self._lock:
+            cost = self._seconds_per_sample
+        if cost:
+            samples = min(samples, int(self.budget_ms / 1000 / cost))
+        return max(samples, MIN_SAMPLES)
+
+    def perturb(self, x, samples, rng):
+        """(samples, n_features) noisy copies of one reading x"""
+        x = np.asarray(x, dtype=np.float64).reshape(-1)
+        scale = self.absolute + self.relative * np.abs(np.nan_to_num(x))
+        copies = x + rng.standard_normal((samples, len(x))) * scale
+        np.clip(copies, FEATURE_SCHEMA.minimum, FEATURE_SCHEMA.maximum, out=copies)
+        integer = FEATURE_SCHEMA.integer
+        copies[:, integer] = np.round(copies[:, integer])
+        return copies
+
+    def estimate(self, predictor, x, station_id=None, samples=None, seed=None):
+        """
+        Score noisy copies of reading x and summarise each threat
+
+        Returns {'samples', 'elapsed_ms', 'budget_ms', 'threats': {threat:
+        {'mean', 'std', 'quantiles': {'p5': ...}, 'levels': {level: share},
+        'at_least': {level: share}}}} with probabilities in percent.
+        """
+        samples = self.sample_count(samples)
+        copies = self.perturb(x, samples, np.random.default_rng(seed))
+
+        started = time.perf_counter()
+        _, probabilities, _ = predictor.predict_threats(copies, station_ids=[station_id] * samples,
+                                                        include_forecasts=False)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            cost = elapsed / samples
+            self._seconds_per_sample = cost if self._seconds_per_sample is None else 0.8 * self._seconds_per_sample + 0.2 * cost
+
+        threats = {}
+        for threat_name, proba in probabilities.items():
+            percent = np.asarray(proba, dtype=np.float64) * 100
+            counts = np.bincount(np.searchsorted(LEVEL_THRESHOLDS, percent, side='right'), minlength=len(THREAT_LEVELS))
+            shares = counts / samples
+            at_least = np.cumsum(shares[::-1])[::-1]
+            threats[threat_name] = {
+                'mean': round(float(percent.mean()), 2),
+                'std': round(float(percent.std()), 2),
+                'quantiles': {f"p{q * 100:g}": round(float(value), 2)
+                              for q, value in zip(self.quantiles, np.quantile(percent, self.quantiles))},
+                'levels': {level: round(float(share), 4) for level, share in zip(THREAT_LEVELS, shares)},
+                'at_least': {level: round(float(share), 4) for level, share in zip(THREAT_LEVELS[1:], at_least[1:])},
+            }
+        return {
+            'samples': samples,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'budget_ms': self.budget_ms,
+            'threats': threats,
+        }